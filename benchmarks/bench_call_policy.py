@@ -0,0 +1,49 @@
+"""
+call_policy 的性能测试, 直接运行: python -m benchmarks.bench_call_policy
+"""
+
+import random
+import threading
+import time
+
+from generator.framework.codegen.addition.call_policy import CallPolicy, RetryBudget
+
+
+def bench(calls: int = 2000, slow_ratio: float = 0.05, fast: float = 0.002, slow: float = 0.05,
+              hedge_delay: float = 0.006):
+    """
+    模拟 slow_ratio 的请求落在慢副本上，对比直接调用与对冲调用的 p50 / p99 延迟及实际发出的调用数
+    """
+    class BenchContext(object):
+        def __init__(self):
+            self.calls = 0
+            self._rand = random.Random(0)
+            self._lock = threading.Lock()
+
+        def call(self, arg, option=None):
+            with self._lock:
+                self.calls += 1
+                latency = slow if self._rand.random() < slow_ratio else fast
+            time.sleep(latency)
+            return arg
+
+    def run(call):
+        latencies = []
+        for i in range(calls):
+            start = time.perf_counter()
+            assert call(i) == i
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+    direct = BenchContext()
+    hedged = BenchContext()
+    context = CallPolicy("Bench.get", retries=1, hedge_delay=hedge_delay, budget=RetryBudget()).bind(hedged)
+    for (name, bench_context, call) in (("direct", direct, direct.call), ("hedged", hedged, context.call)):
+        p50, p99 = run(call)
+        print("%-7s: p50 %6.1f ms, p99 %6.1f ms, %d calls for %d requests" % (
+            name, p50 * 1e3, p99 * 1e3, bench_context.calls, calls))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,42 @@
+"""
+channel_pool 的性能测试, 直接运行: python -m benchmarks.bench_channel_pool
+"""
+
+import time
+
+from generator.framework.codegen.addition.channel_pool import ChannelPool
+from generator.framework.codegen.addition.resolver import StaticResolver
+
+
+def bench(calls: int = 200000, replicas: int = 3, pool_size: int = 4):
+    """
+    测量 acquire 及 release 的开销，以及请求在各 channel 上的分布
+    """
+    class FakeChannel(object):
+        async def close(self, grace=None):
+            pass
+
+    class FakeStub(object):
+        def __init__(self, channel):
+            self.channel = channel
+
+
+    pool = ChannelPool("Bench", FakeStub, lambda target: FakeChannel(), pool_size,
+                       StaticResolver(["replica-%d:50051" % i for i in range(replicas)]))
+    # 模拟每个 channel 上有部分请求未完成
+    holding = []
+    start = time.perf_counter()
+    for i in range(calls):
+        channel = pool.acquire()
+        holding.append(channel)
+        if len(holding) > replicas * pool_size * 2:
+            pool.release(holding.pop(0))
+    elapsed = time.perf_counter() - start
+
+    print("calls: %d, channels: %d" % (calls, len(pool.channels)))
+    print("acquire: %8.1f ns/call" % (elapsed / calls * 1e9))
+    print("outstanding: %s" % [outstanding for (_, outstanding) in pool.get_stats()])
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,101 @@
+"""
+columnar 的性能测试, 直接运行: python -m benchmarks.bench_columnar
+"""
+
+import time
+
+from generator.framework.codegen.addition.columnar import ColumnarResult
+
+
+def bench(row_count: int = 50000, repeat: int = 5):
+    """
+    对比行式及列式编码的数据大小与编解码耗时, 需要安装 protobuf
+    """
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+    file_proto = descriptor_pb2.FileDescriptorProto(name="columnar_bench.proto", package="bench", syntax="proto3")
+    columns = [
+        ("id", descriptor_pb2.FieldDescriptorProto.TYPE_INT32),
+        ("name", descriptor_pb2.FieldDescriptorProto.TYPE_STRING),
+        ("score", descriptor_pb2.FieldDescriptorProto.TYPE_FLOAT),
+    ]
+
+    row_proto = file_proto.message_type.add(name="Row")
+    for (index, (name, field_type)) in enumerate(columns):
+        row_proto.field.add(name=name, number=index + 1, type=field_type,
+                            label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL)
+    rows_proto = file_proto.message_type.add(name="Rows")
+    rows_proto.field.add(name="data", number=1, type=descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE,
+                         type_name=".bench.Row", label=descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED)
+    columnar_proto = file_proto.message_type.add(name="Columns")
+    for (index, (name, field_type)) in enumerate(columns):
+        columnar_proto.field.add(name=name, number=index + 1, type=field_type,
+                                 label=descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED)
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+
+    def message_class(name: str):
+        descriptor = pool.FindMessageTypeByName("bench.%s" % name)
+        if hasattr(message_factory, "GetMessageClass"):
+            return message_factory.GetMessageClass(descriptor)
+        return message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+    rows_type = message_class("Rows")
+
+    class Row(object):
+        def __init__(self, id: int = 0, name: str = "", score: float = 0):
+            self.id = id
+            self.name = name
+            self.score = score
+
+    class BenchResult(ColumnarResult):
+        element_type = Row
+        column_names = ("id", "name", "score")
+        pb2_type = message_class("Columns")
+
+    data = [Row(i, "name_%d" % i, i * 0.5) for i in range(row_count)]
+
+    def row_encode():
+        message = rows_type()
+        for row in data:
+            message.data.add(id=row.id, name=row.name, score=row.score)
+        return message.SerializeToString()
+
+    def row_decode(payload):
+        message = rows_type()
+        message.ParseFromString(payload)
+        return message
+
+    def row_decode_rows(payload):
+        return [Row(item.id, item.name, item.score) for item in row_decode(payload).data]
+
+    def columnar_encode():
+        return BenchResult.to_pb2(data).SerializeToString()
+
+    def columnar_decode(payload):
+        message = BenchResult.pb2_type()
+        message.ParseFromString(payload)
+        result = BenchResult()
+        result.from_pb2(message)
+        return result
+
+    def timeit(func, *args):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(*args)
+        return (time.perf_counter() - start) / repeat * 1000
+
+    row_payload = row_encode()
+    columnar_payload = columnar_encode()
+    print("rows: %d" % row_count)
+    print("row layout:      %8d bytes, encode %8.2f ms, decode %8.2f ms, decode to rows %8.2f ms" % (
+        len(row_payload), timeit(row_encode), timeit(row_decode, row_payload),
+        timeit(row_decode_rows, row_payload)))
+    print("columnar layout: %8d bytes, encode %8.2f ms, decode %8.2f ms, decode to rows %8.2f ms" % (
+        len(columnar_payload), timeit(columnar_encode), timeit(columnar_decode, columnar_payload),
+        timeit(lambda p: columnar_decode(p).rows(), columnar_payload)))
+
+
+if __name__ == "__main__":
+    bench()
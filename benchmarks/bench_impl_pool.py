@@ -0,0 +1,46 @@
+"""
+impl_pool 的性能测试, 直接运行: python -m benchmarks.bench_impl_pool
+"""
+
+import time
+
+from generator.framework.codegen.addition.impl_pool import ImplPool, ThreadLocalImpl
+
+
+def bench(calls: int = 20000, setup_size: int = 2000):
+    """
+    对比每次请求创建 impl 与复用 impl 的耗时, impl 的构造函数会构建一个 setup_size 大小的配置表
+    """
+    class BenchImpl(object):
+        def __init__(self, ctx):
+            self.ctx = ctx
+            self.settings = {"key_%d" % i: i for i in range(setup_size)}
+
+        def set_context(self, ctx):
+            self.ctx = ctx
+
+        def get(self, key):
+            return self.settings[key]
+
+    def per_request():
+        for i in range(calls):
+            BenchImpl(i).get("key_1")
+
+    def reuse(holder):
+        for i in range(calls):
+            with holder.use(i) as impl:
+                impl.get("key_1")
+
+    for (name, func) in (
+            ("per request", per_request),
+            ("thread local", lambda: reuse(ThreadLocalImpl(BenchImpl))),
+            ("pool", lambda: reuse(ImplPool(BenchImpl))),
+    ):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print("%-12s: %10.2f us/call" % (name, elapsed / calls * 1e6))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,191 @@
+"""
+local 的性能测试, 直接运行: python -m benchmarks.bench_local
+"""
+
+import os
+import time
+
+from generator.framework.codegen.addition import local
+from generator.framework.codegen.addition.local import bind_local, get_local, reg_local
+
+
+def build_pb2():
+    """
+    构建与生成的 proto 相同结构的 pb2 消息: UserGetArg {uid, name, tags}, UserGetResult {id, name, rows[{id, score}]}
+    """
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+    field = descriptor_pb2.FieldDescriptorProto
+    file_proto = descriptor_pb2.FileDescriptorProto(name="local_bench.proto", package="bench", syntax="proto3")
+
+    arg_proto = file_proto.message_type.add(name="UserGetArg")
+    arg_proto.field.add(name="uid", number=1, type=field.TYPE_INT32, label=field.LABEL_OPTIONAL)
+    arg_proto.field.add(name="name", number=2, type=field.TYPE_STRING, label=field.LABEL_OPTIONAL)
+    arg_proto.field.add(name="tags", number=3, type=field.TYPE_STRING, label=field.LABEL_REPEATED)
+
+    result_proto = file_proto.message_type.add(name="UserGetResult")
+    row_proto = result_proto.nested_type.add(name="Rows")
+    row_proto.field.add(name="id", number=1, type=field.TYPE_INT32, label=field.LABEL_OPTIONAL)
+    row_proto.field.add(name="score", number=2, type=field.TYPE_FLOAT, label=field.LABEL_OPTIONAL)
+    result_proto.field.add(name="id", number=1, type=field.TYPE_INT32, label=field.LABEL_OPTIONAL)
+    result_proto.field.add(name="name", number=2, type=field.TYPE_STRING, label=field.LABEL_OPTIONAL)
+    result_proto.field.add(name="rows", number=3, type=field.TYPE_MESSAGE, label=field.LABEL_REPEATED,
+                           type_name=".bench.UserGetResult.Rows")
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+
+    def message_type(name: str):
+        descriptor = pool.FindMessageTypeByName("bench.%s" % name)
+        if hasattr(message_factory, "GetMessageClass"):
+            return message_factory.GetMessageClass(descriptor)
+        return message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+    return message_type("UserGetArg"), message_type("UserGetResult")
+
+
+def build_types(arg_pb2, result_pb2):
+    """
+    与生成的 GetArg / GetResult 相同的转换代码
+    """
+
+    class GetArg(object):
+        def __init__(self, uid: int = 0, name: str = "", tags=None):
+            self.uid = uid
+            self.name = name
+            self.tags = tags or []
+
+        def convert_pb2(self):
+            result = arg_pb2()
+            result.uid = self.uid
+            result.name = self.name
+            for item in self.tags:
+                result.tags.append(item)
+            return result
+
+        def from_pb2(self, context):
+            self.uid = context.uid
+            self.name = context.name
+            self.tags = []
+            for item in context.tags or []:
+                self.tags.append(item)
+
+    class GetResultRows(object):
+        def __init__(self, id: int = 0, score: float = 0):
+            self.id = id
+            self.score = score
+
+        def convert_pb2(self):
+            result = result_pb2.Rows()
+            result.id = self.id
+            result.score = self.score
+            return result
+
+        def from_pb2(self, context):
+            self.id = context.id
+            self.score = context.score
+
+    class GetResult(object):
+        def __init__(self, id: int = 0, name: str = "", rows=None):
+            self.id = id
+            self.name = name
+            self.rows = rows or []
+
+        def convert_pb2(self):
+            result = result_pb2()
+            result.id = self.id
+            result.name = self.name
+            for item in self.rows:
+                result.rows.append(item.convert_pb2())
+            return result
+
+        def from_pb2(self, context):
+            self.id = context.id
+            self.name = context.name
+            self.rows = []
+            for item in context.rows or []:
+                row = GetResultRows()
+                row.from_pb2(item)
+                self.rows.append(row)
+
+    return GetArg, GetResult, GetResultRows
+
+
+def bench(calls: int = 50000, rows: int = 10):
+    """
+    对比普通函数调用、经过 servicer 的进程内调用、直接调用 impl 及序列化后经过 servicer 的耗时, 需要安装 protobuf
+    """
+    arg_pb2, result_pb2 = build_pb2()
+    GetArg, GetResult, GetResultRows = build_types(arg_pb2, result_pb2)
+
+    class BenchImpl(object):
+        def get(self, arg):
+            return GetResult(arg.uid, arg.name, [GetResultRows(i, i / 3) for i in range(rows)])
+
+    class BenchServicer(object):
+        """
+        与生成的 servicer 相同的 get 及 local_get, 省略 TraceContext
+        """
+        from_project = "bench"
+        rpc_name = "Bench"
+
+        def get(self, request, context):
+            arg = GetArg()
+            arg.from_pb2(request)
+            impl = BenchImpl()
+            result = impl.get(arg)
+            return result.convert_pb2()
+
+        def local_get(self, arg, context):
+            impl = BenchImpl()
+            return impl.get(arg)
+
+    class BenchClient(object):
+        from_project = "bench"
+        rpc_name = "Bench"
+
+    reg_local(BenchServicer)
+    client = BenchClient()
+    servicer = BenchServicer()
+    arg = GetArg(1024, "name", ["a", "b", "c"])
+
+    def run(name, call):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        elapsed = time.perf_counter() - start
+        print("%-10s %8.2f us/call" % (name, elapsed / calls * 1e6))
+
+    def function():
+        return BenchImpl().get(arg)
+
+    def serialized():
+        request = arg_pb2.FromString(arg.convert_pb2().SerializeToString())
+        response = result_pb2.FromString(servicer.get(request, None).SerializeToString())
+        result = GetResult()
+        result.from_pb2(response)
+        return result
+
+    def via_servicer():
+        result = GetResult()
+        result.from_pb2(bind_local(None, client, "get").call(arg))
+        return result
+
+    def direct():
+        return get_local(client.from_project, client.rpc_name).call("get", arg)
+
+    print("calls: %d, rows: %d" % (calls, rows))
+    run("function", function)
+    run("serialized", serialized)
+    run("servicer", via_servicer)
+    run("direct", direct)
+    os.environ["RPC_LOCAL_COPY"] = "1"
+    try:
+        run("copy", direct)
+    finally:
+        del os.environ["RPC_LOCAL_COPY"]
+        local.get_registry().pop(local.service_key(client.from_project, client.rpc_name), None)
+
+
+if __name__ == "__main__":
+    bench()
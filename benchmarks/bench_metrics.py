@@ -0,0 +1,39 @@
+"""
+metrics 的性能测试, 直接运行: python -m benchmarks.bench_metrics
+"""
+
+import time
+
+from generator.framework.codegen.addition.metrics import MethodMetric
+
+
+def bench(calls: int = 200000):
+    """
+    测量每次调用的记录开销，不包括请求及返回大小的计算
+    """
+    metric = MethodMetric("Bench.call")
+
+    def plain():
+        return None
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        plain()
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        with metric.track():
+            plain()
+    tracked = time.perf_counter() - start
+
+    stats = metric.snapshot()
+    assert stats.finished == calls
+    print("calls: %d" % calls)
+    print("baseline: %8.1f ns/call" % (baseline / calls * 1e9))
+    print("tracked:  %8.1f ns/call, overhead %8.1f ns/call" % (
+        tracked / calls * 1e9, (tracked - baseline) / calls * 1e9))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,32 @@
+"""
+response_cache 的性能测试, 直接运行: python -m benchmarks.bench_response_cache
+"""
+
+import time
+
+from generator.framework.codegen.addition.response_cache import ResponseCache
+
+
+def bench(calls: int = 200000, keys: int = 2000):
+    """
+    测量命中及未命中时缓存本身的开销
+    """
+    class BenchArg(object):
+        def __init__(self, uid):
+            self.uid = uid
+
+    cache = ResponseCache("Bench.get", 60, keys, ("uid",))
+    args = [BenchArg(i % keys) for i in range(calls)]
+
+    start = time.perf_counter()
+    for arg in args:
+        key = cache.key(arg)
+        if cache.get(key) is None:
+            cache.put(key, arg)
+    elapsed = time.perf_counter() - start
+    print("calls: %d, %s" % (calls, cache.get_stats()))
+    print("lookup: %8.1f ns/call" % (elapsed / calls * 1e9))
+
+
+if __name__ == "__main__":
+    bench()
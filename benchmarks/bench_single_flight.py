@@ -0,0 +1,54 @@
+"""
+single_flight 的性能测试, 直接运行: python -m benchmarks.bench_single_flight
+"""
+
+import random
+import threading
+import time
+import typing
+
+from generator.framework.codegen.addition.single_flight import SingleFlight
+
+
+def bench(threads: int = 32, calls: int = 200, keys: int = 1000, skew: float = 1.2, latency: float = 0.002):
+    """
+    多个线程按 zipf 分布的 key 并发调用延迟为 latency 秒的后端, 对比合并前后实际发出的调用数及耗时
+    """
+    weights = [1 / (rank ** skew) for rank in range(1, keys + 1)]
+
+    def backend(key):
+        time.sleep(latency)
+        return key
+
+    def run(flight: typing.Union[SingleFlight, None]):
+        counter = {"calls": 0}
+        lock = threading.Lock()
+
+        def counted(key):
+            with lock:
+                counter["calls"] += 1
+            return backend(key)
+
+        def worker(seed):
+            rand = random.Random(seed)
+            for key in rand.choices(range(keys), weights, k=calls):
+                if flight is None:
+                    assert counted(key) == key
+                else:
+                    assert flight.do(key, counted, key) == key
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return counter["calls"], time.perf_counter() - start
+
+    for (name, flight) in (("direct", None), ("single flight", SingleFlight("Bench.get"))):
+        backend_calls, elapsed = run(flight)
+        print("%-14s: %6d backend calls for %d requests, %.2fs" % (name, backend_calls, threads * calls, elapsed))
+
+
+if __name__ == "__main__":
+    bench()
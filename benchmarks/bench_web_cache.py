@@ -0,0 +1,35 @@
+"""
+web_cache 的性能测试, 直接运行: python -m benchmarks.bench_web_cache
+"""
+
+import time
+
+from generator.framework.codegen.addition.web_cache import HttpCache
+
+
+def bench(calls: int = 100000, keys: int = 2000):
+    """
+    测量命中及未命中时缓存本身的开销, 不包括生成响应
+    """
+    class BenchArg(object):
+        def __init__(self, uid):
+            self.uid = uid
+
+    cache = HttpCache("Bench.get", 60, keys, ("uid",))
+    # 只测量查找及保存，不依赖 Flask 的请求上下文
+    cache.response = lambda cached: cached
+    args = [BenchArg(i % keys) for i in range(calls)]
+    data = {"id": 1, "name": "bench", "tags": ["a", "b"]}
+
+    start = time.perf_counter()
+    for arg in args:
+        key = cache.key(arg)
+        if cache.get(key) is None:
+            cache.put(key, data)
+    elapsed = time.perf_counter() - start
+    print("calls: %d, %s" % (calls, cache.get_stats()))
+    print("lookup: %8.1f ns/call" % (elapsed / calls * 1e9))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,65 @@
+"""
+web_lazy 的性能测试, 直接运行: python -m benchmarks.bench_web_lazy
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from generator.framework.codegen.addition.web_lazy import LazyRegistry
+
+
+def bench(resources: int = 300, fields: int = 20):
+    """
+    生成 resources 个接口模块, 对比全部导入与按需导入时的启动耗时
+    """
+    root = tempfile.mkdtemp()
+    package = "bench_api"
+    os.makedirs(os.path.join(root, package))
+    open(os.path.join(root, package, "__init__.py"), "w").close()
+    body = "\n".join(
+        ["import typing", "", "", "class Arg(object):"] +
+        ["    f%d: int = %d" % (i, i) for i in range(fields)] +
+        ["", "", "def get(arg: Arg) -> typing.Dict[str, int]:", "    return {"] +
+        ["        \"f%d\": arg.f%d," % (i, i) for i in range(fields)] +
+        ["    }", ""]
+    )
+    for i in range(resources):
+        with open(os.path.join(root, package, "resource_%d.py" % i), "w") as f:
+            f.write(body)
+
+    sys.path.insert(0, root)
+    try:
+        start = time.perf_counter()
+        for i in range(resources):
+            importlib.import_module("%s.resource_%d" % (package, i))
+        eager = time.perf_counter() - start
+
+        for i in range(resources):
+            del sys.modules["%s.resource_%d" % (package, i)]
+        importlib.invalidate_caches()
+
+        class BenchApi(object):
+            app = None
+            blueprint = None
+
+        start = time.perf_counter()
+        registry = LazyRegistry(BenchApi(), package + ".api_reg",
+                                {"resource_%d" % i: [".resource_%d" % i] for i in range(resources)})
+        lazy = time.perf_counter() - start
+        start = time.perf_counter()
+        registry.load("resource_0")
+        first_hit = time.perf_counter() - start
+    finally:
+        sys.path.remove(root)
+        shutil.rmtree(root)
+
+    print("eager import: %8.2f ms for %d resources" % (eager * 1e3, resources))
+    print("lazy import : %8.2f ms, first hit of one namespace %.2f ms" % (lazy * 1e3, first_hit * 1e3))
+
+
+if __name__ == "__main__":
+    bench()
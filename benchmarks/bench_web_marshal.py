@@ -0,0 +1,69 @@
+"""
+web_marshal 的性能测试, 直接运行: python -m benchmarks.bench_web_marshal
+"""
+
+import json
+import time
+
+from generator.framework.codegen.addition.web_marshal import dumps, encoder_name
+
+
+def bench(calls: int = 200, rows: int = 100):
+    """
+    对比生成的 marshal 函数与 flask_restplus 的 marshal 处理 rows 行列表返回值的耗时
+    """
+    class Row(object):
+        def __init__(self, i):
+            self.id = i
+            self.name = "name-%d" % i
+            self.score = i / 3
+
+    class Result(object):
+        def __init__(self):
+            self.rows = [Row(i) for i in range(rows)]
+            self.total = rows
+
+    def marshal_row(value):
+        return {
+            "id": value.id,
+            "name": value.name,
+            "score": value.score,
+        }
+
+    def marshal_result(value):
+        rows_value = value.rows
+        return {
+            "rows": None if rows_value is None else [marshal_row(item) for item in rows_value],
+            "total": value.total,
+        }
+
+    result = Result()
+    start = time.perf_counter()
+    for _ in range(calls):
+        dumps(marshal_result(result))
+    elapsed = time.perf_counter() - start
+    print("generated (%s): %8.1f us/response" % (encoder_name, elapsed / calls * 1e6))
+
+    try:
+        from flask_restplus import fields, marshal
+    except ImportError:
+        print("flask_restplus is not installed, skip")
+        return
+
+    model = {
+        "rows": fields.List(fields.Nested({
+            "id": fields.Integer(),
+            "name": fields.String(),
+            "score": fields.Float(),
+        })),
+        "total": fields.Integer(),
+    }
+    start = time.perf_counter()
+    for _ in range(calls):
+        json.dumps(marshal(result, model))
+    elapsed = time.perf_counter() - start
+    print("flask_restplus marshal : %8.1f us/response" % (elapsed / calls * 1e6))
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,45 @@
+"""
+web_stream 的性能测试, 直接运行: python -m benchmarks.bench_web_stream
+"""
+
+import time
+import tracemalloc
+
+from generator.framework.codegen.addition.web_stream import iter_chunks
+from generator.framework.codegen.addition.web_marshal import dumps
+
+
+def bench(rows: int = 200000):
+    """
+    对比一次性编码与流式编码 rows 行结果时的峰值内存及第一批数据的耗时
+    """
+    def produce():
+        for i in range(rows):
+            yield {"id": i, "name": "name-%d" % i, "score": i / 3}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    body = dumps(list(produce()))
+    whole = time.perf_counter() - start
+    _, whole_peak = tracemalloc.get_traced_memory()
+    del body
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_chunk = None
+    for chunk in iter_chunks(produce()):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+    streamed = time.perf_counter() - start
+    _, stream_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("whole body: %8.1f ms, first byte %8.1f ms, peak %8.1f MB" % (
+        whole * 1e3, whole * 1e3, whole_peak / 1024 / 1024))
+    print("streamed  : %8.1f ms, first byte %8.1f ms, peak %8.1f MB" % (
+        streamed * 1e3, first_chunk * 1e3, stream_peak / 1024 / 1024))
+
+
+if __name__ == "__main__":
+    bench()
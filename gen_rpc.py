@@ -54,6 +54,95 @@ if __name__ == '__main__':
         type=str
     )
 
+    parser.add_argument(
+        "-aio", "--rpc_async", action="store_true",
+        help="生成基于 grpc.aio 的异步客户端及服务端代码, 客户端方法及 servicer 方法均为 async def,"
+             " 该选项默认关闭"
+    )
+
+    parser.add_argument(
+        "-batch", "--rpc_batch", action="store_true",
+        help="为每个服务额外生成 Batch 接口，客户端可以在一次调用中发送同一服务的多个请求，"
+             "服务端并发执行, 该选项默认关闭"
+    )
+
+    parser.add_argument(
+        "-cs", "--custom_server", action="store_true",
+        help="生成的 rpc_server.py 使用 addition 中可配置的服务端代替 runtime 的 server.loop,"
+             " -sw, -smc, -smm, -ska, -sp 及 -mp 只对该服务端生效, 异步模式下始终使用, 该选项默认关闭"
+    )
+
+    parser.add_argument(
+        "-sw", "--server_workers", type=int, default=0,
+        help="生成的 rpc_server.py 处理请求的线程数, 为 0 时使用 CPU 数 + 4, 运行时可通过 RPC_SERVER_WORKERS 覆盖"
+    )
+
+    parser.add_argument(
+        "-smc", "--server_max_concurrent_rpcs", type=int, default=0,
+        help="服务端同时处理的最大请求数，超出时直接返回 RESOURCE_EXHAUSTED, 为 0 时不限制,"
+             " 运行时可通过 RPC_SERVER_MAX_CONCURRENT_RPCS 覆盖"
+    )
+
+    parser.add_argument(
+        "-smm", "--server_max_message_bytes", type=int, default=0,
+        help="服务端收发消息的最大字节数, 为 0 时使用 grpc 的默认值,"
+             " 运行时可通过 RPC_SERVER_MAX_SEND_BYTES 及 RPC_SERVER_MAX_RECEIVE_BYTES 覆盖"
+    )
+
+    parser.add_argument(
+        "-ska", "--server_keepalive_time_ms", type=int, default=0,
+        help="服务端 keepalive ping 的发送间隔, 为 0 时不发送, 运行时可通过 RPC_SERVER_KEEPALIVE_TIME_MS 覆盖"
+    )
+
+    parser.add_argument(
+        "-sp", "--server_processes", type=int, default=1,
+        help="服务端的进程数，大于 1 时使用 SO_REUSEPORT 监听同一端口, 为 0 时使用 CPU 数,"
+             " 运行时可通过 RPC_SERVER_PROCESSES 覆盖"
+    )
+
+    parser.add_argument(
+        "-of", "--option_file", type=str, default="",
+        help="json 格式的代码生成选项文件, key 为 CommonBase 的类名或 类名.方法名, value 为 rpc_option 支持的选项,"
+             " 如 {\"UserBase.list\": {\"max_concurrency\": 4, \"queue_timeout\": 0.1}}, 优先于代码中的声明"
+    )
+
+    parser.add_argument(
+        "-metrics", "--rpc_metrics", type=str, default="", choices=["", "server", "all"],
+        help="为 server 时生成的服务端记录每个接口的延迟直方图、进行中的请求数、收发字节数及错误数,"
+             " 为 all 时客户端同样记录, 默认不记录"
+    )
+
+    parser.add_argument(
+        "-mp", "--metrics_port", type=int, default=0,
+        help="服务端以 Prometheus 文本格式提供监控数据的本地端口，多进程模式下每个进程依次加 1,"
+             " 为 0 时不提供, 运行时可通过 RPC_METRICS_PORT 覆盖"
+    )
+
+    parser.add_argument(
+        "-tsr", "--trace_sample_rate", type=float, default=1.0,
+        help="全局的 trace 采样率, 小于 1 时未被采样的调用不创建 TraceContext, 并将采样结果传递给下游调用,"
+             " 单个接口可以通过 rpc_option(trace_sample=...) 覆盖, 运行时可通过 RPC_TRACE_SAMPLE_RATE 覆盖"
+    )
+
+    parser.add_argument(
+        "-local", "--rpc_local", action="store_true",
+        help="客户端与服务端位于同一进程时，客户端不经过 channel 及序列化, Arg 直接传给 impl 并返回其 Result,"
+             " 需要服务端限流、参数校验、监控或分页限制的接口经过 servicer, 运行时可通过 RPC_LOCAL=0 关闭,"
+             " RPC_LOCAL_COPY=1 时深拷贝参数及返回值, 该选项默认关闭"
+    )
+
+    parser.add_argument(
+        "-cps", "--channel_pool_size", type=int, default=1,
+        help="客户端对每个服务副本建立的 channel 数, 每次调用选择进行中请求数最少的 channel, 同步客户端大于 1 时才使用 channel 池,"
+             " 可以在类型上通过 rpc_option(channel_pool_size=...) 按服务指定, 运行时可通过 RPC_<RPC_NAME>_POOL_SIZE 覆盖"
+    )
+
+    parser.add_argument(
+        "-validate", "--validate_args", action="store_true",
+        help="根据字段的约束为参数类型生成 validate 方法, 服务端在调用 impl 前校验参数, 不满足时返回 INVALID_ARGUMENT,"
+             " 该选项默认关闭"
+    )
+
     args = parser.parse_args()
     for k, v in args.__dict__.items():
         setattr(config, k, v)
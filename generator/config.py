@@ -40,3 +40,89 @@ outside_server_path: str = ""
 
 # 独立项目的名称
 outside_server_name: str = ""
+
+# rpc_async 为 True 时，生成基于 grpc.aio 的异步客户端及服务端代码
+rpc_async: bool = False
+
+# rpc_batch 为 True 时，为每个服务额外生成 Batch 接口，一次调用同一服务的多个方法
+rpc_batch: bool = False
+
+# custom_server 为 True 时，生成的 rpc_server.py 使用 addition 中可配置的服务端代替 runtime 的 server.loop,
+# 同一 rpc 目录中所有项目的 servicer 都注册到该服务端, 异步模式下始终使用 addition 中的 grpc.aio 服务端
+custom_server: bool = False
+
+# 以下为 custom_server 或 rpc_async 时 rpc_server.py 的默认运行参数，运行时均可以通过 RPC_SERVER_* 环境变量覆盖,
+# 值为 0 时使用 grpc 的默认值
+
+# 处理请求的线程数
+server_workers: int = 0
+
+# 同时处理的最大请求数，超出时直接返回 RESOURCE_EXHAUSTED
+server_max_concurrent_rpcs: int = 0
+
+# 收发消息的最大字节数
+server_max_message_bytes: int = 0
+
+# keepalive ping 的发送间隔
+server_keepalive_time_ms: int = 0
+
+# 服务端的进程数, 大于 1 时使用 SO_REUSEPORT 监听同一端口，为 0 时使用 CPU 数
+server_processes: int = 1
+
+# option_file 为 json 格式的代码生成选项文件，与 rpc_option 声明的选项相同，key 为 类名 或 类名.方法名
+option_file: str = ""
+
+# rpc_metrics 为 server 时，生成的服务端记录每个接口的延迟、进行中的请求数、收发字节数及错误数,
+# 为 all 时客户端同样记录，为空时不记录
+rpc_metrics: str = ""
+
+# 服务端以 Prometheus 文本格式提供监控数据的本地端口，为 0 时不提供, 运行时可通过 RPC_METRICS_PORT 覆盖
+metrics_port: int = 0
+
+# 全局的 trace 采样率，小于 1 时生成的代码只对部分调用创建 TraceContext, 运行时可通过 RPC_TRACE_SAMPLE_RATE 覆盖
+trace_sample_rate: float = 1.0
+
+# rpc_local 为 True 时，生成的客户端在同一进程中注册了对应的 servicer 时不经过 channel 及序列化, Arg 直接传给 impl 并返回其 Result,
+# 需要服务端限流、参数校验、监控、分页限制, 以及列式或声明了缓存的接口经过 servicer, 参数及结果仍转换为 pb2 消息,
+# 运行时可通过 RPC_LOCAL=0 关闭, RPC_LOCAL_COPY=1 时直接调用的参数及返回值被深拷贝
+rpc_local: bool = False
+
+# 客户端对每个服务副本建立的 channel 数, 每次调用选择进行中请求数最少的 channel, 同步客户端大于 1 时才使用 channel 池,
+# 可以在类型上通过 rpc_option(channel_pool_size=...) 按服务指定, 运行时可通过 RPC_<RPC_NAME>_POOL_SIZE 覆盖
+channel_pool_size: int = 1
+
+# validate_args 为 True 时, 生成的参数类型根据字段的约束 (min_length, maximum, min_items, must_true, required 等)
+# 生成 validate 方法, 服务端及 Flask 接口在调用 impl 前校验参数
+validate_args: bool = False
+
+# 以下为 WebWorker 生成 Flask 接口时的选项, 需要的 addition 模块会拷贝到接口输出目录的 addition 中
+
+# web_arg_plan 为 True 时，生成的 Resource 按生成时确定的提取计划从 path / query / body / header 中读取参数,
+# 不再在每次请求时通过 extract_args 反射接口定义
+web_arg_plan: bool = False
+
+# web_fast_marshal 为 True 时, 为 Dict 及元素为 Dict 或基础类型的 List 返回值生成直接读取字段的 marshal 函数，接口返回编码后的 json 响应,
+# 不再由 flask_restplus 按 model 逐个字段转换, 安装了 orjson 或 ujson 时使用其编码
+web_fast_marshal: bool = False
+
+# web_openapi 为 True 时，在生成时根据接口定义输出 swagger.json, 运行时直接提供该文档 (带 ETag),
+# 生成的模型注册可以通过环境变量 WEB_REGISTER_MODELS=0 跳过, 以减少启动时间
+web_openapi: bool = False
+
+# web_lazy_import 为 True 时，生成的 api_reg.py 只记录 namespace 与接口模块的对应关系, 请求第一次访问某个 namespace
+# 时才导入其模块，可以调用 api_reg.warm_up 提前导入全部模块, 运行时可通过 WEB_LAZY_IMPORT=0 关闭
+web_lazy_import: bool = False
+
+# web_enum_precompute 为 True 时，枚举接口的返回值在导入时编码一次, 并生成合并所有枚举的 /enum/_all 接口,
+# 可以通过 names 参数按名称过滤, 响应带有强 ETag 及 Cache-Control
+web_enum_precompute: bool = False
+
+# web_cache_stats 为 True 且有接口声明了 http_cache_ttl 时，在 api_reg.py 中注册查看所有接口缓存状态的 /_cache/stats,
+# 该接口没有鉴权，只应在内部使用的服务中开启
+web_cache_stats: bool = False
+
+# 生成的枚举类型定义的形式:
+#   property: 每个成员为返回常量的 property, 通过单例访问
+#   const: 成员为类常量，附带 值 -> 名称 及 值 -> 描述 的字典, 成员不能修改
+#   enum: 标准库的 IntEnum 或混入 str / float 的 Enum, 其它类型 (bool / 日期) 使用不混入基础类型的 Enum
+enum_style: str = "property"
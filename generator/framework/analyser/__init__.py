@@ -1,3 +1,4 @@
 from .analyser import Analyser
 from .dir_scanner import DirScanner
 from .module_scanner import ModelWithVar, ModuleScanner
+from .option import EntryOption, ServiceOption, rpc_option, get_option, get_service_option
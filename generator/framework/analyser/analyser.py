@@ -9,6 +9,8 @@ from flask_restplus import fields
 from ...common import MetaData, Entry, Arg, ArgSource, RpcType,\
     type_def, rpc_doc_args_key, rpc_doc_resp_key, rpc_impl_rename
 from ...common.web.namespace import get_namespace, NamespaceInfo
+from .option import EntryOption, entry_option_key, get_cls_option, get_method_option, get_file_option, \
+    split_options, check_entry_option
 
 
 function_type = frozenset([staticmethod, classmethod, types.FunctionType])
@@ -17,6 +19,9 @@ func_obj_types = frozenset([staticmethod, classmethod])
 
 method_reg = re.compile(r"^[\s\S]+?(?=:param|:return:|$)")
 
+# paginate 选项为接口加入的参数名
+pagination_args = ("cursor", "limit")
+
 
 class Analyser(object):
     """
@@ -66,6 +71,10 @@ def extract_methods(cls):
 
     # process cls' s apidoc if exists
     base_entries_arg: List[Arg] = process_cls_args(cls)
+    # 类型上声明的生成选项，作为该类型下所有方法的默认选项, 服务级别的选项由 get_service_option 获取
+    cls_option = get_cls_option(cls)
+    cls_option.update(get_file_option(cls.__name__))
+    cls_option = split_options(cls_option)[1]
 
     entries = []
     for (attr_name, attr) in cls.__dict__.items():
@@ -113,11 +122,55 @@ def extract_methods(cls):
             args = sorted(args, key=lambda a: a.name.lower())
             entry = Entry(attr_name, args, result, method_doc)
 
+        # 配置文件中的选项优先于代码中声明的同级选项
+        entry_option = dict(cls_option)
+        entry_option.update(get_method_option(attr))
+        entry_option.update(get_file_option("%s.%s" % (cls.__name__, attr_name)))
+        option = EntryOption(**entry_option)
+        setattr(entry, entry_option_key, option)
+        if option.paginate:
+            paginate_entry(cls, entry, option)
+        check_entry_option(cls, entry)
         entries.append(entry)
 
     return sorted(entries, key=lambda e: e.name.lower())
 
 
+def paginate_entry(cls, entry: Entry, option: EntryOption):
+    """
+    为声明了 paginate 的接口加入 cursor 及 limit 参数, 并将 List 返回值包装为 {items, next_cursor}
+    :param cls:
+    :param entry:
+    :param option:
+    :return:
+    """
+    if not type_def.is_list(entry.result):
+        raise ValueError("%s.%s 声明了 paginate, 但返回值不是 List" % (cls.__name__, entry.name))
+    arg_names = [arg.name for arg in entry.args]
+    for name in pagination_args:
+        if name in arg_names:
+            raise ValueError("%s.%s 声明了 paginate, 参数 %s 与分页参数重名" % (cls.__name__, entry.name, name))
+
+    cursor = type_def.fields.String(required=False, description="上一页返回的 next_cursor, 为空时获取第一页",
+                                    default_value="")
+    limit = type_def.fields.Integer(required=False, description="每页的最大数量, 不超过 %d" % option.max_page_size,
+                                    default_value=option.page_size)
+    # 分页参数加在已有参数之后, 不改变已有参数的顺序
+    entry.args = entry.args + [
+        Arg("cursor", cursor, cursor.default_value, description=cursor.description, required=False,
+            source=ArgSource.PARAMS),
+        Arg("limit", limit, limit.default_value, description=limit.description, required=False,
+            source=ArgSource.PARAMS),
+    ]
+
+    items: type_def.RpcType = entry.result
+    entry.result = type_def.fields.Dict(dict(
+        items=items,
+        next_cursor=type_def.fields.String(required=True, description="下一页的游标, 为空时没有下一页",
+                                           default_value="")
+    ), description=items.description)
+
+
 def get_source_type(method_name: str, field: RpcType) -> ArgSource:
     """
     获取 field 字段的来源信息，首先根据方法名，如果是 http 的方法，
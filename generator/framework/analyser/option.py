@@ -0,0 +1,398 @@
+"""
+CommonBase 及其方法上声明的代码生成选项
+"""
+
+import json
+import typing
+
+from ... import config
+from ...common import Entry, type_def
+
+# 选项保存在 CommonBase 的类型或方法上的属性名
+rpc_option_key = "__rpc_option__"
+
+# 解析完成后，选项保存在 Entry 上的属性名
+entry_option_key = "gen_option"
+
+# bulk 选项支持的取值
+bulk_modes = ("", "stream", "repeated")
+
+# stream_format 选项支持的取值
+stream_formats = ("array", "ndjson")
+
+# impl_reuse 选项支持的取值
+impl_reuse_modes = ("", "thread", "pool")
+
+
+class EntryOption(object):
+    """
+    单个 Entry 的代码生成选项, 未声明的选项使用默认值
+    """
+
+    def __init__(
+            self,
+            columnar: bool = False,
+            stream: bool = False,
+            web_stream: bool = False,
+            stream_format: str = "array",
+            bulk: str = "",
+            bulk_size: int = 500,
+            bulk_bytes: int = 3 * 1024 * 1024,
+            max_concurrency: int = 0,
+            queue_timeout: float = 0,
+            trace_sample: float = -1,
+            impl_reuse: str = "",
+            impl_pool_size: int = 8,
+            coalesce: bool = False,
+            cache_ttl: float = 0,
+            cache_size: int = 1024,
+            cache_keys: typing.Sequence[str] = (),
+            deadline: float = 0,
+            retries: int = 0,
+            hedge_delay: float = 0,
+            http_cache_ttl: float = 0,
+            http_cache_size: int = 1024,
+            vary_args: typing.Sequence[str] = (),
+            vary_headers: typing.Sequence[str] = (),
+            http_cache_control: str = "no-cache",
+            paginate: bool = False,
+            page_size: int = 100,
+            max_page_size: int = 1000
+    ):
+        """
+        :param columnar: 返回值为 List[Dict] 且 Dict 只包含基础类型时，使用列式编码,
+                         每一列对应一个 packed repeated 字段
+        :param stream: 返回值为 List 时，生成 server streaming 的接口，逐个元素返回, 优先于 columnar,
+                       只影响 gRPC 接口
+        :param web_stream: 返回值为 List 时, Flask 接口逐个编码 impl 返回的生成器并分批发送,
+                           只影响 Flask 接口, 不改变 gRPC 接口的定义
+        :param stream_format: web_stream 接口的返回格式, 为 "array" 时返回 json 数组,
+                              为 "ndjson" 时每行一个元素
+        :param bulk: 额外生成批量接口 <name>_many, 为 "stream" 时使用 client streaming 传递参数,
+                     为 "repeated" 时客户端按 bulk_size 及 bulk_bytes 分批，每批一次调用
+        :param bulk_size: 每批的最大数量, 服务端也按该数量将参数分批交给 impl
+        :param bulk_bytes: 每批的最大字节数，只对 repeated 有效
+        :param max_concurrency: 服务端同时处理该接口的最大请求数, 为 0 时不限制,
+                                超出时请求直接返回 RESOURCE_EXHAUSTED
+        :param queue_timeout: 达到 max_concurrency 时等待空闲的最长秒数，为 0 时不等待
+        :param trace_sample: 该接口的 trace 采样率, 小于 0 时使用全局的 config.trace_sample_rate
+        :param impl_reuse: 服务端复用 impl 实例, 为 "thread" 时每个线程一个实例，为 "pool" 时使用有上限的对象池,
+                           为空时每次请求创建新的实例, 复用的 impl 通过 set_context, impl.ctx 或 current_context() 获取 ctx
+        :param impl_pool_size: 对象池的大小，只对 pool 有效
+        :param coalesce: 客户端合并参数相同且同时进行的请求，只发出一次 rpc 并共享结果, 只适用于幂等的接口,
+                         server streaming 的接口不支持
+        :param cache_ttl: 客户端缓存返回值的秒数, 为 0 时不缓存, server streaming 的接口不支持
+        :param cache_size: 客户端最多缓存的条目数, 超出时淘汰最久未使用的条目
+        :param cache_keys: 作为缓存 key 的参数名, 为空时使用所有参数, 不是接口参数的名称在解析时报错
+        :param deadline: 客户端调用的默认超时秒数, 为 0 时不限制
+        :param retries: 客户端遇到 UNAVAILABLE 时最多重试的次数, 设置了 hedge_delay 时为最多额外发出的对冲调用数
+        :param hedge_delay: 大于 0 时使用对冲代替重试, 调用 hedge_delay 秒后仍未返回时向其它副本发出相同的调用,
+                            使用最先成功的结果, 通常设置为该接口的 p95 延迟
+        :param http_cache_ttl: Flask 的 GET 接口在服务端缓存编码后的返回值的秒数, 为 0 时不缓存,
+                               只支持返回值为 Dict 或元素为 Dict 及基础类型的 List 的非流式接口
+        :param http_cache_size: 服务端最多缓存的条目数, 超出时淘汰最久未使用的条目
+        :param vary_args: 作为服务端缓存 key 的参数名, 为空时使用所有参数
+        :param vary_headers: 作为服务端缓存 key 的请求头, 同时作为响应的 Vary 头
+        :param http_cache_control: 缓存的响应的 Cache-Control, 默认要求客户端每次通过 ETag 验证
+        :param paginate: 返回值为 List 时使用游标分页, Analyser 为接口加入 cursor 及 limit 参数,
+                         返回值改为包含 items 及 next_cursor 的 Dict, impl 每次只返回一页,
+                         next_cursor 为空时表示没有下一页, 客户端额外生成逐页获取的 iter_<name> 方法
+        :param page_size: 未指定 limit 时每页的数量
+        :param max_page_size: 每页的最大数量, 服务端在调用 impl 前将 limit 限制在该范围内
+        """
+        if bulk not in bulk_modes:
+            raise ValueError("bulk 选项只能为 %s 之一, 当前为 %s" % (bulk_modes, bulk))
+        if paginate and (stream or web_stream):
+            raise ValueError("paginate 与 stream / web_stream 选项不能同时声明")
+        if stream_format not in stream_formats:
+            raise ValueError("stream_format 选项只能为 %s 之一, 当前为 %s" % (stream_formats, stream_format))
+        if impl_reuse not in impl_reuse_modes:
+            raise ValueError("impl_reuse 选项只能为 %s 之一, 当前为 %s" % (impl_reuse_modes, impl_reuse))
+
+        self.columnar = columnar
+        self.stream = stream
+        self.web_stream = web_stream
+        self.stream_format = stream_format
+        self.bulk = bulk
+        self.bulk_size = bulk_size
+        self.bulk_bytes = bulk_bytes
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.trace_sample = trace_sample
+        self.impl_reuse = impl_reuse
+        self.impl_pool_size = impl_pool_size
+        self.coalesce = coalesce
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.cache_keys = list(cache_keys)
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.http_cache_ttl = http_cache_ttl
+        self.http_cache_size = http_cache_size
+        self.vary_args = list(vary_args)
+        self.vary_headers = list(vary_headers)
+        self.http_cache_control = http_cache_control
+        self.paginate = paginate
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+
+class ServiceOption(object):
+    """
+    服务级别的代码生成选项, 只能声明在 CommonBase 的类型上
+    """
+
+    def __init__(self, channel_pool_size: int = 0):
+        """
+        :param channel_pool_size: 客户端对每个副本建立的 channel 数, 为 0 时使用全局的 config.channel_pool_size
+        """
+        self.channel_pool_size = channel_pool_size
+
+
+# ServiceOption 所支持的选项名称
+service_option_names = ("channel_pool_size",)
+
+
+def split_options(options: typing.Dict[str, typing.Any]) -> typing.Tuple[dict, dict]:
+    """
+    将声明的选项分为服务级别及 Entry 级别两部分
+    :return: (服务级别的选项, Entry 级别的选项)
+    """
+    service_options = {}
+    entry_options = {}
+    for (name, value) in options.items():
+        if name in service_option_names:
+            service_options[name] = value
+        else:
+            entry_options[name] = value
+    return service_options, entry_options
+
+
+def check_options(options: typing.Dict[str, typing.Any], on_service: bool):
+    """
+    提前校验选项名称，避免拼写错误的选项被静默忽略
+    :param options: 声明的选项
+    :param on_service: 是否声明在类型上, 服务级别的选项只能声明在类型上
+    """
+    service_options, entry_options = split_options(options)
+    if service_options and not on_service:
+        raise ValueError("%s 是服务级别的选项, 只能声明在类型上" % ", ".join(service_options))
+    ServiceOption(**service_options)
+    EntryOption(**entry_options)
+
+
+def rpc_option(**options):
+    """
+    为 CommonBase 或其方法声明代码生成选项, 方法上的选项会覆盖类型上的同名选项, eg:
+
+        @rpc_option(columnar=True)
+        def list(self): pass
+
+    :param options: EntryOption 所支持的选项, 声明在类型上时还可以使用 ServiceOption 的选项
+    :return:
+    """
+    def wrap(target):
+        func = getattr(target, "__func__", target)
+        check_options(options, isinstance(func, type))
+        if isinstance(func, type):
+            merged = dict(func.__dict__.get(rpc_option_key, {}))
+        else:
+            merged = dict(getattr(func, rpc_option_key, {}))
+        merged.update(options)
+        setattr(func, rpc_option_key, merged)
+        return target
+
+    return wrap
+
+
+def get_cls_option(cls) -> typing.Dict[str, typing.Any]:
+    """
+    获取 CommonBase 类型上声明的选项, 不继承父类的声明
+    """
+    return dict(cls.__dict__.get(rpc_option_key, {}))
+
+
+def get_method_option(method) -> typing.Dict[str, typing.Any]:
+    """
+    获取方法上声明的选项
+    """
+    method = getattr(method, "__func__", method)
+    return dict(getattr(method, rpc_option_key, None) or {})
+
+
+_file_options: typing.Union[typing.Dict[str, typing.Dict[str, typing.Any]], None] = None
+
+
+def get_file_option(name: str) -> typing.Dict[str, typing.Any]:
+    """
+    获取 config.option_file 中声明的选项, 文件为 json 格式, key 为 CommonBase 的类名或 类名.方法名, eg:
+
+        {"UserBase": {"max_concurrency": 20}, "UserBase.list": {"max_concurrency": 4, "queue_timeout": 0.1}}
+
+    :param name: 类名或 类名.方法名
+    :return:
+    """
+    global _file_options
+    if _file_options is None:
+        _file_options = {}
+        if config.option_file:
+            with open(config.option_file, "r") as f:
+                _file_options = json.load(f)
+            # 提前校验选项名称，避免拼写错误的选项被静默忽略
+            for (key, options) in _file_options.items():
+                check_options(options, "." not in key)
+
+    return dict(_file_options.get(name, {}))
+
+
+def get_service_option(service_type) -> ServiceOption:
+    """
+    获取 CommonBase 类型上及 config.option_file 中声明的服务级别选项, 没有类型时使用默认选项
+    """
+    if service_type is None:
+        return ServiceOption()
+    options = get_cls_option(service_type)
+    options.update(get_file_option(service_type.__name__))
+    return ServiceOption(**split_options(options)[0])
+
+
+def check_entry_option(cls, entry: Entry):
+    """
+    校验依赖于接口参数的选项, 在 Analyser 解析出 Entry 的参数后调用, 不满足时生成失败
+    :param cls: CommonBase 的类型
+    :param entry:
+    """
+    arg_names = [arg.name for arg in entry.args]
+    for name in get_option(entry).cache_keys:
+        if name not in arg_names:
+            raise ValueError("%s.%s 的 cache_keys 中的 %s 不是该接口的参数" % (cls.__name__, entry.name, name))
+
+
+def get_option(entry: Entry) -> EntryOption:
+    """
+    获取 Entry 的代码生成选项, 没有经过 Analyser 解析的 Entry 使用默认选项
+    """
+    return getattr(entry, entry_option_key, None) or EntryOption()
+
+
+def is_columnar(entry: Entry) -> bool:
+    """
+    判断 Entry 的返回值是否使用列式编码，只有声明了 columnar,
+    且返回值为元素只包含基础类型的 List[Dict] 时才成立
+    """
+    if not get_option(entry).columnar or not type_def.is_list(entry.result) or is_stream(entry):
+        return False
+
+    elem_type = entry.result.get_elem()
+    if not type_def.is_dict(elem_type):
+        return False
+
+    elem_info = elem_type.get_elem_info()
+    return len(elem_info) > 0 and all(type_def.is_base_type(v) for v in elem_info.values())
+
+
+def is_stream(entry: Entry) -> bool:
+    """
+    判断 Entry 是否生成为 server streaming 接口，只有声明了 stream 且返回值为 List 时才成立
+    """
+    return get_option(entry).stream and type_def.is_list(entry.result)
+
+
+def is_web_stream(entry: Entry) -> bool:
+    """
+    判断 Flask 接口是否流式返回, 只有声明了 web_stream 且返回值为 List 时才成立, 与 gRPC 的 stream 相互独立
+    """
+    return get_option(entry).web_stream and type_def.is_list(entry.result)
+
+
+def is_bulk(entry: Entry) -> bool:
+    """
+    判断是否需要为 Entry 额外生成批量接口, server streaming 的接口不支持批量接口
+    """
+    return bool(get_option(entry).bulk) and not is_stream(entry)
+
+
+def bulk_name(entry: Entry) -> str:
+    """
+    批量接口的名称
+    """
+    return "%s_many" % entry.name
+
+
+def can_batch(entry: Entry) -> bool:
+    """
+    判断 Entry 是否可以作为服务级别 Batch 接口的子请求, server streaming 的接口不支持
+    """
+    return not is_stream(entry)
+
+
+def is_coalesced(entry: Entry) -> bool:
+    """
+    判断客户端是否需要合并 Entry 的相同请求
+    """
+    return get_option(entry).coalesce and not is_stream(entry)
+
+
+def is_cached(entry: Entry) -> bool:
+    """
+    判断客户端是否需要缓存 Entry 的返回值
+    """
+    return get_option(entry).cache_ttl > 0 and not is_stream(entry)
+
+
+def is_http_cached(entry: Entry) -> bool:
+    """
+    判断 Flask 接口是否需要在服务端缓存返回值, 只有非流式的 GET 接口且返回值可以生成 marshal 函数时才成立
+    """
+    return get_option(entry).http_cache_ttl > 0 and entry.name == "get" and can_marshal(entry.result) \
+        and not is_web_stream(entry)
+
+
+def can_marshal(result: type_def.RpcType) -> bool:
+    """
+    Flask 接口的返回值能否生成 marshal 函数, 支持 Dict 及元素为 Dict 或基础类型的 List
+    """
+    if type_def.is_list(result):
+        elem = result.get_elem()
+        return type_def.is_dict(elem) or type_def.is_base_type(elem)
+    return type_def.is_dict(result)
+
+
+def is_paginated(entry: Entry) -> bool:
+    """
+    判断 Entry 是否使用游标分页, 声明了 paginate 的 Entry 在 Analyser 中已加入分页的参数及返回值字段
+    """
+    return get_option(entry).paginate
+
+
+def has_call_policy(entry: Entry) -> bool:
+    """
+    判断客户端是否需要为 Entry 生成超时、重试及对冲策略
+    """
+    option = get_option(entry)
+    return (option.deadline > 0 or option.retries > 0) and not is_stream(entry)
+
+
+def is_limited(entry: Entry) -> bool:
+    """
+    判断服务端是否需要限制 Entry 的并发数
+    """
+    return get_option(entry).max_concurrency > 0
+
+
+def need_sampling(entry: Entry) -> bool:
+    """
+    判断 Entry 是否需要生成 trace 采样的代码，全局采样率为 1 且未单独声明采样率时不需要
+    """
+    return config.trace_sample_rate < 1 or get_option(entry).trace_sample >= 0
+
+
+def impl_reuse(entry: Entry) -> str:
+    """
+    获取服务端复用 impl 的方式, 协程间无法安全地共享线程级别的实例，异步模式下 thread 按 pool 处理
+    """
+    mode = get_option(entry).impl_reuse
+    if mode == "thread" and config.rpc_async:
+        return "pool"
+    return mode
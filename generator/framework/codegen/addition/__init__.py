@@ -0,0 +1,4 @@
+"""
+随生成代码一起输出的附加模块，生成时会被原样拷贝到 rpc 服务端及客户端的 addition 目录中,
+因此这里的模块只能依赖标准库及生成项目本身的依赖, 且不能引用生成器的其他模块
+"""
@@ -0,0 +1,290 @@
+"""
+基于 grpc.aio 的异步客户端及服务端支持, 需要 grpcio >= 1.32
+"""
+
+import asyncio
+import contextlib
+import inspect
+import sys
+import typing
+
+import grpc
+
+from grpc import aio
+
+from .call_policy import channel_options
+from .channel_pool import ChannelPool
+from .limiter import LimitExceeded
+from .resolver import Resolver, StaticResolver, split_targets, registered
+from .sampling import outgoing_metadata
+from .server import ServerOption, get_servicers, run_processes, rpc_names, validation_metadata
+from .validate import ValidationError
+
+# rpc_name 与 Stub 类型的映射，由生成的客户端代码注册
+_client_stubs: typing.Dict[str, typing.Any] = {}
+
+# aiter_traced 中迭代结束的标记
+_end = object()
+
+
+def reg_client(rpc_name: str, stub_type):
+    """
+    注册异步客户端所使用的 Stub 类型
+    """
+    _client_stubs[rpc_name] = stub_type
+
+
+class StepTrace(object):
+    """
+    在协程每次恢复执行时进入 trace_type(ctx), 挂起时退出, eg:
+
+        result = await StepTrace(impl.query(arg), TraceContext, ctx)
+
+    runtime 的 TraceContext 基于线程保存状态, 同一线程中交替执行的协程直接 with TraceContext 会互相覆盖,
+    按步进入及退出时, 协程中的代码执行期间线程中保存的始终是自身的 ctx
+    """
+    __slots__ = ("awaitable", "trace_type", "ctx")
+
+    def __init__(self, awaitable, trace_type, ctx):
+        self.awaitable = awaitable
+        self.trace_type = trace_type
+        self.ctx = ctx
+
+    def __await__(self):
+        iterator = self.awaitable.__await__()
+        send, value = iterator.send, None
+        while True:
+            try:
+                with self.trace_type(self.ctx):
+                    yielded = send(value)
+            except StopIteration as e:
+                return e.value
+
+            try:
+                value = yield yielded
+                send = iterator.send
+            except GeneratorExit:
+                iterator.close()
+                raise
+            except BaseException as e:
+                # 取消及事件循环抛入的异常交给被包装的协程处理
+                send, value = iterator.throw, e
+
+
+async def acall_traced(trace_type, ctx, func: typing.Callable, *args, sampler=None):
+    """
+    在 trace_type(ctx) 中调用 func, 同时支持 async def 及普通函数
+    :param trace_type: runtime 的 TraceContext, 为 None 时不进入 trace, 用于未被采样的调用
+    :param ctx: 进入 TraceContext 时使用的上下文
+    :param func: 被调用的函数
+    :param args: 调用参数
+    :param sampler: 客户端的 Sampler, 指定时由其决定是否进入 trace, 并在调用期间保存采样结果
+    """
+    if sampler is not None:
+        with sampler.call_scope() as sampled:
+            return await acall_traced(sampled and trace_type or None, ctx, func, *args)
+
+    if trace_type is None:
+        result = func(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    with trace_type(ctx):
+        result = func(*args)
+    if inspect.isawaitable(result):
+        result = await StepTrace(result, trace_type, ctx)
+    return result
+
+
+async def aiter_traced(trace_type, ctx, func: typing.Callable, *args, sampler=None) -> typing.AsyncIterator:
+    """
+    acall_traced 的迭代版本, func 可以返回异步生成器或普通的迭代器, 每次获取元素时进入 trace_type(ctx),
+    元素交给调用方处理期间不在 trace 中
+    """
+    if sampler is not None:
+        with sampler.call_scope() as sampled:
+            async for item in aiter_traced(sampled and trace_type or None, ctx, func, *args):
+                yield item
+        return
+
+    if trace_type is None:
+        result = func(*args)
+        if hasattr(result, "__aiter__"):
+            async for item in result:
+                yield item
+        else:
+            for item in result:
+                yield item
+        return
+
+    with trace_type(ctx):
+        result = func(*args)
+    if hasattr(result, "__aiter__"):
+        iterator = result.__aiter__()
+        try:
+            while True:
+                try:
+                    item = await StepTrace(iterator.__anext__(), trace_type, ctx)
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+    else:
+        iterator = iter(result)
+        while True:
+            with trace_type(ctx):
+                item = next(iterator, _end)
+            if item is _end:
+                return
+            yield item
+
+
+class AioCallContext(object):
+    """
+    单个 rpc 方法的异步调用上下文, 使用 channel 池时每次调用选择进行中请求数最少的 channel
+    """
+
+    def __init__(self, name: str, stub=None, pool: ChannelPool = None):
+        self.name = name
+        self.stub = stub
+        self.pool = pool
+
+    async def call(self, arg, option=None):
+        """
+        :param arg: 生成的 Arg 类型，需要提供 convert_pb2
+        :param option: RPCOption, 目前只使用其中的 timeout
+        :return: 调用得到的 pb2 结果
+        """
+        timeout = getattr(option, "timeout", None)
+        if self.pool is None:
+            return await getattr(self.stub, self.name)(
+                arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata())
+
+        channel = self.pool.acquire()
+        try:
+            return await getattr(channel.stub, self.name)(
+                arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata())
+        finally:
+            self.pool.release(channel)
+
+    def stream(self, arg, option=None):
+        """
+        调用 server streaming 的接口，返回可以 async for 的结果
+        """
+        timeout = getattr(option, "timeout", None)
+        if self.pool is None:
+            return getattr(self.stub, self.name)(arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata())
+        return self.pooled_stream(arg, timeout)
+
+    async def pooled_stream(self, arg, timeout):
+        # 迭代结束前一直计入该 channel 进行中的请求数
+        channel = self.pool.acquire()
+        try:
+            async for item in getattr(channel.stub, self.name)(
+                    arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata()):
+                yield item
+        finally:
+            self.pool.release(channel)
+
+
+class AioServiceClient(object):
+    """
+    异步客户端的基类, 每个实例持有一个 channel 池, 使用完毕后需要调用 close,
+    也可以使用 async with 自动关闭
+
+    副本地址默认由 resolver.get_resolver() 提供, 每个副本建立 pool_size 个 channel,
+    pool_size 由生成的子类指定, 可以被 RPC_<RPC_NAME>_POOL_SIZE 覆盖,
+    service_config 为生成的子类中各接口的超时、重试及对冲策略
+    """
+    from_project = ""
+    rpc_name = ""
+    pool_size = 1
+    service_config = ""
+
+    def __init__(self, target: str = "", channel: aio.Channel = None, resolver: Resolver = None):
+        """
+        :param target: 逗号分隔的副本地址，指定时不使用 resolver
+        :param channel: 指定时所有调用都使用该 channel, 不使用 channel 池
+        :param resolver: 获取副本地址的 resolver
+        """
+        self.target = target
+        self.channel = channel
+        self.resolver = target and StaticResolver(split_targets(target)) or resolver
+        self.stub = None
+        self.pool: typing.Union[ChannelPool, None] = None
+
+    def get_context(self, name: str) -> AioCallContext:
+        if self.channel is not None:
+            if self.stub is None:
+                self.stub = _client_stubs[self.rpc_name](self.channel)
+            return AioCallContext(name, stub=self.stub)
+
+        if self.pool is None:
+            options = channel_options(self.service_config)
+            self.pool = ChannelPool(
+                self.rpc_name, _client_stubs[self.rpc_name],
+                lambda target: aio.insecure_channel(target, options=options), self.pool_size, self.resolver)
+        return AioCallContext(name, pool=self.pool)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        if self.channel is not None:
+            await self.channel.close()
+            self.channel = None
+            self.stub = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+@contextlib.asynccontextmanager
+async def ahandle_errors(context):
+    """
+    与 server.handle_errors 相同, 用于异步 servicer
+    """
+    try:
+        yield
+    except LimitExceeded as e:
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, e.message)
+    except ValidationError as e:
+        context.set_trailing_metadata(validation_metadata(e))
+        await context.abort(grpc.StatusCode.INVALID_ARGUMENT, e.message)
+
+
+async def serve(option: ServerOption = None):
+    """
+    启动异步服务端，并加载所有通过 server.reg_servicer 注册的 servicer
+    :param option: 服务端的运行参数，默认从环境变量获取, workers 在异步模式下不生效
+    """
+    option = option or ServerOption.from_env()
+    server = aio.server(options=option.channel_options(), maximum_concurrent_rpcs=option.get_max_concurrent_rpcs())
+    for (servicer_type, add_func) in get_servicers():
+        add_func(servicer_type(), server)
+
+    server.add_insecure_port(option.address)
+    await server.start()
+    option.start_metrics()
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(grace=None)
+
+
+def loop(option: ServerOption = None):
+    """
+    rpc_server.py 的入口, 对应 runtime 中同步版本的 server.loop, 多进程模式下每个进程运行独立的事件循环,
+    与 server.loop 一样只由父进程注册到注册中心
+    """
+    option = option or ServerOption.from_env()
+    with registered(rpc_names(), option.address):
+        status = run_processes(lambda: asyncio.run(serve(option)), option.get_processes())
+    if status:
+        sys.exit(status)
@@ -0,0 +1,226 @@
+"""
+服务级别的 Batch 接口支持, 一次 rpc 调用同一服务的多个方法, 服务端并发执行各个子请求
+"""
+
+import asyncio
+import os
+import threading
+import typing
+
+from concurrent.futures import ThreadPoolExecutor
+
+# BatchRequest.Item 及 BatchResponse.Item 中 oneof 的名称，与生成的 proto 保持一致
+arg_oneof = "arg"
+result_oneof = "result"
+
+# 子请求失败时，错误信息保存的字段名
+error_field = "error"
+
+# 服务端并发执行子请求的线程数，可以通过环境变量 RPC_BATCH_WORKERS 修改
+default_workers = 8
+
+_executor: typing.Union[ThreadPoolExecutor, None] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    获取服务端执行子请求的线程池，所有服务共享，首次使用时才创建
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.environ.get("RPC_BATCH_WORKERS", default_workers))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rpc_batch")
+    return _executor
+
+
+class BatchError(Exception):
+    """
+    单个子请求在服务端执行失败
+    """
+
+    def __init__(self, name: str, message: str):
+        super().__init__("%s: %s" % (name, message))
+        self.name = name
+        self.message = message
+
+
+class ItemAborted(Exception):
+    """
+    子请求通过 ItemContext.abort 结束
+    """
+
+    def __init__(self, code, details: str):
+        super().__init__("%s: %s" % (getattr(code, "name", code), details))
+        self.code = code
+        self.details = details
+
+
+class ItemContext(object):
+    """
+    服务端传给子请求的 context, abort 及 trailing metadata 只作用于该子请求,
+    其它属性与 Batch 调用的 context 相同
+    """
+
+    def __init__(self, context):
+        self._context = context
+        self.trailing_metadata = ()
+
+    def __getattr__(self, name: str):
+        return getattr(self._context, name)
+
+    def set_trailing_metadata(self, trailing_metadata):
+        self.trailing_metadata = trailing_metadata
+
+    def abort(self, code, details: str):
+        raise ItemAborted(code, details)
+
+
+class AsyncItemContext(ItemContext):
+    """
+    ItemContext 的异步版本, grpc.aio 的 abort 需要 await
+    """
+
+    async def abort(self, code, details: str):
+        raise ItemAborted(code, details)
+
+
+def item_error(e: Exception) -> str:
+    """
+    子请求失败时返回给客户端的错误信息
+    """
+    if isinstance(e, ItemAborted):
+        return str(e)
+    return "%s: %s" % (type(e).__name__, e)
+
+
+class BatchItem(object):
+    """
+    Batch 中的单个子请求，调用 BatchBuilder.execute 后可以通过 result 获取结果
+    """
+
+    def __init__(self, name: str, arg):
+        self.name = name
+        self.arg = arg
+        self._result = None
+        self._error: typing.Union[BatchError, None] = None
+        self._done = False
+
+    def result(self):
+        """
+        获取子请求的结果，子请求失败时抛出 BatchError
+        """
+        if not self._done:
+            raise RuntimeError("batch 尚未执行")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def done(self) -> bool:
+        return self._done
+
+
+class BatchBuilder(object):
+    """
+    客户端使用，收集同一服务的多个子请求，并在一次 rpc 调用中发送, eg:
+
+        batch = client.batch()
+        user = batch.add("get", GetArg(uid=1))
+        posts = batch.add("list", ListArg(uid=1))
+        batch.execute()
+        user.result(), posts.result()
+    """
+
+    def __init__(self, request_type, result_types: typing.Dict[str, typing.Any], send: typing.Callable):
+        """
+        :param request_type: 服务的 BatchRequest pb2 类型
+        :param result_types: 方法名与 Result 类型的映射
+        :param send: 实际发送请求的函数, 接收 BatchBuilder 及 option, 返回 BatchResponse
+        """
+        self.request_type = request_type
+        self.result_types = result_types
+        self.send = send
+        self.items: typing.List[BatchItem] = []
+
+    def add(self, name: str, arg) -> BatchItem:
+        """
+        添加一个子请求
+        :param name: 方法名
+        :param arg: 方法对应的 Arg
+        :return:
+        """
+        if name not in self.result_types:
+            raise ValueError("方法 %s 不支持 batch 调用" % name)
+        item = BatchItem(name, arg)
+        self.items.append(item)
+        return item
+
+    def convert_pb2(self):
+        request = self.request_type()
+        for item in self.items:
+            getattr(request.items.add(), item.name).CopyFrom(item.arg.convert_pb2())
+        return request
+
+    def resolve(self, response) -> typing.List[BatchItem]:
+        """
+        将 BatchResponse 的结果按顺序设置到各个子请求上
+        """
+        for (item, result) in zip(self.items, response.items):
+            item._done = True
+            if result.WhichOneof(result_oneof) == error_field:
+                item._error = BatchError(item.name, result.error)
+                continue
+
+            item._result = self.result_types[item.name]()
+            item._result.from_pb2(getattr(result, item.name))
+        return self.items
+
+    def execute(self, option=None) -> typing.List[BatchItem]:
+        """
+        发送所有子请求, 异步客户端中需要 await
+        """
+        return self.send(self, option)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def run_batch(servicer, request, context, response_type):
+    """
+    服务端使用，使用线程池并发执行 BatchRequest 中的子请求, 子请求调用的是 servicer 自身的方法,
+    单个子请求失败 (包括被 abort) 不影响其它子请求
+    """
+    items = list(request.items)
+
+    def call(item):
+        name = item.WhichOneof(arg_oneof)
+        result = response_type.Item()
+        try:
+            getattr(result, name).CopyFrom(getattr(servicer, name)(getattr(item, name), ItemContext(context)))
+        except Exception as e:
+            result.error = item_error(e)
+        return result
+
+    if len(items) <= 1:
+        return response_type(items=[call(item) for item in items])
+    return response_type(items=list(get_executor().map(call, items)))
+
+
+async def arun_batch(servicer, request, context, response_type):
+    """
+    run_batch 的异步版本，子请求在同一事件循环中并发执行
+    """
+    async def call(item):
+        name = item.WhichOneof(arg_oneof)
+        result = response_type.Item()
+        try:
+            getattr(result, name).CopyFrom(
+                await getattr(servicer, name)(getattr(item, name), AsyncItemContext(context)))
+        except Exception as e:
+            result.error = item_error(e)
+        return result
+
+    results = await asyncio.gather(*(call(item) for item in request.items))
+    return response_type(items=list(results))
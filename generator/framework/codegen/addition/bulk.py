@@ -0,0 +1,144 @@
+"""
+批量接口 (<entry>_many) 的分批及调用支持
+"""
+
+import inspect
+import typing
+
+# 单批的默认最大数量
+default_bulk_size = 500
+
+# 单批的默认最大字节数, 需要小于 grpc 默认的 4MB 消息上限
+default_bulk_bytes = 3 * 1024 * 1024
+
+
+class RawMessage(object):
+    """
+    包装已经转换好的 pb2 消息 (或消息的迭代器), 使其可以像生成的 Arg 类型一样传递给 context.call
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+    def convert_pb2(self):
+        return self.message
+
+
+def iter_messages(args: typing.Iterable) -> typing.Iterator:
+    """
+    将 Arg 逐个转换为 pb2 消息，用于 client streaming 的接口
+    """
+    for arg in args:
+        yield arg.convert_pb2()
+
+
+def chunk_messages(args: typing.Iterable, max_count: int = default_bulk_size,
+                   max_bytes: int = default_bulk_bytes) -> typing.Iterator[list]:
+    """
+    将 Arg 转换为 pb2 消息，并按数量及字节数分批, 单个超过 max_bytes 的消息单独成批
+    """
+    batch = []
+    batch_bytes = 0
+    for arg in args:
+        message = arg.convert_pb2()
+        size = message.ByteSize()
+        if batch and (len(batch) >= max_count or batch_bytes + size > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(message)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def convert_args(messages: typing.Iterable, arg_type, validate: bool = False) -> list:
+    """
+    服务端使用，将 pb2 消息转换为 Arg 类型
+    :param validate: 是否校验每个参数, 不满足约束时抛出 ValidationError, 字段路径以 [index]. 开头
+    """
+    args = []
+    for message in messages:
+        arg = arg_type()
+        arg.from_pb2(message)
+        if validate:
+            arg.validate("[%d]." % len(args))
+        args.append(arg)
+    return args
+
+
+def chunk_args(messages: typing.Iterable, arg_type, max_count: int = default_bulk_size,
+               validate: bool = False) -> typing.Iterator[list]:
+    """
+    服务端使用，将 client streaming 收到的消息转换为 Arg 并按数量分批
+    :param validate: 与 convert_args 相同, index 为参数在整个 stream 中的序号
+    """
+    batch = []
+    for (index, message) in enumerate(messages):
+        arg = arg_type()
+        arg.from_pb2(message)
+        if validate:
+            arg.validate("[%d]." % index)
+        batch.append(arg)
+        if len(batch) >= max_count:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+async def achunk_args(messages: typing.AsyncIterable, arg_type, max_count: int = default_bulk_size,
+                      validate: bool = False) -> typing.AsyncIterator[list]:
+    """
+    chunk_args 的异步版本
+    """
+    batch = []
+    index = 0
+    async for message in messages:
+        arg = arg_type()
+        arg.from_pb2(message)
+        if validate:
+            arg.validate("[%d]." % index)
+        index += 1
+        batch.append(arg)
+        if len(batch) >= max_count:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def call_batch(impl, name: str, args: list) -> list:
+    """
+    将一批参数交给 impl 处理, impl 实现了 <name>_many 时整批调用，否则逐个调用 <name>
+    """
+    handler = getattr(impl, "%s_many" % name, None)
+    if handler is not None:
+        return list(handler(args))
+
+    method = getattr(impl, name)
+    return [method(arg) for arg in args]
+
+
+async def acall_batch(impl, name: str, args: list) -> list:
+    """
+    call_batch 的异步版本，同时支持 async def 及普通方法的 impl
+    """
+    handler = getattr(impl, "%s_many" % name, None)
+    if handler is not None:
+        results = handler(args)
+        if inspect.isawaitable(results):
+            results = await results
+        return list(results)
+
+    method = getattr(impl, name)
+    results = []
+    for arg in args:
+        result = method(arg)
+        if inspect.isawaitable(result):
+            result = await result
+        results.append(result)
+    return results
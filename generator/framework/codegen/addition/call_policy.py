@@ -0,0 +1,395 @@
+"""
+客户端接口的默认超时、重试及对冲 (hedging) 策略
+
+异步客户端的 channel 由 addition 创建，策略转换为 gRPC 的 service config 交给 grpc 执行;
+同步客户端的 channel 由 runtime 创建，策略由 CallPolicy.bind 在客户端执行:
+    1. 超时: 调用方 RPCOption 的 timeout 优先于 deadline, 每次调用都以剩余的时间作为 gRPC 的 timeout,
+       由 gRPC 在超时后取消调用
+    2. 重试: 只重试 retry_codes 中的错误，按指数退避等待, 在调用方的线程中执行
+    3. 对冲: 第一次调用 hedge_delay 秒后仍未返回时发出下一次调用，使用最先成功的结果并取消其它调用,
+       调用上下文提供 call_future 时 (如 client.PooledServiceClient) 在调用方的线程中发出所有调用,
+       否则在有上限的线程池中调用, 此时 runtime 基于线程的 TraceContext 无法关联到调用方的 trace,
+       也只能依靠 gRPC 的 timeout 结束未完成的调用; 线程池已满时不排队, 直接在调用方的线程中调用
+
+重试及对冲共用一个预算，与 gRPC 的 retryThrottling 相同: 失败及发出对冲调用时消耗 1 个 token,
+成功时恢复 token_ratio 个, token 低于上限的一半时不再重试或对冲，后端整体变慢时不会成倍增加负载
+"""
+
+import copy
+import json
+import os
+import random
+import threading
+import time
+import typing
+
+from concurrent import futures
+
+import grpc
+
+# 默认重试的错误码
+default_retry_codes = ("UNAVAILABLE",)
+
+# 重试的初始退避秒数及上限
+initial_backoff = 0.05
+max_backoff = 1.0
+
+# 执行对冲调用的线程数上限, 可以通过环境变量 RPC_POLICY_WORKERS 覆盖
+default_workers = 16
+
+
+class BoundedExecutor(object):
+    """
+    有上限的线程池, 没有空闲线程时 try_submit 返回 None, 不会在队列中等待被卡住的调用
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rpc_policy")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def try_submit(self, func: typing.Callable, *args) -> typing.Union[futures.Future, None]:
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+# 执行对冲调用的线程池
+_executor: typing.Union[BoundedExecutor, None] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> BoundedExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = os.environ.get("RPC_POLICY_WORKERS")
+                _executor = BoundedExecutor(int(workers) if workers else default_workers)
+    return _executor
+
+
+def duration(seconds: float) -> str:
+    """
+    转换为 service config 中的时长格式
+    """
+    return "%gs" % seconds
+
+
+class DeadlineExceeded(grpc.RpcError):
+    """
+    同步客户端在 deadline 内未得到结果时抛出
+    """
+
+    def __init__(self, name: str, deadline: float):
+        super().__init__("%s 在 %s 秒内未返回" % (name, deadline))
+        self.name = name
+        self.deadline = deadline
+
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self):
+        return str(self)
+
+
+class AttemptOption(object):
+    """
+    调用方未指定 option 且没有 RPCOption 类型时, 传给单次调用的 option
+    """
+    __slots__ = ("timeout",)
+
+    def __init__(self, timeout: typing.Union[float, None] = None):
+        self.timeout = timeout
+
+
+def with_timeout(option, timeout: float, option_type: typing.Callable = None):
+    """
+    复制调用方的 option 并将 timeout 替换为剩余的时间, 不修改调用方的 option
+    :param option: 调用方的 RPCOption, 可以为 None
+    :param timeout: 本次调用的 timeout
+    :param option_type: option 为 None 时创建 option 的类型, 如 RPCOption
+    """
+    if option is not None:
+        option = copy.copy(option)
+    elif option_type is not None:
+        option = option_type()
+    else:
+        option = AttemptOption()
+    option.timeout = timeout
+    return option
+
+
+def wrap_call(call) -> futures.Future:
+    """
+    将 grpc 的 Future (如 stub.method.future 的结果) 转换为 concurrent.futures.Future,
+    cancel_call 可以取消进行中的 rpc
+    """
+    future = futures.Future()
+    future.set_running_or_notify_cancel()
+
+    def done(_):
+        try:
+            future.set_result(call.result())
+        except BaseException as e:
+            future.set_exception(e)
+
+    future.cancel_call = call.cancel
+    call.add_done_callback(done)
+    return future
+
+
+def cancel_attempt(future: futures.Future):
+    """
+    取消未被采用的调用, 线程池中已经开始的调用只能依靠 gRPC 的 timeout 结束
+    """
+    cancel_call = getattr(future, "cancel_call", None)
+    if cancel_call is not None:
+        cancel_call()
+    else:
+        future.cancel()
+
+
+class RetryBudget(object):
+    """
+    重试及对冲的预算, 与 gRPC service config 的 retryThrottling 相同
+    """
+
+    def __init__(self, max_tokens: float = 10, token_ratio: float = 0.1):
+        self.max_tokens = max_tokens
+        self.token_ratio = token_ratio
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return self.tokens > self.max_tokens / 2
+
+    def on_success(self):
+        if self.tokens < self.max_tokens:
+            with self._lock:
+                self.tokens = min(self.max_tokens, self.tokens + self.token_ratio)
+
+    def on_failure(self):
+        with self._lock:
+            self.tokens = max(0.0, self.tokens - 1)
+
+    def to_config(self) -> dict:
+        return {"maxTokens": self.max_tokens, "tokenRatio": self.token_ratio}
+
+
+class CallPolicy(object):
+    """
+    单个接口的调用策略
+    """
+
+    def __init__(self, name: str, deadline: float = 0, retries: int = 0, hedge_delay: float = 0,
+                 retry_codes: typing.Sequence[str] = default_retry_codes, budget: RetryBudget = None):
+        """
+        :param name: Service.method
+        :param deadline: 默认超时秒数, 为 0 时不限制
+        :param retries: 最多重试的次数, 对冲时为最多额外发出的调用数
+        :param hedge_delay: 大于 0 时使用对冲代替重试
+        :param retry_codes: 可以重试的错误码名称，对冲时遇到其它错误立即失败
+        :param budget: 重试及对冲的预算，默认同一服务的所有接口共用
+        """
+        self.name = name
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.retry_codes = tuple(retry_codes)
+        self._codes = frozenset(getattr(grpc.StatusCode, code) for code in self.retry_codes)
+        self.budget = budget or get_budget(name.split(".")[0])
+
+    def method_config(self) -> dict:
+        """
+        转换为 service config 中的 methodConfig
+        """
+        service, _, method = self.name.partition(".")
+        config = {"name": [{"service": service, "method": method}]}
+        if self.deadline > 0:
+            config["timeout"] = duration(self.deadline)
+        if self.retries > 0 and self.hedge_delay > 0:
+            config["hedgingPolicy"] = {
+                "maxAttempts": self.retries + 1,
+                "hedgingDelay": duration(self.hedge_delay),
+                "nonFatalStatusCodes": list(self.retry_codes),
+            }
+        elif self.retries > 0:
+            config["retryPolicy"] = {
+                "maxAttempts": self.retries + 1,
+                "initialBackoff": duration(initial_backoff),
+                "maxBackoff": duration(max_backoff),
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": list(self.retry_codes),
+            }
+        return config
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, grpc.RpcError) and error.code() in self._codes
+
+    def bind(self, context, scope: typing.Callable = None, option_type: typing.Callable = None) -> "PolicyContext":
+        """
+        同步客户端使用, 包装 get_context 得到的调用上下文
+        :param context: 调用上下文
+        :param scope: 在线程池中调用时进入的上下文，如 TraceContext
+        :param option_type: 调用方未指定 option 时, 创建携带 timeout 的 option 的类型, 如 RPCOption
+        """
+        return PolicyContext(self, context, scope, option_type)
+
+
+class PolicyContext(object):
+    """
+    按照 CallPolicy 执行调用的上下文，与 get_context 得到的调用上下文一样提供 call
+    """
+
+    def __init__(self, policy: CallPolicy, context, scope: typing.Callable = None,
+                 option_type: typing.Callable = None):
+        self.policy = policy
+        self.context = context
+        self.scope = scope
+        self.option_type = option_type
+
+    def call(self, arg, option=None):
+        policy = self.policy
+        timeout = getattr(option, "timeout", None) or policy.deadline or None
+        end = timeout and time.monotonic() + timeout or None
+        if policy.hedge_delay > 0 and policy.retries > 0:
+            return self.call_hedged(arg, option, end, timeout)
+        return self.call_retried(arg, option, end, timeout)
+
+    def attempt_option(self, option, end: typing.Union[float, None], timeout: typing.Union[float, None]):
+        """
+        单次调用的 option, timeout 为剩余的时间, 已经超时时抛出 DeadlineExceeded
+        """
+        if end is None:
+            return option
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.policy.name, timeout)
+        return with_timeout(option, remaining, self.option_type)
+
+    def call_once(self, arg, option=None):
+        """
+        在线程池中执行的单次调用
+        """
+        if self.scope is None:
+            return self.context.call(arg, option=option)
+        with self.scope(self.context):
+            return self.context.call(arg, option=option)
+
+    def call_retried(self, arg, option=None, end: float = None, timeout: float = None):
+        policy = self.policy
+        attempt = 0
+        while True:
+            try:
+                result = self.context.call(arg, option=self.attempt_option(option, end, timeout))
+                policy.budget.on_success()
+                return result
+            except Exception as e:
+                if not policy.is_retryable(e):
+                    raise
+                policy.budget.on_failure()
+                if attempt >= policy.retries or not policy.budget.allow():
+                    raise
+            backoff = random.uniform(0, min(max_backoff, initial_backoff * (2 ** attempt)))
+            if end is not None:
+                backoff = min(backoff, max(0.0, end - time.monotonic()))
+            attempt += 1
+            time.sleep(backoff)
+
+    def start_attempt(self, arg, option, end: float, timeout: float) -> typing.Union[futures.Future, None]:
+        """
+        发出一次对冲的调用, 线程池已满时返回 None
+        """
+        call_future = getattr(self.context, "call_future", None)
+        if call_future is not None:
+            return wrap_call(call_future(arg, option=self.attempt_option(option, end, timeout)))
+        return get_executor().try_submit(self.call_once, arg, self.attempt_option(option, end, timeout))
+
+    def call_hedged(self, arg, option=None, end: float = None, timeout: float = None):
+        policy = self.policy
+        first = self.start_attempt(arg, option, end, timeout)
+        if first is None:
+            return self.call_retried(arg, option, end, timeout)
+
+        pending = {first}
+        attempts = 1
+        error = None
+        try:
+            while pending:
+                wait = policy.hedge_delay if attempts <= policy.retries else None
+                if end is not None:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceeded(policy.name, timeout)
+                    wait = remaining if wait is None else min(wait, remaining)
+
+                done, pending = futures.wait(pending, wait, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if not policy.is_retryable(e):
+                            raise
+                        policy.budget.on_failure()
+                        error = e
+                        continue
+                    policy.budget.on_success()
+                    return result
+
+                if attempts <= policy.retries and (done or policy.budget.allow()):
+                    # 等待超时或上一次调用失败时，发出下一次调用, 超时发出的对冲调用同样消耗预算,
+                    # 后端整体变慢时对冲调用的比例不超过 token_ratio
+                    future = self.start_attempt(arg, option, end, timeout)
+                    if future is None:
+                        # 线程池已满时不再对冲
+                        attempts = policy.retries + 1
+                        continue
+                    if not done:
+                        policy.budget.on_failure()
+                    pending.add(future)
+                    attempts += 1
+                elif not pending:
+                    break
+        finally:
+            for future in pending:
+                cancel_attempt(future)
+
+        raise error
+
+
+# 每个服务共用的预算
+_budgets: typing.Dict[str, RetryBudget] = {}
+
+
+def get_budget(service: str) -> RetryBudget:
+    budget = _budgets.get(service)
+    if budget is None:
+        budget = _budgets.setdefault(service, RetryBudget())
+    return budget
+
+
+def build_service_config(policies: typing.Iterable[CallPolicy]) -> str:
+    """
+    将同一服务所有接口的策略转换为 grpc.service_config 的 json
+    """
+    policies = list(policies)
+    config = {"methodConfig": [policy.method_config() for policy in policies]}
+    if policies and any(policy.retries > 0 for policy in policies):
+        config["retryThrottling"] = policies[0].budget.to_config()
+    return json.dumps(config)
+
+
+def channel_options(config: str) -> typing.List[typing.Tuple[str, typing.Any]]:
+    """
+    使用 service config 创建 channel 时的 options
+    """
+    if not config:
+        return []
+    return [("grpc.service_config", config), ("grpc.enable_retries", 1)]
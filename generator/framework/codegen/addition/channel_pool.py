@@ -0,0 +1,176 @@
+"""
+客户端的 channel 池, 每个副本地址建立多个 channel, 每次调用选择进行中请求数最少的 channel,
+避免所有请求共用一条 HTTP/2 连接, 同时用于异步客户端 (aio.AioServiceClient) 及同步客户端 (client.PooledServiceClient)
+
+副本地址由 resolver 提供，并定期重新解析，被移除的副本在宽限期后关闭
+"""
+
+import asyncio
+import os
+import threading
+import time
+import typing
+
+from .resolver import Resolver, get_resolver
+
+# 重新解析副本地址的间隔秒数
+default_refresh_interval = 30.0
+
+# 被移除的副本上进行中的请求的宽限秒数
+close_grace = 5.0
+
+
+def get_pool_size(rpc_name: str, pool_size: int) -> int:
+    """
+    获取每个副本的 channel 数, 环境变量 RPC_<RPC_NAME>_POOL_SIZE 优先于生成时指定的值
+    """
+    value = os.environ.get("RPC_%s_POOL_SIZE" % rpc_name.upper())
+    return max(1, int(value) if value else pool_size)
+
+
+def aclose_later(channel):
+    """
+    在宽限期后关闭 grpc.aio 的 channel, 需要在事件循环中调用
+    """
+    asyncio.ensure_future(channel.close(close_grace))
+
+
+def close_later(channel):
+    """
+    在宽限期后关闭同步的 grpc.Channel
+    """
+    timer = threading.Timer(close_grace, channel.close)
+    timer.daemon = True
+    timer.start()
+
+
+class PooledChannel(object):
+    """
+    池中的单个 channel 及其 stub
+    """
+    __slots__ = ("target", "channel", "stub", "outstanding")
+
+    def __init__(self, target: str, channel, stub):
+        self.target = target
+        self.channel = channel
+        self.stub = stub
+        self.outstanding = 0
+
+
+class ChannelPool(object):
+    """
+    单个服务的 channel 池, acquire 及 release 可以在多个线程中调用
+    """
+
+    def __init__(
+            self,
+            rpc_name: str,
+            stub_type,
+            channel_factory: typing.Callable[[str], typing.Any],
+            pool_size: int = 1,
+            resolver: Resolver = None,
+            refresh_interval: float = default_refresh_interval,
+            close_channel: typing.Callable = aclose_later
+    ):
+        """
+        :param rpc_name: 服务名
+        :param stub_type: 生成的 Stub 类型
+        :param channel_factory: 根据地址创建 channel 的函数
+        :param pool_size: 每个副本的 channel 数，可以被 RPC_<RPC_NAME>_POOL_SIZE 覆盖
+        :param resolver: 获取副本地址的 resolver, 默认使用 get_resolver()
+        :param refresh_interval: 重新解析副本地址的间隔秒数, 为 0 时不重新解析
+        :param close_channel: 关闭被移除的副本的 channel 的函数, 同步客户端使用 close_later
+        """
+        self.rpc_name = rpc_name
+        self.stub_type = stub_type
+        self.channel_factory = channel_factory
+        self.pool_size = get_pool_size(rpc_name, pool_size)
+        self.resolver = resolver or get_resolver()
+        self.refresh_interval = refresh_interval
+        self.close_channel = close_channel
+        self.targets: typing.List[str] = []
+        self.channels: typing.List[PooledChannel] = []
+        self._next = 0
+        self._resolved_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        重新解析副本地址，为新增的副本建立 channel, 关闭被移除的副本的 channel
+        """
+        self._resolved_at = time.monotonic()
+        targets = self.resolver.resolve(self.rpc_name)
+        if not targets:
+            if not self.channels:
+                raise RuntimeError("服务 %s 没有可用的地址" % self.rpc_name)
+            # 解析失败时继续使用已有的副本
+            return
+        if targets == self.targets:
+            return
+
+        channels = [channel for channel in self.channels if channel.target in targets]
+        for channel in self.channels:
+            if channel.target not in targets:
+                self.close_channel(channel.channel)
+        for target in targets:
+            if target not in self.targets:
+                for _ in range(self.pool_size):
+                    channel = self.channel_factory(target)
+                    channels.append(PooledChannel(target, channel, self.stub_type(channel)))
+
+        self.targets = list(targets)
+        self.channels = channels
+
+    def acquire(self) -> PooledChannel:
+        """
+        选择进行中请求数最少的 channel, 数量相同时轮流选择, 使用完毕后需要调用 release
+        """
+        with self._lock:
+            if not self.channels or (
+                    self.refresh_interval and time.monotonic() - self._resolved_at > self.refresh_interval):
+                self.refresh()
+
+            channels = self.channels
+            count = len(channels)
+            start = self._next % count
+            self._next = start + 1
+            best = channels[start]
+            if best.outstanding:
+                for index in range(1, count):
+                    channel = channels[(start + index) % count]
+                    if channel.outstanding < best.outstanding:
+                        best = channel
+                        if not best.outstanding:
+                            break
+
+            best.outstanding += 1
+            return best
+
+    def release(self, channel: PooledChannel):
+        with self._lock:
+            channel.outstanding -= 1
+
+    def get_stats(self) -> typing.List[typing.Tuple[str, int]]:
+        """
+        获取每个 channel 的地址及进行中的请求数
+        """
+        return [(channel.target, channel.outstanding) for channel in self.channels]
+
+    def take_channels(self) -> typing.List[PooledChannel]:
+        """
+        取出所有 channel, 之后的调用会重新解析并建立 channel
+        """
+        with self._lock:
+            channels, self.channels, self.targets = self.channels, [], []
+        return channels
+
+    async def close(self):
+        for channel in self.take_channels():
+            await channel.channel.close()
+
+    def close_sync(self):
+        """
+        close 的同步版本, 用于同步客户端
+        """
+        for channel in self.take_channels():
+            channel.channel.close()
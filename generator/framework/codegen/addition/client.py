@@ -0,0 +1,121 @@
+"""
+使用 channel 池的同步客户端, 服务的 channel_pool_size 大于 1 时代替 runtime 的 ServiceClient,
+每个副本建立多个 channel, 每次调用选择进行中请求数最少的 channel, 接口与 aio.AioServiceClient 保持一致
+"""
+
+import threading
+import typing
+
+import grpc
+
+from .channel_pool import ChannelPool, close_later
+from .resolver import Resolver, StaticResolver, split_targets
+from .sampling import outgoing_metadata
+
+# 同步客户端注册的 Stub 类型, key 为 rpc_name
+_client_stubs: typing.Dict[str, typing.Callable] = {}
+
+
+def reg_client(rpc_name: str, stub_type):
+    """
+    注册服务的 Stub 类型, 对应 runtime 中的 reg_client
+    """
+    _client_stubs[rpc_name] = stub_type
+
+
+class CallContext(object):
+    """
+    单个 rpc 方法的调用上下文, 每次调用选择进行中请求数最少的 channel
+    """
+
+    def __init__(self, name: str, pool: ChannelPool):
+        self.name = name
+        self.pool = pool
+
+    def call(self, arg, option=None):
+        """
+        :param arg: 生成的 Arg 类型，需要提供 convert_pb2
+        :param option: RPCOption, 目前只使用其中的 timeout
+        :return: 调用得到的 pb2 结果, server streaming 的接口返回迭代器
+        """
+        timeout = getattr(option, "timeout", None)
+        channel = self.pool.acquire()
+        try:
+            result = getattr(channel.stub, self.name)(
+                arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata())
+        except BaseException:
+            self.pool.release(channel)
+            raise
+        if hasattr(result, "__next__"):
+            return self.iter_stream(channel, result)
+        self.pool.release(channel)
+        return result
+
+    def call_future(self, arg, option=None):
+        """
+        非阻塞地调用 unary 接口, 返回可以取消的 grpc.Future, 用于 call_policy 的对冲
+        """
+        timeout = getattr(option, "timeout", None)
+        channel = self.pool.acquire()
+        try:
+            call = getattr(channel.stub, self.name).future(
+                arg.convert_pb2(), timeout=timeout, metadata=outgoing_metadata())
+        except BaseException:
+            self.pool.release(channel)
+            raise
+        call.add_done_callback(lambda _: self.pool.release(channel))
+        return call
+
+    def iter_stream(self, channel, responses: typing.Iterator) -> typing.Iterator:
+        # 迭代结束前一直计入该 channel 进行中的请求数
+        try:
+            yield from responses
+        finally:
+            self.pool.release(channel)
+
+
+class PooledServiceClient(object):
+    """
+    使用 channel 池的同步客户端基类, 使用完毕后可以调用 close 关闭所有 channel
+
+    副本地址默认由 resolver.get_resolver() 提供, 每个副本建立 pool_size 个 channel,
+    pool_size 由生成的子类指定, 可以被 RPC_<RPC_NAME>_POOL_SIZE 覆盖
+    """
+    from_project = ""
+    rpc_name = ""
+    pool_size = 1
+
+    def __init__(self, target: str = "", resolver: Resolver = None, options: typing.Sequence = ()):
+        """
+        :param target: 逗号分隔的副本地址，指定时不使用 resolver
+        :param resolver: 获取副本地址的 resolver
+        :param options: 创建 channel 时的 options
+        """
+        self.resolver = target and StaticResolver(split_targets(target)) or resolver
+        self.options = list(options)
+        self.pool: typing.Union[ChannelPool, None] = None
+        self._lock = threading.Lock()
+
+    def get_pool(self) -> ChannelPool:
+        with self._lock:
+            if self.pool is None:
+                self.pool = ChannelPool(
+                    self.rpc_name, _client_stubs[self.rpc_name],
+                    lambda target: grpc.insecure_channel(target, options=self.options), self.pool_size,
+                    self.resolver, close_channel=close_later)
+            return self.pool
+
+    def get_context(self, name: str) -> CallContext:
+        return CallContext(name, self.pool or self.get_pool())
+
+    def close(self):
+        with self._lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.close_sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,118 @@
+"""
+列式 (struct-of-arrays) 编码的列表返回值
+"""
+
+import typing
+
+from collections.abc import Sequence
+
+
+class ColumnarResult(Sequence):
+    """
+    按列保存 List[Dict] 类型的返回值，每一列对应 pb2 中的一个 repeated 字段,
+    对外依然提供按行访问的列表接口，行对象只在被访问时才会构建
+
+    子类需要提供:
+        element_type: 行类型，可以使用列名作为关键字参数进行构建
+        column_names: 所有的列名
+        pb2_type: 对应的 pb2 类型
+    """
+    element_type: typing.Any = None
+    column_names: typing.Tuple[str, ...] = ()
+    pb2_type: typing.Any = None
+
+    def __init__(self, columns: typing.Dict[str, list] = None):
+        self._columns = columns or {name: [] for name in self.column_names}
+        self._rows = None
+
+    def __len__(self):
+        if not self.column_names:
+            return 0
+        return len(self._columns[self.column_names[0]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.rows()[index]
+
+        if self._rows is not None:
+            return self._rows[index]
+
+        return self.element_type(**{name: self._columns[name][index] for name in self.column_names})
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.rows())
+
+    def rows(self) -> list:
+        """
+        获取按行构建的结果，构建后会被缓存
+        """
+        if self._rows is None:
+            element_type = self.element_type
+            names = self.column_names
+            self._rows = [
+                element_type(**dict(zip(names, values)))
+                for values in zip(*(self._columns[name] for name in names))
+            ]
+        return self._rows
+
+    def columns(self) -> typing.Dict[str, list]:
+        """
+        获取按列保存的结果，返回的是内部数据，使用者不应修改
+        """
+        return self._columns
+
+    def to_numpy(self) -> dict:
+        """
+        将每一列转换为 numpy 数组，需要安装 numpy
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("ColumnarResult.to_numpy 需要安装 numpy")
+
+        return {name: numpy.asarray(self._columns[name]) for name in self.column_names}
+
+    @classmethod
+    def from_rows(cls, rows: typing.Iterable) -> "ColumnarResult":
+        """
+        从行数据构建结果，行可以是 element_type 的实例，也可以是 dict
+        """
+        if isinstance(rows, ColumnarResult):
+            return rows
+
+        rows = list(rows or [])
+        if rows and isinstance(rows[0], dict):
+            columns = {name: [row.get(name) for row in rows] for name in cls.column_names}
+        else:
+            columns = {name: [getattr(row, name) for row in rows] for name in cls.column_names}
+
+        result = cls(columns)
+        return result
+
+    @classmethod
+    def to_pb2(cls, rows: typing.Iterable):
+        """
+        服务端使用，将实现返回的行数据直接转为 pb2 类型
+        """
+        return cls.from_rows(rows).convert_pb2()
+
+    def convert_pb2(self):
+        result = self.pb2_type()
+        for name in self.column_names:
+            getattr(result, name).extend(self._columns[name])
+        return result
+
+    def from_pb2(self, context, allow_addition: bool = False):
+        self._columns = {name: list(getattr(context, name)) for name in self.column_names}
+        self._rows = None
+
+    def from_dict(self, context, allow_addition: bool = False):
+        context = context or {}
+        self._columns = {name: list(context.get(name) or []) for name in self.column_names}
+        self._rows = None
@@ -0,0 +1,106 @@
+"""
+servicer 复用 impl 实例, 避免每次请求都执行 impl 构造函数中的初始化逻辑
+
+复用的 impl 在每次请求前会收到新的 ctx:
+    1. impl 实现了 set_context(ctx) 时会被调用
+    2. 否则直接赋值给 impl.ctx, 避免沿用之前请求 (已结束的 RPC) 的 ctx
+    3. 也可以通过 current_context() 获取当前请求的 ctx
+"""
+
+import contextlib
+import contextvars
+import threading
+import typing
+
+from collections import deque
+
+# 当前请求的 ctx
+_current_context: contextvars.ContextVar = contextvars.ContextVar("rpc_impl_context", default=None)
+
+# 对象池的默认大小
+default_pool_size = 8
+
+
+def current_context():
+    """
+    获取当前请求的 ctx, 不在请求中时返回 None
+    """
+    return _current_context.get()
+
+
+def bind_context(impl, ctx):
+    """
+    将当前请求的 ctx 交给复用的 impl, 没有 set_context 时直接替换 impl.ctx
+    """
+    setter = getattr(impl, "set_context", None)
+    if setter is not None:
+        setter(ctx)
+    else:
+        impl.ctx = ctx
+
+
+class ThreadLocalImpl(object):
+    """
+    每个线程持有一个 impl 实例, 只适用于同步的 servicer
+    """
+
+    def __init__(self, impl_type):
+        self.impl_type = impl_type
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def use(self, ctx):
+        local = self._local
+        impl = getattr(local, "impl", None)
+        if impl is None:
+            impl = local.impl = self.impl_type(ctx)
+        elif getattr(local, "busy", False):
+            # 同一线程内重入时 (如进程内直接调用), 使用临时的实例，避免替换正在使用的实例的 ctx
+            impl = self.impl_type(ctx)
+        else:
+            bind_context(impl, ctx)
+
+        owner = not getattr(local, "busy", False)
+        local.busy = True
+        token = _current_context.set(ctx)
+        try:
+            yield impl
+        finally:
+            if owner:
+                local.busy = False
+            try:
+                _current_context.reset(token)
+            except ValueError:
+                pass
+
+
+class ImplPool(object):
+    """
+    有上限的 impl 对象池, 池中没有空闲实例时直接创建新的实例而不等待, 归还时超出上限的实例会被丢弃,
+    因此也可以在 grpc.aio 的 servicer 中使用
+    """
+
+    def __init__(self, impl_type, size: int = default_pool_size):
+        self.impl_type = impl_type
+        self.size = size
+        self._idle: typing.Deque = deque()
+
+    @contextlib.contextmanager
+    def use(self, ctx):
+        try:
+            impl = self._idle.pop()
+            bind_context(impl, ctx)
+        except IndexError:
+            impl = self.impl_type(ctx)
+
+        token = _current_context.set(ctx)
+        try:
+            yield impl
+        finally:
+            try:
+                _current_context.reset(token)
+            except ValueError:
+                # streaming 接口的生成器可能在其它上下文中被关闭
+                pass
+            if len(self._idle) < self.size:
+                self._idle.append(impl)
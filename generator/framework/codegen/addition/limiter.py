@@ -0,0 +1,172 @@
+"""
+服务端单个接口的并发限制, 达到上限且等待超时后直接返回 RESOURCE_EXHAUSTED, 避免慢接口占满线程池
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import typing
+
+# 所有已创建的限制器，key 为 Service.method
+_limiters: typing.Dict[str, "MethodLimiter"] = {}
+
+# 运行时覆盖生成时参数的配置文件，格式为 {"Service.method": {"max_concurrency": 4, "queue_timeout": 0.1}}
+_override: typing.Union[typing.Dict[str, typing.Dict[str, typing.Any]], None] = None
+
+# 被拒绝时的回调，参数为 Service.method, 用于接入监控
+_reject_hooks: typing.List[typing.Callable[[str], None]] = []
+
+
+def get_override(name: str) -> typing.Dict[str, typing.Any]:
+    """
+    获取环境变量 RPC_LIMIT_FILE 指定的文件中，该接口的配置
+    """
+    global _override
+    if _override is None:
+        _override = {}
+        limit_file = os.environ.get("RPC_LIMIT_FILE")
+        if limit_file:
+            with open(limit_file, "r") as f:
+                _override = json.load(f)
+    return _override.get(name, {})
+
+
+def on_reject(hook: typing.Callable[[str], None]):
+    """
+    注册请求被拒绝时的回调
+    """
+    _reject_hooks.append(hook)
+
+
+def get_stats() -> typing.Dict[str, typing.Dict[str, int]]:
+    """
+    获取所有限制器的当前状态
+    """
+    return {
+        name: {"max_concurrency": limiter.max_concurrency, "in_flight": limiter.in_flight,
+               "rejected": limiter.rejected}
+        for (name, limiter) in _limiters.items()
+    }
+
+
+class LimitExceeded(Exception):
+    """
+    接口的并发请求数达到上限, 由 servicer 的 handle_errors 转换为 RESOURCE_EXHAUSTED,
+    在 Batch 的子请求中只使该子请求失败
+    """
+
+    def __init__(self, name: str, message: str):
+        super().__init__(message)
+        self.name = name
+        self.message = message
+
+
+class MethodLimiter(object):
+    """
+    同步 servicer 使用的并发限制器, eg:
+
+        with limiter.admit():
+            ...
+    """
+
+    def __init__(self, name: str, max_concurrency: int, queue_timeout: float = 0):
+        """
+        :param name: Service.method
+        :param max_concurrency: 最大并发数，可以被 RPC_LIMIT_FILE 覆盖
+        :param queue_timeout: 达到上限时等待空闲的最长秒数, 为 0 时不等待
+        """
+        override = get_override(name)
+        self.name = name
+        self.max_concurrency = int(override.get("max_concurrency", max_concurrency))
+        self.queue_timeout = float(override.get("queue_timeout", queue_timeout))
+        self.rejected = 0
+        self.in_flight = 0
+        # 保护 rejected 及 in_flight, 同步 servicer 在多个线程中同时更新
+        self._lock = threading.Lock()
+        self._semaphore = self.create_semaphore()
+        _limiters[name] = self
+
+    def create_semaphore(self):
+        return threading.BoundedSemaphore(self.max_concurrency)
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def reject(self) -> LimitExceeded:
+        with self._lock:
+            self.rejected += 1
+        for hook in _reject_hooks:
+            hook(self.name)
+        return LimitExceeded(self.name, "%s 的并发请求数已达到上限 %d" % (self.name, self.max_concurrency))
+
+    @contextlib.contextmanager
+    def admit(self):
+        """
+        进入限制的范围, 达到上限且等待超时时抛出 LimitExceeded
+        """
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        if self.queue_timeout > 0:
+            acquired = self._semaphore.acquire(timeout=self.queue_timeout)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        if not acquired:
+            raise self.reject()
+
+        self.enter()
+        try:
+            yield
+        finally:
+            self.exit()
+            self._semaphore.release()
+
+
+class AsyncMethodLimiter(MethodLimiter):
+    """
+    grpc.aio servicer 使用的并发限制器, eg:
+
+        async with limiter.admit():
+            ...
+    """
+
+    def create_semaphore(self):
+        # asyncio.Semaphore 需要在事件循环中创建, 首次使用时才创建
+        return None
+
+    @contextlib.asynccontextmanager
+    async def admit(self):
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.BoundedSemaphore(self.max_concurrency)
+
+        acquired = True
+        if self.queue_timeout > 0:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                acquired = False
+        elif self._semaphore.locked():
+            acquired = False
+        else:
+            await self._semaphore.acquire()
+        if not acquired:
+            raise self.reject()
+
+        self.enter()
+        try:
+            yield
+        finally:
+            self.exit()
+            self._semaphore.release()
@@ -0,0 +1,326 @@
+"""
+客户端与服务端处于同一进程时，客户端直接调用 servicer, 不经过 channel 及序列化, 有两种方式:
+
+    直接调用: 通过 LocalService 调用 servicer 生成的 local_<name>, Arg 直接传给 impl, 返回 impl 的 Result,
+        不经过 pb2 的转换, 与普通的函数调用相同, RPC_LOCAL_COPY=1 时深拷贝参数及返回值, 使调用双方互不影响
+    经过 servicer: 需要服务端限流、参数校验、监控或分页限制等处理的接口, 通过 LocalCallContext 调用 servicer 的方法,
+        参数及返回值仍转换为 pb2 消息, 服务端及客户端的处理与远程调用一致
+
+服务端与客户端的代码位于不同的目录，各自持有一份 addition, 因此注册表保存在 sys.modules 中共享的模块上
+"""
+
+import copy
+import inspect
+import os
+import sys
+import time
+import types
+import typing
+
+import grpc
+
+from .sampling import outgoing_metadata
+
+# 保存注册表的模块名
+registry_module_name = "_rpc_local_registry"
+
+
+def get_registry() -> typing.Dict[str, typing.Any]:
+    """
+    获取进程内共享的注册表，key 为 from_project.rpc_name, value 为 servicer 的类型
+    """
+    module = sys.modules.get(registry_module_name)
+    if module is None:
+        module = types.ModuleType(registry_module_name)
+        module.services = {}
+        module = sys.modules.setdefault(registry_module_name, module)
+    return module.services
+
+
+def service_key(from_project: str, rpc_name: str) -> str:
+    return "%s.%s" % (from_project, rpc_name)
+
+
+def reg_local(servicer_type):
+    """
+    注册可以在进程内直接调用的 servicer, servicer 需要提供 from_project 及 rpc_name
+    """
+    get_registry()[service_key(servicer_type.from_project, servicer_type.rpc_name)] = servicer_type
+
+
+def is_enabled() -> bool:
+    """
+    是否启用进程内直接调用, 可以通过环境变量 RPC_LOCAL=0 关闭
+    """
+    return os.environ.get("RPC_LOCAL", "1") != "0"
+
+
+def is_copy() -> bool:
+    """
+    直接调用时是否深拷贝参数及返回值, 可以通过环境变量 RPC_LOCAL_COPY=1 开启
+    """
+    return os.environ.get("RPC_LOCAL_COPY", "0") == "1"
+
+
+class LocalRpcError(grpc.RpcError):
+    """
+    进程内调用失败时客户端收到的异常, 与远程调用的 grpc.RpcError 一样提供 code 及 details
+    """
+
+    def __init__(self, code: grpc.StatusCode, details: str, trailing_metadata=None):
+        super().__init__("%s: %s" % (code.name, details))
+        self._code = code
+        self._details = details
+        self._trailing_metadata = trailing_metadata
+
+    def code(self) -> grpc.StatusCode:
+        return self._code
+
+    def details(self) -> str:
+        return self._details
+
+    def trailing_metadata(self):
+        return self._trailing_metadata
+
+
+def application_error(e: Exception) -> LocalRpcError:
+    """
+    servicer 抛出的其它异常与远程调用一样转换为 UNKNOWN
+    """
+    return LocalRpcError(grpc.StatusCode.UNKNOWN, "Exception calling application: %s" % e)
+
+
+class LocalServicerContext(object):
+    """
+    进程内调用时传给 servicer 的 ServicerContext, 提供生成的代码使用到的方法
+    """
+
+    def __init__(self, timeout: typing.Union[float, None] = None):
+        self.deadline = timeout and time.monotonic() + timeout
+        self.metadata = outgoing_metadata() or ()
+        self.trailing = None
+
+    def invocation_metadata(self):
+        return self.metadata
+
+    def set_trailing_metadata(self, trailing_metadata):
+        self.trailing = trailing_metadata
+
+    def time_remaining(self) -> typing.Union[float, None]:
+        if not self.deadline:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def is_active(self) -> bool:
+        return True
+
+    def peer(self) -> str:
+        return "local"
+
+    def abort(self, code: grpc.StatusCode, details: str):
+        raise LocalRpcError(code, details, self.trailing)
+
+
+class AsyncLocalServicerContext(LocalServicerContext):
+    """
+    异步 servicer 使用的 LocalServicerContext
+    """
+
+    async def abort(self, code: grpc.StatusCode, details: str):
+        raise LocalRpcError(code, details, self.trailing)
+
+
+class LocalCallContext(object):
+    """
+    代替 runtime 的调用上下文, call 直接调用 servicer 的方法, 其它属性使用原来的 context,
+    因此可以照常传给 TraceContext、CallPolicy 及 SingleFlight
+    """
+    # 不使用原来的 context 的 call_future, CallPolicy 对冲时改为在线程池中调用 call
+    call_future = None
+
+    def __init__(self, context, servicer, name: str):
+        self.context = context
+        self.servicer = servicer
+        self.name = name
+
+    def __getattr__(self, item):
+        return getattr(self.context, item)
+
+    def call(self, arg, option=None):
+        """
+        :param arg: 生成的 Arg 类型，需要提供 convert_pb2
+        :param option: RPCOption, 其中的 timeout 作为 servicer 的 time_remaining
+        :return: servicer 返回的 pb2 结果, server streaming 的接口返回迭代器
+        """
+        servicer_context = LocalServicerContext(getattr(option, "timeout", None))
+        try:
+            result = getattr(self.servicer, self.name)(arg.convert_pb2(), servicer_context)
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+        if inspect.isgenerator(result):
+            return self.iter_stream(result)
+        return result
+
+    @staticmethod
+    def iter_stream(result: typing.Iterator, copy_value: bool = False) -> typing.Iterator:
+        try:
+            for item in result:
+                yield copy.deepcopy(item) if copy_value else item
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+
+
+async def _aiter(messages: typing.Iterable) -> typing.AsyncIterator:
+    for message in messages:
+        yield message
+
+
+class AsyncLocalCallContext(LocalCallContext):
+    """
+    LocalCallContext 的异步版本, 与 AioCallContext 一样提供 call 及 stream
+    """
+
+    def convert_request(self, arg):
+        request = arg.convert_pb2()
+        # client streaming 的参数在异步 servicer 中通过 async for 迭代
+        if hasattr(request, "__next__"):
+            request = _aiter(request)
+        return request
+
+    async def call(self, arg, option=None):
+        servicer_context = AsyncLocalServicerContext(getattr(option, "timeout", None))
+        try:
+            result = getattr(self.servicer, self.name)(self.convert_request(arg), servicer_context)
+            if inspect.isawaitable(result):
+                result = await result
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+        return result
+
+    async def stream(self, arg, option=None) -> typing.AsyncIterator:
+        servicer_context = AsyncLocalServicerContext(getattr(option, "timeout", None))
+        try:
+            result = getattr(self.servicer, self.name)(self.convert_request(arg), servicer_context)
+            if hasattr(result, "__aiter__"):
+                async for item in result:
+                    yield item
+            else:
+                for item in result:
+                    yield item
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+
+
+class LocalService(object):
+    """
+    直接调用 servicer 生成的 local_<name>, 参数为客户端的 Arg, 返回 impl 的 Result,
+    impl 抛出的异常与经过 servicer 时一样转换为 LocalRpcError
+    """
+
+    def __init__(self, servicer):
+        self.servicer = servicer
+
+    def call(self, name: str, arg, option=None):
+        """
+        :param name: 接口名
+        :param arg: 生成的 Arg 类型
+        :param option: RPCOption, 其中的 timeout 作为 servicer 的 time_remaining
+        :return: impl 返回的 Result, server streaming 的接口返回迭代器
+        """
+        copy_value = is_copy()
+        if copy_value:
+            arg = copy.deepcopy(arg)
+        servicer_context = LocalServicerContext(getattr(option, "timeout", None))
+        try:
+            result = getattr(self.servicer, "local_" + name)(arg, servicer_context)
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+        if inspect.isgenerator(result):
+            return LocalCallContext.iter_stream(result, copy_value)
+        return copy.deepcopy(result) if copy_value else result
+
+    async def acall(self, name: str, arg, option=None):
+        """
+        call 的异步版本
+        """
+        copy_value = is_copy()
+        if copy_value:
+            arg = copy.deepcopy(arg)
+        servicer_context = AsyncLocalServicerContext(getattr(option, "timeout", None))
+        try:
+            result = await getattr(self.servicer, "local_" + name)(arg, servicer_context)
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+        return copy.deepcopy(result) if copy_value else result
+
+    async def astream(self, name: str, arg, option=None) -> typing.AsyncIterator:
+        """
+        异步模式下 server streaming 的接口
+        """
+        copy_value = is_copy()
+        if copy_value:
+            arg = copy.deepcopy(arg)
+        servicer_context = AsyncLocalServicerContext(getattr(option, "timeout", None))
+        try:
+            async for item in getattr(self.servicer, "local_" + name)(arg, servicer_context):
+                yield copy.deepcopy(item) if copy_value else item
+        except LocalRpcError:
+            raise
+        except Exception as e:
+            raise application_error(e) from e
+
+
+# 客户端已创建的 LocalService
+_services: typing.Dict[str, LocalService] = {}
+
+
+def get_local(from_project: str, rpc_name: str) -> typing.Union[LocalService, None]:
+    """
+    客户端使用, 获取当前进程内注册的 servicer, 不存在或通过 RPC_LOCAL=0 关闭时返回 None,
+    RPC_LOCAL 在每次调用时检查, 运行中关闭后之后的调用都经过 channel
+    """
+    if not is_enabled():
+        return None
+    key = service_key(from_project, rpc_name)
+    service = _services.get(key)
+    if service is None:
+        servicer_type = get_registry().get(key)
+        if servicer_type is None:
+            return None
+        service = _services[key] = LocalService(servicer_type())
+    return service
+
+
+def bind_local(context, client, name: str):
+    """
+    客户端使用, 同一进程中注册了对应的 servicer 时返回直接调用其 name 方法的 LocalCallContext, 否则返回 context
+    :param context: get_context 得到的调用上下文
+    :param client: 生成的客户端, 提供 from_project 及 rpc_name
+    :param name: servicer 的方法名
+    """
+    service = get_local(client.from_project, client.rpc_name)
+    if service is None:
+        return context
+    return LocalCallContext(context, service.servicer, name)
+
+
+def abind_local(context, client, name: str):
+    """
+    bind_local 的异步版本
+    """
+    service = get_local(client.from_project, client.rpc_name)
+    if service is None:
+        return context
+    return AsyncLocalCallContext(context, service.servicer, name)
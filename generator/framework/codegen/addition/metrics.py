@@ -0,0 +1,225 @@
+"""
+rpc 调用的进程内监控，按接口记录延迟直方图、进行中的请求数、请求及返回的字节数及错误数,
+并以 Prometheus 的文本格式对外提供
+
+每个线程只写入自己的分片，记录时不需要加锁，只有在导出时才合并所有分片
+"""
+
+import os
+import threading
+import time
+import typing
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 延迟直方图的默认分桶，单位为秒
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus 文本格式的 Content-Type
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MethodStats(object):
+    """
+    单个线程内，单个接口的统计数据
+    """
+    __slots__ = ("bucket_counts", "latency_sum", "started", "finished", "errors", "request_bytes",
+                 "response_bytes")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.started = 0
+        self.finished = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class CallTrack(object):
+    """
+    单次调用的记录, 由 MethodMetric.track 创建, eg:
+
+        with metric.track(request) as track:
+            return track.response(result.convert_pb2())
+    """
+    __slots__ = ("metric", "stats", "start")
+
+    def __init__(self, metric: "MethodMetric", request=None):
+        self.metric = metric
+        self.stats = stats = metric.local_stats()
+        if request is not None:
+            stats.request_bytes += request.ByteSize()
+        stats.started += 1
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def response(self, message):
+        """
+        记录返回的 pb2 消息大小，并原样返回
+        """
+        self.stats.response_bytes += message.ByteSize()
+        return message
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self.start
+        stats = self.stats
+        stats.bucket_counts[bisect_left(self.metric.buckets, elapsed)] += 1
+        stats.latency_sum += elapsed
+        stats.finished += 1
+        if exc_type is not None:
+            stats.errors += 1
+        return False
+
+
+class MethodMetric(object):
+    """
+    单个接口的监控数据, 由各线程的 MethodStats 分片组成
+    """
+
+    def __init__(self, name: str, side: str = "server", buckets: typing.Sequence[float] = default_buckets):
+        """
+        :param name: Service.method
+        :param side: server 或 client
+        :param buckets: 延迟直方图的分桶上限，单位为秒
+        """
+        self.name = name
+        self.side = side
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards: typing.List[MethodStats] = []
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def local_stats(self) -> MethodStats:
+        try:
+            return self._local.stats
+        except AttributeError:
+            stats = MethodStats(len(self.buckets))
+            with self._lock:
+                self._shards.append(stats)
+            self._local.stats = stats
+            return stats
+
+    def track(self, request=None) -> CallTrack:
+        """
+        记录一次调用
+        :param request: 请求的 pb2 消息，用于记录请求大小, 为 None 时不记录
+        """
+        return CallTrack(self, request)
+
+    def snapshot(self) -> MethodStats:
+        """
+        合并所有分片，得到当前的统计数据
+        """
+        with self._lock:
+            shards = list(self._shards)
+
+        total = MethodStats(len(self.buckets))
+        for shard in shards:
+            for (index, count) in enumerate(shard.bucket_counts):
+                total.bucket_counts[index] += count
+            total.latency_sum += shard.latency_sum
+            total.started += shard.started
+            total.finished += shard.finished
+            total.errors += shard.errors
+            total.request_bytes += shard.request_bytes
+            total.response_bytes += shard.response_bytes
+        return total
+
+
+class Registry(object):
+    """
+    进程内所有接口的监控数据
+    """
+
+    def __init__(self):
+        self.metrics: typing.Dict[typing.Tuple[str, str], MethodMetric] = {}
+        self.rejected: typing.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: MethodMetric):
+        self.metrics[(metric.side, metric.name)] = metric
+
+    def record_rejected(self, name: str):
+        """
+        记录被并发限制拒绝的请求, 由 limiter 的 on_reject 回调调用
+        """
+        with self._lock:
+            self.rejected[name] = self.rejected.get(name, 0) + 1
+
+    def to_prometheus(self) -> str:
+        """
+        以 Prometheus 的文本格式导出所有监控数据
+        """
+        lines = []
+        snapshots = [(metric, metric.snapshot()) for metric in list(self.metrics.values())]
+        for side in ("server", "client"):
+            side_snapshots = [(metric, stats) for (metric, stats) in snapshots if metric.side == side]
+            if not side_snapshots:
+                continue
+
+            prefix = "rpc_%s" % side
+            lines.append("# HELP %s_latency_seconds rpc latency" % prefix)
+            lines.append("# TYPE %s_latency_seconds histogram" % prefix)
+            for (metric, stats) in side_snapshots:
+                cumulative = 0
+                for (bound, count) in zip(list(metric.buckets) + ["+Inf"], stats.bucket_counts):
+                    cumulative += count
+                    lines.append("%s_latency_seconds_bucket{method=\"%s\",le=\"%s\"} %d" % (
+                        prefix, metric.name, bound, cumulative))
+                lines.append("%s_latency_seconds_sum{method=\"%s\"} %f" % (prefix, metric.name, stats.latency_sum))
+                lines.append("%s_latency_seconds_count{method=\"%s\"} %d" % (prefix, metric.name, stats.finished))
+
+            for (name, kind, help_text, value) in (
+                    ("in_flight", "gauge", "rpc calls in progress", lambda s: s.started - s.finished),
+                    ("requests_total", "counter", "finished rpc calls", lambda s: s.finished),
+                    ("errors_total", "counter", "rpc calls finished with an error", lambda s: s.errors),
+                    ("request_bytes_total", "counter", "serialized request bytes", lambda s: s.request_bytes),
+                    ("response_bytes_total", "counter", "serialized response bytes", lambda s: s.response_bytes),
+            ):
+                lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+                lines.append("# TYPE %s_%s %s" % (prefix, name, kind))
+                for (metric, stats) in side_snapshots:
+                    lines.append("%s_%s{method=\"%s\"} %d" % (prefix, name, metric.name, value(stats)))
+
+        if self.rejected:
+            lines.append("# HELP rpc_server_rejected_total rpc calls rejected by the concurrency limit")
+            lines.append("# TYPE rpc_server_rejected_total counter")
+            for (name, count) in sorted(self.rejected.items()):
+                lines.append("rpc_server_rejected_total{method=\"%s\"} %d" % (name, count))
+
+        return "\n".join(lines) + "\n"
+
+
+# 进程内唯一的 registry
+registry = Registry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port: int, address: str = "") -> ThreadingHTTPServer:
+    """
+    在后台线程中以 Prometheus 文本格式提供监控数据
+    :param port: 监听端口
+    :param address: 监听地址，默认使用环境变量 RPC_METRICS_ADDRESS 或 127.0.0.1
+    """
+    server = ThreadingHTTPServer((address or os.environ.get("RPC_METRICS_ADDRESS", "127.0.0.1"), port),
+                                 MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="rpc_metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,87 @@
+"""
+游标分页的辅助函数, 声明了 paginate 的接口每次只返回一页, 返回值中的 next_cursor 为空时表示没有下一页
+
+游标对客户端是不透明的字符串, impl 可以通过 encode_cursor / decode_cursor 将最后一行的排序键编码为游标,
+按排序键定位下一页的起点, 不需要像 offset 一样扫描并跳过之前的所有行
+"""
+
+import base64
+import copy
+import json
+import typing
+
+from .validate import ValidationError
+
+
+class InvalidCursor(ValidationError):
+    """
+    客户端传入的游标无法解码, 与参数校验错误一样, Flask 接口将其转换为 400, gRPC 服务端将其转换为 INVALID_ARGUMENT
+    """
+
+    def __init__(self, cursor: str):
+        super().__init__("cursor", "cursor", cursor)
+
+
+def encode_cursor(value) -> str:
+    """
+    将可以编码为 json 的值编码为游标
+    :param value: 通常为最后一行的排序键, eg: {"id": 1024} 或 [created_at, id]
+    """
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, default=None):
+    """
+    解码 encode_cursor 生成的游标
+    :param cursor: 客户端传入的游标
+    :param default: 游标为空时的返回值
+    :raise InvalidCursor: 游标不是 encode_cursor 生成的
+    """
+    if not cursor:
+        return default
+    try:
+        data = cursor.encode("ascii")
+        return json.loads(base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4)))
+    except ValueError:
+        raise InvalidCursor(cursor) from None
+
+
+def clamp_limit(limit: typing.Union[int, None], page_size: int, max_page_size: int) -> int:
+    """
+    将客户端传入的 limit 限制在 1 到 max_page_size 之间, 未指定时使用 page_size
+    """
+    if not limit or limit < 0:
+        return page_size
+    return min(limit, max_page_size)
+
+
+def iter_pages(call: typing.Callable, arg, option=None) -> typing.Iterator:
+    """
+    从 arg.cursor 开始逐页调用接口, 当前页的元素迭代完成后才请求下一页, 不会修改传入的 arg
+    :param call: 生成的客户端方法
+    :param arg: 接口的参数
+    :param option: 每次调用使用的 RPCOption
+    """
+    arg = copy.copy(arg)
+    while True:
+        page = call(arg, option)
+        if page.items:
+            yield from page.items
+        if not page.next_cursor:
+            return
+        arg.cursor = page.next_cursor
+
+
+async def aiter_pages(call: typing.Callable, arg, option=None) -> typing.AsyncIterator:
+    """
+    iter_pages 的异步版本
+    """
+    arg = copy.copy(arg)
+    while True:
+        page = await call(arg, option)
+        for item in page.items or ():
+            yield item
+        if not page.next_cursor:
+            return
+        arg.cursor = page.next_cursor
@@ -0,0 +1,197 @@
+"""
+rpc 服务地址的解析, 客户端通过 resolver 获取服务的所有副本地址
+
+内置的 resolver:
+    1. StaticResolver: 固定的地址列表
+    2. EnvResolver: 从环境变量 RPC_<RPC_NAME>_TARGETS、RPC_<RPC_NAME>_TARGET 或 RPC_TARGET 获取, 默认使用
+    3. LocalRegistryResolver: 基于本地 json 文件的注册中心，作为 consul / zookeeper 的本地替代,
+       服务端启动时注册自身地址，退出时注销
+
+其它注册中心只需实现 resolve(rpc_name) 并通过 set_resolver 设置
+"""
+
+import contextlib
+import json
+import os
+import typing
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 默认的服务地址
+default_target = "localhost:50051"
+
+
+class Resolver(object):
+    """
+    resolver 的基类
+    """
+
+    def resolve(self, rpc_name: str) -> typing.List[str]:
+        """
+        获取服务的所有副本地址
+        :param rpc_name: 服务名，即生成的客户端的 rpc_name
+        """
+        raise NotImplementedError()
+
+
+class StaticResolver(Resolver):
+    """
+    固定的地址列表, 可以所有服务共用一个列表，也可以按服务名分别指定
+    """
+
+    def __init__(self, targets: typing.Union[typing.List[str], typing.Dict[str, typing.List[str]]]):
+        self.targets = targets
+
+    def resolve(self, rpc_name: str) -> typing.List[str]:
+        if isinstance(self.targets, dict):
+            return list(self.targets.get(rpc_name, ()))
+        return list(self.targets)
+
+
+class EnvResolver(Resolver):
+    """
+    从环境变量获取地址, RPC_<RPC_NAME>_TARGETS 为逗号分隔的多个地址,
+    其次为 RPC_<RPC_NAME>_TARGET 及 RPC_TARGET
+    """
+
+    def resolve(self, rpc_name: str) -> typing.List[str]:
+        name = rpc_name.upper()
+        targets = os.environ.get("RPC_%s_TARGETS" % name) \
+            or os.environ.get("RPC_%s_TARGET" % name) \
+            or os.environ.get("RPC_TARGET", default_target)
+        return split_targets(targets)
+
+
+class LocalRegistryResolver(Resolver):
+    """
+    基于本地 json 文件的注册中心, 文件格式为 {"rpc_name": ["host:port", ...]}, 文件变化后重新读取,
+    注册及注销时持有文件锁，同一台机器上的多个进程可以共用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._services: typing.Dict[str, typing.List[str]] = {}
+
+    def resolve(self, rpc_name: str) -> typing.List[str]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        if mtime != self._mtime:
+            self._services = self.read()
+            self._mtime = mtime
+        return list(self._services.get(rpc_name, ()))
+
+    def read(self) -> typing.Dict[str, typing.List[str]]:
+        try:
+            with open(self.path, "r") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return {}
+        return json.loads(content) if content.strip() else {}
+
+    @contextlib.contextmanager
+    def update(self):
+        """
+        持有文件锁读取当前内容，修改后写入临时文件再替换，读取方不会读到写了一半的文件, 关闭锁文件时释放文件锁
+        """
+        with open(self.path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            services = self.read()
+            yield services
+            tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+            with open(tmp_path, "w") as f:
+                json.dump(services, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def register(self, rpc_name: str, target: str):
+        with self.update() as services:
+            targets = services.setdefault(rpc_name, [])
+            if target not in targets:
+                targets.append(target)
+
+    def deregister(self, rpc_name: str, target: str):
+        with self.update() as services:
+            targets = services.get(rpc_name, [])
+            if target in targets:
+                targets.remove(target)
+            if not targets:
+                services.pop(rpc_name, None)
+
+
+def split_targets(targets: str) -> typing.List[str]:
+    return [target.strip() for target in targets.split(",") if target.strip()]
+
+
+def get_registry_file() -> str:
+    """
+    本地注册中心的文件路径, 由环境变量 RPC_REGISTRY_FILE 指定
+    """
+    return os.environ.get("RPC_REGISTRY_FILE", "")
+
+
+_resolver: typing.Union[Resolver, None] = None
+
+
+def set_resolver(resolver: Resolver):
+    """
+    设置客户端使用的 resolver
+    """
+    global _resolver
+    _resolver = resolver
+
+
+def get_resolver() -> Resolver:
+    """
+    获取客户端使用的 resolver, 未设置时若指定了 RPC_REGISTRY_FILE 则使用 LocalRegistryResolver,
+    否则使用 EnvResolver
+    """
+    global _resolver
+    if _resolver is None:
+        registry_file = get_registry_file()
+        _resolver = registry_file and LocalRegistryResolver(registry_file) or EnvResolver()
+    return _resolver
+
+
+def advertise_address(address: str) -> str:
+    """
+    服务端注册到注册中心的地址, 优先使用环境变量 RPC_ADVERTISE_ADDRESS, 否则将监听的通配地址替换为 localhost
+    """
+    advertise = os.environ.get("RPC_ADVERTISE_ADDRESS")
+    if advertise:
+        return advertise
+    host, _, port = address.rpartition(":")
+    if host in ("", "[::]", "0.0.0.0"):
+        host = "localhost"
+    return "%s:%s" % (host, port)
+
+
+@contextlib.contextmanager
+def registered(rpc_names: typing.Iterable[str], address: str):
+    """
+    指定了 RPC_REGISTRY_FILE 时，在范围内将服务注册到本地注册中心, 退出时注销
+    :param rpc_names: 所有服务名
+    :param address: 服务端的监听地址
+    """
+    registry_file = get_registry_file()
+    if not registry_file:
+        yield
+        return
+
+    registry = LocalRegistryResolver(registry_file)
+    target = advertise_address(address)
+    rpc_names = list(rpc_names)
+    for rpc_name in rpc_names:
+        registry.register(rpc_name, target)
+    try:
+        yield
+    finally:
+        for rpc_name in rpc_names:
+            registry.deregister(rpc_name, target)
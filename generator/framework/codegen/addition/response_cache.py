@@ -0,0 +1,156 @@
+"""
+客户端的返回值缓存, 有上限的 LRU 缓存，每个条目在 ttl 秒后过期
+
+缓存保存的是 pb2 结果，每次命中时重新转换为 Result, 调用方修改返回值不会影响缓存
+"""
+
+import threading
+import time
+import typing
+
+from collections import OrderedDict
+from operator import attrgetter
+
+# 所有已创建的缓存，key 为 Service.method
+_caches: typing.Dict[str, "ResponseCache"] = {}
+
+
+def get_cache(name: str) -> "ResponseCache":
+    """
+    获取接口的缓存
+    :param name: Service.method
+    """
+    return _caches[name]
+
+
+def clear_all():
+    """
+    清空所有接口的缓存
+    """
+    for cache in list(_caches.values()):
+        cache.clear()
+
+
+def get_stats() -> typing.Dict[str, typing.Dict[str, int]]:
+    """
+    获取所有缓存的当前状态
+    """
+    return {name: cache.get_stats() for (name, cache) in _caches.items()}
+
+
+# 直接作为 key 的常见字段类型
+_scalar_types = frozenset((int, float, str, bytes, bool, type(None)))
+
+
+def hashable_key(value) -> typing.Hashable:
+    """
+    转换为可以作为缓存 key 的形式, 值相等的参数得到相等的 key: 列表递归转换为 tuple,
+    字典及集合转换为 frozenset, 与键的顺序无关, 生成的参数类型按身份计算 hash, 转换为类型名及各属性的值
+    """
+    if type(value) in _scalar_types:
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(hashable_key(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(hashable_key(item) for item in value)
+    fields = getattr(value, "__dict__", None)
+    if isinstance(value, dict):
+        items = frozenset((key, hashable_key(item)) for (key, item) in value.items())
+        return (items, hashable_key(fields)) if fields else items
+    if fields is not None and type(value).__hash__ is object.__hash__:
+        return type(value).__name__, hashable_key(fields)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class ResponseCache(object):
+    """
+    单个接口的缓存, eg:
+
+        cache_key = cache.key(arg)
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = context.call(arg)
+            cache.put(cache_key, cached)
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, key_fields: typing.Sequence[str] = ()):
+        """
+        :param name: Service.method
+        :param ttl: 条目的有效秒数
+        :param max_entries: 最多保存的条目数，超出时淘汰最久未使用的条目
+        :param key_fields: 作为缓存 key 的参数字段，为空时使用整个参数
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_fields = tuple(key_fields)
+        self._key_getter = self.key_fields and attrgetter(*self.key_fields) or None
+        self.hits = 0
+        self.misses = 0
+        self._entries: typing.OrderedDict[typing.Hashable, typing.Tuple[float, typing.Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def key(self, arg) -> typing.Hashable:
+        """
+        根据参数计算缓存 key
+        :param arg: 生成的 Arg 类型
+        """
+        if self._key_getter is None:
+            return arg.convert_pb2().SerializeToString(deterministic=True)
+        return hashable_key(self._key_getter(arg))
+
+    def get(self, key: typing.Hashable):
+        """
+        获取未过期的缓存，不存在时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: typing.Hashable, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, arg=None, **fields):
+        """
+        使缓存失效
+        :param arg: 生成的 Arg 类型, 使该参数对应的条目失效
+        :param fields: 按 key_fields 指定字段的值，使对应的条目失效, 与 arg 都未指定时清空缓存
+        """
+        if arg is None and not fields:
+            self.clear()
+            return
+
+        if arg is None:
+            values = tuple(fields[field] for field in self.key_fields)
+            key = hashable_key(values if len(values) > 1 else values[0])
+        else:
+            key = self.key(arg)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> typing.Dict[str, int]:
+        """
+        获取命中数、未命中数及当前的条目数
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,195 @@
+"""
+trace 的采样控制, 未被采样的调用不创建 Context 及 TraceInfo 也不进入 TraceContext,
+采样结果保存在 contextvar 中，当前调用内发起的下游调用沿用该结果, 跨进程时通过 x-rpc-sampled 元数据传递,
+异步客户端由 AioCallContext 附加元数据, 同步客户端由 sampled_stub 包装的 channel 附加
+"""
+
+import collections
+import contextlib
+import contextvars
+import os
+import random
+import typing
+
+import grpc
+
+# 传递采样结果的元数据 key
+sampled_key = "x-rpc-sampled"
+
+# 当前调用的采样结果，None 表示当前不在任何调用中
+_sampled: contextvars.ContextVar = contextvars.ContextVar("rpc_sampled", default=None)
+
+# 未采样时替代 TraceContext 的空上下文, 可以重复使用
+no_trace = contextlib.nullcontext()
+
+_random = random.random
+
+
+def get_default_rate(rate: float) -> float:
+    """
+    获取全局的采样率，环境变量 RPC_TRACE_SAMPLE_RATE 优先于生成时指定的值
+    """
+    value = os.environ.get("RPC_TRACE_SAMPLE_RATE")
+    return float(value) if value else rate
+
+
+def current() -> typing.Union[bool, None]:
+    """
+    获取当前调用的采样结果
+    """
+    return _sampled.get()
+
+
+def outgoing_metadata() -> typing.Union[typing.Tuple[typing.Tuple[str, str], ...], None]:
+    """
+    下游调用需要携带的元数据，不在任何调用中时返回 None
+    """
+    sampled = _sampled.get()
+    if sampled is None:
+        return None
+    return (sampled_key, sampled and "1" or "0"),
+
+
+def _reset(token):
+    try:
+        _sampled.reset(token)
+    except ValueError:
+        # streaming 接口的生成器可能在其它上下文中被关闭
+        pass
+
+
+class UntracedContext(object):
+    """
+    未被采样的调用传给 impl 的上下文, 代替 runtime 的 Context, 不创建 TraceInfo
+    """
+    __slots__ = ("impl_context",)
+
+    trace_info = None
+
+    def __init__(self, impl_context):
+        self.impl_context = impl_context
+
+
+class _CallDetails(collections.namedtuple(
+        "_CallDetails", ("method", "timeout", "metadata", "credentials", "wait_for_ready", "compression")),
+        grpc.ClientCallDetails):
+    pass
+
+
+class SamplingInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor,
+                          grpc.StreamUnaryClientInterceptor, grpc.StreamStreamClientInterceptor):
+    """
+    同步客户端的 channel 由 runtime 创建, 通过拦截器为每次调用附加 x-rpc-sampled 元数据
+    """
+
+    @staticmethod
+    def with_metadata(details):
+        metadata = outgoing_metadata()
+        if metadata is None:
+            return details
+        return _CallDetails(
+            details.method, details.timeout, tuple(details.metadata or ()) + metadata, details.credentials,
+            getattr(details, "wait_for_ready", None), getattr(details, "compression", None))
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        return continuation(self.with_metadata(client_call_details), request)
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        return continuation(self.with_metadata(client_call_details), request)
+
+    def intercept_stream_unary(self, continuation, client_call_details, request_iterator):
+        return continuation(self.with_metadata(client_call_details), request_iterator)
+
+    def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        return continuation(self.with_metadata(client_call_details), request_iterator)
+
+
+def sampled_stub(stub_type) -> typing.Callable:
+    """
+    包装生成的 Stub 类型, 创建 Stub 时为 channel 加上 SamplingInterceptor, eg:
+
+        reg_client(User.rpc_name, sampled_stub(UserStub))
+    """
+    interceptor = SamplingInterceptor()
+
+    def create(channel):
+        return stub_type(grpc.intercept_channel(channel, interceptor))
+
+    return create
+
+
+class Sampler(object):
+    """
+    单个接口的采样器
+    """
+
+    def __init__(self, name: str, rate: float = -1, default_rate: float = 1.0):
+        """
+        :param name: Service.method
+        :param rate: 该接口的采样率，小于 0 时使用全局采样率
+        :param default_rate: 生成时指定的全局采样率, 可以被环境变量 RPC_TRACE_SAMPLE_RATE 覆盖
+        """
+        self.name = name
+        self.rate = rate if rate >= 0 else get_default_rate(default_rate)
+
+    def decide(self) -> bool:
+        if self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+        return _random() < self.rate
+
+    def sample(self) -> bool:
+        """
+        客户端使用, 在调用中时沿用上游的采样结果，否则按采样率决定
+        """
+        sampled = _sampled.get()
+        if sampled is None:
+            return self.decide()
+        return sampled
+
+    @contextlib.contextmanager
+    def call_scope(self):
+        """
+        客户端使用, 决定本次调用是否被采样, 并在调用期间保存到 contextvar 中, 使采样结果通过元数据传给服务端
+        """
+        sampled = self.sample()
+        token = _sampled.set(sampled)
+        try:
+            yield sampled
+        finally:
+            _reset(token)
+
+    @contextlib.contextmanager
+    def trace(self, trace_type, context):
+        """
+        同步客户端使用, 被采样时进入 trace_type(context)
+        :param trace_type: runtime 的 TraceContext
+        :param context: 调用上下文
+        """
+        with self.call_scope() as sampled:
+            if not sampled:
+                yield
+                return
+            with trace_type(context):
+                yield
+
+    @contextlib.contextmanager
+    def scope(self, context):
+        """
+        服务端使用，优先使用上游通过元数据传递的采样结果, 并在处理期间保存到 contextvar 中
+        :param context: grpc 的 ServicerContext
+        """
+        sampled = None
+        for (key, value) in context.invocation_metadata() or ():
+            if key == sampled_key:
+                sampled = value == "1"
+                break
+        if sampled is None:
+            sampled = self.decide()
+
+        token = _sampled.set(sampled)
+        try:
+            yield sampled
+        finally:
+            _reset(token)
@@ -0,0 +1,280 @@
+"""
+可配置的 gRPC 服务端, 线程数、最大并发数、消息大小及 keepalive 均可在生成时指定，并可以通过环境变量覆盖,
+支持基于 SO_REUSEPORT 的多进程模式，使单个容器可以利用全部 CPU
+"""
+
+import contextlib
+import json
+import os
+import signal
+import sys
+import traceback
+import typing
+
+from concurrent import futures
+
+import grpc
+
+from . import metrics
+from .limiter import on_reject, LimitExceeded
+from .local import reg_local
+from .resolver import registered
+from .validate import ValidationError
+
+# 服务端注册的 servicer 及将其加入 server 的函数
+_servicers: typing.List[typing.Tuple[typing.Any, typing.Callable]] = []
+
+# 默认的服务端地址, 与 Dockerfile 中暴露的端口保持一致
+default_address = "[::]:50051"
+
+# ServerOption 各字段对应的环境变量
+env_names = {
+    "address": "RPC_ADDRESS",
+    "workers": "RPC_SERVER_WORKERS",
+    "max_concurrent_rpcs": "RPC_SERVER_MAX_CONCURRENT_RPCS",
+    "max_send_message_bytes": "RPC_SERVER_MAX_SEND_BYTES",
+    "max_receive_message_bytes": "RPC_SERVER_MAX_RECEIVE_BYTES",
+    "keepalive_time_ms": "RPC_SERVER_KEEPALIVE_TIME_MS",
+    "keepalive_timeout_ms": "RPC_SERVER_KEEPALIVE_TIMEOUT_MS",
+    "processes": "RPC_SERVER_PROCESSES",
+    "metrics_port": "RPC_METRICS_PORT",
+}
+
+# 多进程模式下子进程的序号
+process_index_env = "RPC_PROCESS_INDEX"
+
+# 被并发限制拒绝的请求计入监控
+on_reject(metrics.registry.record_rejected)
+
+
+def reg_servicer(servicer_type, add_func: typing.Callable):
+    """
+    注册服务端的 servicer, 对应 runtime 中的 reg_servicer, 同时注册到进程内直接调用的注册表中
+    """
+    _servicers.append((servicer_type, add_func))
+    reg_local(servicer_type)
+
+
+def get_servicers() -> typing.List[typing.Tuple[typing.Any, typing.Callable]]:
+    """
+    获取所有已注册的 servicer
+    """
+    return list(_servicers)
+
+
+@contextlib.contextmanager
+def handle_errors(context):
+    """
+    将 servicer 中抛出的 LimitExceeded 转换为 RESOURCE_EXHAUSTED, ValidationError 转换为 INVALID_ARGUMENT 并结束调用,
+    校验错误的详细信息以 json 格式保存在 trailing metadata 的 validation-error 中,
+    Batch 的子请求使用 batch.ItemContext, abort 只使该子请求失败
+    :param context: grpc.ServicerContext
+    """
+    try:
+        yield
+    except LimitExceeded as e:
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, e.message)
+    except ValidationError as e:
+        context.set_trailing_metadata(validation_metadata(e))
+        context.abort(grpc.StatusCode.INVALID_ARGUMENT, e.message)
+
+
+def validation_metadata(e: ValidationError) -> tuple:
+    return (("validation-error", json.dumps(e.to_dict())),)
+
+
+class ServerOption(object):
+    """
+    服务端的运行参数，值为 0 的参数使用 grpc 的默认值
+    """
+
+    def __init__(
+            self,
+            address: str = default_address,
+            workers: int = 0,
+            max_concurrent_rpcs: int = 0,
+            max_send_message_bytes: int = 0,
+            max_receive_message_bytes: int = 0,
+            keepalive_time_ms: int = 0,
+            keepalive_timeout_ms: int = 0,
+            processes: int = 1,
+            metrics_port: int = 0
+    ):
+        """
+        :param address: 监听地址
+        :param workers: 处理请求的线程数, 为 0 时使用 CPU 数 + 4, 最多 32
+        :param max_concurrent_rpcs: 同时处理的最大请求数，超出时请求直接返回 RESOURCE_EXHAUSTED
+        :param max_send_message_bytes: 发送消息的最大字节数
+        :param max_receive_message_bytes: 接收消息的最大字节数
+        :param keepalive_time_ms: keepalive ping 的发送间隔
+        :param keepalive_timeout_ms: keepalive ping 的超时时间
+        :param processes: 进程数，大于 1 时使用 SO_REUSEPORT 监听同一端口, 为 0 时使用 CPU 数
+        :param metrics_port: 以 Prometheus 文本格式提供监控数据的本地端口，多进程模式下每个进程依次加 1, 为 0 时不提供
+        """
+        self.address = address
+        self.workers = workers
+        self.max_concurrent_rpcs = max_concurrent_rpcs
+        self.max_send_message_bytes = max_send_message_bytes
+        self.max_receive_message_bytes = max_receive_message_bytes
+        self.keepalive_time_ms = keepalive_time_ms
+        self.keepalive_timeout_ms = keepalive_timeout_ms
+        self.processes = processes
+        self.metrics_port = metrics_port
+
+    @classmethod
+    def from_env(cls, **defaults) -> "ServerOption":
+        """
+        使用生成时指定的默认值构建, 设置了对应环境变量的参数以环境变量为准
+        """
+        option = cls(**defaults)
+        for (name, env_name) in env_names.items():
+            value = os.environ.get(env_name)
+            if value:
+                setattr(option, name, value if name == "address" else int(value))
+        return option
+
+    def get_workers(self) -> int:
+        return self.workers or min(32, (os.cpu_count() or 1) + 4)
+
+    def get_processes(self) -> int:
+        return self.processes or os.cpu_count() or 1
+
+    def get_max_concurrent_rpcs(self) -> typing.Union[int, None]:
+        return self.max_concurrent_rpcs or None
+
+    def start_metrics(self):
+        """
+        在当前进程中提供监控数据
+        """
+        if self.metrics_port:
+            metrics.start_http_server(self.metrics_port + int(os.environ.get(process_index_env, 0)))
+
+    def channel_options(self) -> typing.List[typing.Tuple[str, int]]:
+        """
+        转换为 grpc.server 的 options 参数
+        """
+        options = []
+        if self.max_send_message_bytes:
+            options.append(("grpc.max_send_message_length", self.max_send_message_bytes))
+        if self.max_receive_message_bytes:
+            options.append(("grpc.max_receive_message_length", self.max_receive_message_bytes))
+        if self.keepalive_time_ms:
+            options.append(("grpc.keepalive_time_ms", self.keepalive_time_ms))
+            options.append(("grpc.keepalive_permit_without_calls", 1))
+            options.append(("grpc.http2.min_ping_interval_without_data_ms", self.keepalive_time_ms))
+        if self.keepalive_timeout_ms:
+            options.append(("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms))
+        if self.get_processes() > 1:
+            options.append(("grpc.so_reuseport", 1))
+        return options
+
+
+def create_server(option: ServerOption) -> grpc.Server:
+    """
+    按照 option 创建服务端并加载所有已注册的 servicer
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=option.get_workers()),
+        options=option.channel_options(),
+        maximum_concurrent_rpcs=option.get_max_concurrent_rpcs()
+    )
+    for (servicer_type, add_func) in _servicers:
+        add_func(servicer_type(), server)
+
+    server.add_insecure_port(option.address)
+    return server
+
+
+def serve(option: ServerOption):
+    """
+    在当前进程中启动服务端，直到收到 SIGTERM 或 SIGINT
+    """
+    server = create_server(option)
+    server.start()
+    option.start_metrics()
+
+    def stop(_signum, _frame):
+        server.stop(grace=5)
+
+    signal.signal(signal.SIGTERM, stop)
+    server.wait_for_termination()
+
+
+def rpc_names() -> typing.List[str]:
+    """
+    所有已注册的 servicer 的服务名
+    """
+    return [servicer_type.rpc_name for (servicer_type, _) in _servicers]
+
+
+def run_processes(target: typing.Callable, processes: int) -> int:
+    """
+    fork 出 processes 个子进程执行 target, 父进程只负责转发退出信号及等待子进程结束,
+    fork 需要在创建任何 grpc 对象之前进行
+    :return: 退出状态, 任一子进程异常退出时为 1
+    """
+    if processes <= 1 or not hasattr(os, "fork"):
+        target()
+        return 0
+
+    children = []
+    for index in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            os.environ[process_index_env] = str(index)
+            run_child(target)
+        children.append(pid)
+
+    def stop(signum, _frame):
+        for child in children:
+            try:
+                os.kill(child, signum)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    failed = False
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid in children:
+            children.remove(pid)
+            failed = failed or not (os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0)
+    return int(failed)
+
+
+def run_child(target: typing.Callable):
+    """
+    在子进程中执行 target 并退出, 不返回到父进程的调用栈中, 异常时打印 traceback 并以 1 退出
+    """
+    try:
+        target()
+    except KeyboardInterrupt:
+        # 父进程转发的 SIGINT, 与正常停止相同
+        os._exit(0)
+    except BaseException:
+        traceback.print_exc()
+        sys.stderr.flush()
+        os._exit(1)
+    os._exit(0)
+
+
+def loop(option: ServerOption = None):
+    """
+    rpc_server.py 的入口, 对应 runtime 中的 server.loop,
+    多进程模式下所有子进程共用同一地址, 因此只由父进程注册到注册中心, 所有子进程退出后才注销
+    """
+    option = option or ServerOption.from_env()
+    print("rpc server listening on %s, processes: %d, workers: %d, max concurrent rpcs: %s" % (
+        option.address, option.get_processes(), option.get_workers(), option.get_max_concurrent_rpcs()),
+        file=sys.stderr)
+    with registered(rpc_names(), option.address):
+        status = run_processes(lambda: serve(option), option.get_processes())
+    if status:
+        sys.exit(status)
@@ -0,0 +1,119 @@
+"""
+客户端的请求合并 (single-flight), 同一接口参数序列化结果相同的请求同时进行时只发出一次 rpc,
+其余调用等待并共享其结果，rpc 抛出的异常同样抛给所有等待者
+
+每个等待者各自将共享的 pb2 结果转换为 Result, 互不影响
+"""
+
+import asyncio
+import threading
+import typing
+
+from .bulk import RawMessage
+
+
+def request_key(message) -> bytes:
+    """
+    使用确定性序列化的结果作为请求的 key, map 字段的顺序不影响结果
+    """
+    return message.SerializeToString(deterministic=True)
+
+
+class Flight(object):
+    """
+    一次进行中的调用
+    """
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: typing.Union[BaseException, None] = None
+
+
+class SingleFlight(object):
+    """
+    同步客户端使用的请求合并
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Service.method
+        """
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._flights: typing.Dict[typing.Hashable, Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: typing.Hashable, func: typing.Callable, *args, **kwargs):
+        """
+        key 相同的调用进行中时等待其结果，否则调用 func
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                leader = True
+                self.calls += 1
+            else:
+                leader = False
+                self.shared += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def call(self, context, arg, option=None):
+        """
+        合并生成的客户端对 context.call 的调用
+        :param context: get_context 得到的调用上下文
+        :param arg: 生成的 Arg 类型
+        :param option: RPCOption, 合并的调用使用第一个调用的 option
+        :return: 调用得到的 pb2 结果
+        """
+        message = arg.convert_pb2()
+        return self.do(request_key(message), context.call, RawMessage(message), option=option)
+
+    def get_stats(self) -> typing.Dict[str, int]:
+        """
+        获取实际发出的调用数及共享结果的调用数
+        """
+        return {"calls": self.calls, "shared": self.shared}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    异步客户端使用的请求合并, 实际的调用在单独的 task 中执行, 某个等待者被取消不影响其它等待者
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._tasks: typing.Dict[typing.Hashable, asyncio.Future] = {}
+
+    async def ado(self, key: typing.Hashable, func: typing.Callable, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    async def acall(self, context, arg, option=None):
+        message = arg.convert_pb2()
+        return await self.ado(request_key(message), context.call, RawMessage(message), option=option)
@@ -0,0 +1,52 @@
+"""
+server streaming 接口的结果转换，逐个转换 rpc 返回的元素，不会一次性加载全部结果
+"""
+
+import typing
+
+
+def iter_traced(trace, call: typing.Callable, *args, **kwargs) -> typing.Iterator:
+    """
+    在 trace 中发起 streaming 调用并逐个返回结果, trace 保持到迭代结束或生成器被关闭,
+    调用在首次迭代时才发起
+    :param trace: 进入的 TraceContext, 未被采样时为 no_trace
+    :param call: 发起调用的函数, eg: context.call
+    """
+    with trace:
+        yield from call(*args, **kwargs)
+
+
+def iter_elements(responses: typing.Iterable, element_type) -> typing.Iterator:
+    """
+    将 rpc 返回的 pb2 元素逐个转换为 element_type
+    """
+    for item in responses:
+        element = element_type()
+        element.from_pb2(item)
+        yield element
+
+
+def iter_data(responses: typing.Iterable) -> typing.Iterator:
+    """
+    基础类型的元素被包装在 data 字段中，逐个取出
+    """
+    for item in responses:
+        yield item.data
+
+
+async def aiter_elements(responses: typing.AsyncIterable, element_type) -> typing.AsyncIterator:
+    """
+    iter_elements 的异步版本
+    """
+    async for item in responses:
+        element = element_type()
+        element.from_pb2(item)
+        yield element
+
+
+async def aiter_data(responses: typing.AsyncIterable) -> typing.AsyncIterator:
+    """
+    iter_data 的异步版本
+    """
+    async for item in responses:
+        yield item.data
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+from generator.framework.codegen.addition.aio import acall_traced, aiter_traced
+
+_local = threading.local()
+
+
+class FakeTraceContext(object):
+    """
+    与 runtime 的 TraceContext 相同, 将当前的 ctx 保存在线程变量中
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    def __enter__(self):
+        self.parent = getattr(_local, "ctx", None)
+        _local.ctx = self.ctx
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _local.ctx = self.parent
+
+
+def current():
+    return getattr(_local, "ctx", None)
+
+
+async def query(name: str, seen: list):
+    for _ in range(3):
+        seen.append((name, current()))
+        await asyncio.sleep(0)
+    return name
+
+
+class TestTraced(object):
+    def test_interleaved_coroutines(self):
+        seen = []
+
+        async def main():
+            return await asyncio.gather(
+                acall_traced(FakeTraceContext, "a", query, "a", seen),
+                acall_traced(FakeTraceContext, "b", query, "b", seen),
+            )
+
+        assert asyncio.run(main()) == ["a", "b"]
+        assert len(seen) == 6
+        assert all(name == ctx for (name, ctx) in seen)
+        assert current() is None
+
+    def test_plain_function(self):
+        def add(a, b):
+            return a + b, current()
+
+        assert asyncio.run(acall_traced(FakeTraceContext, "ctx", add, 1, 2)) == (3, "ctx")
+        assert asyncio.run(acall_traced(None, "ctx", add, 1, 2)) == (3, None)
+
+    def test_exception(self):
+        async def fail():
+            await asyncio.sleep(0)
+            raise KeyError("x")
+
+        async def main():
+            try:
+                await acall_traced(FakeTraceContext, "ctx", fail)
+            except KeyError:
+                return current()
+
+        assert asyncio.run(main()) is None
+
+    def test_async_iterator(self):
+        async def items():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield i, current()
+
+        async def main():
+            return [item async for item in aiter_traced(FakeTraceContext, "ctx", items)], current()
+
+        assert asyncio.run(main()) == ([(0, "ctx"), (1, "ctx"), (2, "ctx")], None)
+
+    def test_sync_iterator(self):
+        def items():
+            for i in range(2):
+                yield i, current()
+
+        async def main():
+            traced = [item async for item in aiter_traced(FakeTraceContext, "ctx", items)]
+            untraced = [item async for item in aiter_traced(None, "ctx", items)]
+            return traced, untraced
+
+        assert asyncio.run(main()) == ([(0, "ctx"), (1, "ctx")], [(0, None), (1, None)])
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from generator.framework.codegen.addition.aio import ahandle_errors
+from generator.framework.codegen.addition.batch import BatchBuilder, BatchError, ItemContext, run_batch, arun_batch
+from generator.framework.codegen.addition.server import handle_errors
+from generator.framework.codegen.addition.validate import ValidationError
+
+
+class Value(object):
+    def __init__(self, value=None):
+        self.value = value
+
+    def CopyFrom(self, other):
+        self.value = other.value
+
+
+class RequestItem(object):
+    """
+    代替 BatchRequest.Item, 只设置了 oneof 中的一个字段
+    """
+
+    def __init__(self, name: str = "", value=None):
+        self.name = name
+        setattr(self, name or "_", Value(value))
+
+    def WhichOneof(self, _oneof):
+        return self.name
+
+
+class Request(object):
+    def __init__(self, items):
+        self.items = items
+
+
+class ResponseItem(object):
+    def __init__(self):
+        self.get = Value()
+        self.put = Value()
+        self.error = None
+
+    def WhichOneof(self, _oneof):
+        if self.error is not None:
+            return "error"
+        return self.get.value is not None and "get" or "put"
+
+
+class Response(object):
+    Item = ResponseItem
+
+    def __init__(self, items):
+        self.items = items
+
+
+class Result(object):
+    def from_pb2(self, message):
+        self.value = message.value
+
+
+class Code(object):
+    name = "RESOURCE_EXHAUSTED"
+
+
+class Context(object):
+    def __init__(self):
+        self.trailing_metadata = None
+        self.peer_name = "peer"
+
+    def set_trailing_metadata(self, trailing_metadata):
+        self.trailing_metadata = trailing_metadata
+
+    def abort(self, code, details):
+        raise AssertionError("Batch 的 context 不应该被 abort")
+
+
+class Servicer(object):
+    def get(self, request, context):
+        if request.value < 0:
+            raise ValueError("negative")
+        if request.value > 100:
+            context.set_trailing_metadata((("key", "value"),))
+            context.abort(Code(), "too large")
+        return Value(request.value * 2)
+
+    def put(self, request, context):
+        # 与生成的 servicer 一样在 handle_errors 中校验参数
+        with handle_errors(context):
+            if request.value is None:
+                raise ValidationError("value", "required")
+            return Value(request.value)
+
+
+class AsyncServicer(object):
+    async def get(self, request, context):
+        await asyncio.sleep(0)
+        if request.value < 0:
+            raise ValueError("negative")
+        return Value(request.value * 2)
+
+    async def put(self, request, context):
+        async with ahandle_errors(context):
+            if request.value is None:
+                raise ValidationError("value", "required")
+            return Value(request.value)
+
+
+class TestBatchBuilder(object):
+    def test_add_and_resolve(self):
+        batch = BatchBuilder(Request, {"get": Result}, lambda builder, option: builder.resolve(Response([
+            item_with(get=2), item_with(error="ValueError: x")])))
+        first = batch.add("get", None)
+        second = batch.add("get", None)
+        assert len(batch) == 2
+        with pytest.raises(RuntimeError):
+            first.result()
+
+        batch.execute()
+        assert first.done()
+        assert first.result().value == 2
+        with pytest.raises(BatchError) as e:
+            second.result()
+        assert e.value.name == "get"
+
+    def test_unknown_method(self):
+        batch = BatchBuilder(Request, {"get": Result}, None)
+        with pytest.raises(ValueError):
+            batch.add("put", None)
+
+
+def item_with(get=None, error=None):
+    item = ResponseItem()
+    item.get.value = get
+    if error is not None:
+        item.error = error
+    return item
+
+
+class TestRunBatch(object):
+    def test_items_in_order(self):
+        request = Request([RequestItem("get", i) for i in range(5)] + [RequestItem("put", 7)])
+        response = run_batch(Servicer(), request, None, Response)
+        assert [item.get.value for item in response.items[:5]] == [0, 2, 4, 6, 8]
+        assert response.items[5].put.value == 7
+
+    def test_item_error(self):
+        request = Request([RequestItem("get", -1), RequestItem("get", 1)])
+        response = run_batch(Servicer(), request, None, Response)
+        assert response.items[0].error == "ValueError: negative"
+        assert response.items[1].get.value == 2
+
+    def test_item_abort(self):
+        context = Context()
+        request = Request([RequestItem("get", 101), RequestItem("get", 1)])
+        response = run_batch(Servicer(), request, context, Response)
+        # 只有该子请求失败, 不影响 Batch 调用的 context
+        assert response.items[0].error == "RESOURCE_EXHAUSTED: too large"
+        assert response.items[1].get.value == 2
+        assert context.trailing_metadata is None
+
+    def test_item_context(self):
+        item_context = ItemContext(Context())
+        assert item_context.peer_name == "peer"
+
+    def test_async(self):
+        request = Request([RequestItem("get", -1), RequestItem("get", 1)])
+        response = asyncio.run(arun_batch(AsyncServicer(), request, None, Response))
+        assert response.items[0].error == "ValueError: negative"
+        assert response.items[1].get.value == 2
+
+    def test_item_validation(self):
+        context = Context()
+        request = Request([RequestItem("put", None), RequestItem("put", 1)])
+        response = run_batch(Servicer(), request, context, Response)
+        assert response.items[0].error == "INVALID_ARGUMENT: value is required"
+        assert response.items[1].put.value == 1
+        assert context.trailing_metadata is None
+
+        response = asyncio.run(arun_batch(AsyncServicer(), request, context, Response))
+        assert response.items[0].error == "INVALID_ARGUMENT: value is required"
+        assert response.items[1].put.value == 1
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from generator.framework.codegen.addition.bulk import RawMessage, iter_messages, chunk_messages, convert_args, \
+    chunk_args, achunk_args, call_batch, acall_batch
+from generator.framework.codegen.addition.validate import ValidationError
+
+
+class Message(object):
+    def __init__(self, value: int, size: int = 1):
+        self.value = value
+        self.size = size
+
+    def ByteSize(self):
+        return self.size
+
+
+class Arg(object):
+    def __init__(self, value: int = 0, size: int = 1):
+        self.value = value
+        self.size = size
+
+    def convert_pb2(self):
+        return Message(self.value, self.size)
+
+    def from_pb2(self, message):
+        self.value = message.value
+
+    def validate(self, prefix: str = ""):
+        if self.value < 0:
+            raise ValidationError(prefix + "value", "minimum", 0)
+
+
+class Impl(object):
+    def get(self, arg):
+        return arg.value * 2
+
+
+class ManyImpl(Impl):
+    def get_many(self, args):
+        return (arg.value * 3 for arg in args)
+
+
+class AsyncImpl(object):
+    async def get(self, arg):
+        await asyncio.sleep(0)
+        return arg.value * 2
+
+
+def values(batches):
+    return [[message.value for message in batch] for batch in batches]
+
+
+class TestClient(object):
+    def test_raw_message(self):
+        message = Message(1)
+        assert RawMessage(message).convert_pb2() is message
+        assert [m.value for m in iter_messages([Arg(1), Arg(2)])] == [1, 2]
+
+    def test_chunk_by_count(self):
+        args = [Arg(i) for i in range(5)]
+        assert values(chunk_messages(args, 2, 100)) == [[0, 1], [2, 3], [4]]
+
+    def test_chunk_by_bytes(self):
+        args = [Arg(0, 4), Arg(1, 4), Arg(2, 10), Arg(3, 1)]
+        # 超过 max_bytes 的消息单独成批
+        assert values(chunk_messages(args, 100, 8)) == [[0, 1], [2], [3]]
+
+    def test_chunk_empty(self):
+        assert list(chunk_messages([], 2, 100)) == []
+
+
+class TestServer(object):
+    def test_convert_args(self):
+        args = convert_args([Message(1), Message(2)], Arg)
+        assert [arg.value for arg in args] == [1, 2]
+
+    def test_chunk_args(self):
+        batches = list(chunk_args([Message(i) for i in range(3)], Arg, 2))
+        assert [[arg.value for arg in batch] for batch in batches] == [[0, 1], [2]]
+
+    def test_achunk_args(self):
+        async def messages():
+            for i in range(3):
+                yield Message(i)
+
+        async def main():
+            return [[arg.value for arg in batch] async for batch in achunk_args(messages(), Arg, 2)]
+
+        assert asyncio.run(main()) == [[0, 1], [2]]
+
+    def test_call_batch(self):
+        args = [Arg(1), Arg(2)]
+        assert call_batch(Impl(), "get", args) == [2, 4]
+        assert call_batch(ManyImpl(), "get", args) == [3, 6]
+
+    def test_acall_batch(self):
+        args = [Arg(1), Arg(2)]
+        assert asyncio.run(acall_batch(AsyncImpl(), "get", args)) == [2, 4]
+        assert asyncio.run(acall_batch(ManyImpl(), "get", args)) == [3, 6]
+
+    def test_validate(self):
+        assert len(convert_args([Message(-1)], Arg)) == 1
+        with pytest.raises(ValidationError) as e:
+            convert_args([Message(1), Message(-1)], Arg, validate=True)
+        assert e.value.field == "[1].value"
+
+    def test_chunk_validate(self):
+        # 序号为参数在整个 stream 中的位置
+        with pytest.raises(ValidationError) as e:
+            list(chunk_args([Message(i) for i in (1, 2, -1)], Arg, 2, validate=True))
+        assert e.value.field == "[2].value"
+
+        async def messages():
+            for i in (1, -1):
+                yield Message(i)
+
+        async def main():
+            return [batch async for batch in achunk_args(messages(), Arg, 1, validate=True)]
+
+        with pytest.raises(ValidationError) as e:
+            asyncio.run(main())
+        assert e.value.field == "[1].value"
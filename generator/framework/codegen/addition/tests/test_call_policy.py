@@ -0,0 +1,199 @@
+import json
+import threading
+import time
+
+import grpc
+import pytest
+
+from generator.framework.codegen.addition import call_policy
+from generator.framework.codegen.addition.call_policy import (
+    BoundedExecutor, CallPolicy, DeadlineExceeded, RetryBudget, build_service_config, with_timeout)
+
+
+class Option(object):
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+
+class Error(grpc.RpcError):
+    def __init__(self, code):
+        super().__init__(code.name)
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+class Context(object):
+    """
+    代替 get_context 得到的调用上下文, 依次返回 results 中的结果, 记录每次调用的 timeout
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.timeouts = []
+
+    def call(self, arg, option=None):
+        self.timeouts.append(getattr(option, "timeout", None))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class Call(object):
+    """
+    代替 stub.method.future 的结果
+    """
+
+    def __init__(self):
+        self.callbacks = []
+        self.cancelled = False
+        self.outcome = None
+
+    def finish(self, result=None, error=None):
+        self.outcome = (result, error)
+        for callback in self.callbacks:
+            callback(self)
+
+    def result(self):
+        result, error = self.outcome
+        if error is not None:
+            raise error
+        return result
+
+    def cancel(self):
+        self.cancelled = True
+        self.finish(error=Error(grpc.StatusCode.CANCELLED))
+
+    def add_done_callback(self, callback):
+        self.callbacks.append(callback)
+
+
+class FutureContext(object):
+    """
+    提供 call_future 的调用上下文, 第二次调用在第一次之前返回
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.timeouts = []
+
+    def call_future(self, arg, option=None):
+        self.timeouts.append(option.timeout)
+        call = Call()
+        self.calls.append(call)
+        if len(self.calls) == 2:
+            threading.Timer(0.01, call.finish, (arg * 2,)).start()
+        return call
+
+
+class TestWithTimeout(object):
+    def test_copy(self):
+        option = Option(5)
+        new_option = with_timeout(option, 1.0)
+        assert new_option is not option
+        assert new_option.timeout == 1.0
+        assert option.timeout == 5
+        assert with_timeout(None, 2.0, Option).timeout == 2.0
+        assert with_timeout(None, 3.0).timeout == 3.0
+
+
+class TestRetry(object):
+    def test_retry(self):
+        context = Context(Error(grpc.StatusCode.UNAVAILABLE), 1)
+        policy = CallPolicy("Demo.get", retries=1, budget=RetryBudget())
+        assert policy.bind(context).call("arg") == 1
+        assert context.timeouts == [None, None]
+
+    def test_not_retryable(self):
+        context = Context(Error(grpc.StatusCode.INVALID_ARGUMENT), 1)
+        policy = CallPolicy("Demo.get", retries=1, budget=RetryBudget())
+        with pytest.raises(grpc.RpcError):
+            policy.bind(context).call("arg")
+        assert len(context.timeouts) == 1
+
+    def test_budget(self):
+        budget = RetryBudget(max_tokens=2)
+        context = Context(*[Error(grpc.StatusCode.UNAVAILABLE)] * 3)
+        policy = CallPolicy("Demo.get", retries=2, budget=budget)
+        with pytest.raises(grpc.RpcError):
+            policy.bind(context).call("arg")
+        # 第一次失败后预算不足一半, 不再重试
+        assert len(context.timeouts) == 1
+
+
+class TestDeadline(object):
+    def test_per_attempt_timeout(self):
+        context = Context(Error(grpc.StatusCode.UNAVAILABLE), 1)
+        policy = CallPolicy("Demo.get", deadline=5, retries=1, budget=RetryBudget())
+        assert policy.bind(context, option_type=Option).call("arg") == 1
+        first, second = context.timeouts
+        assert 0 < second <= first <= 5
+
+    def test_caller_timeout(self):
+        context = Context(1)
+        option = Option(0.5)
+        policy = CallPolicy("Demo.get", deadline=5, budget=RetryBudget())
+        assert policy.bind(context).call("arg", option) == 1
+        assert 0 < context.timeouts[0] <= 0.5
+        assert option.timeout == 0.5
+
+    def test_exceeded(self):
+        class SlowContext(Context):
+            def call(self, arg, option=None):
+                time.sleep(0.02)
+                return super().call(arg, option)
+
+        context = SlowContext(Error(grpc.StatusCode.UNAVAILABLE), 1)
+        policy = CallPolicy("Demo.get", deadline=0.01, retries=1, budget=RetryBudget())
+        with pytest.raises(DeadlineExceeded) as e:
+            policy.bind(context).call("arg")
+        assert e.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+        assert len(context.timeouts) == 1
+
+
+class TestHedge(object):
+    def test_cancel_losers(self):
+        context = FutureContext()
+        policy = CallPolicy("Demo.get", deadline=5, retries=2, hedge_delay=0.01, budget=RetryBudget())
+        assert policy.bind(context).call(2) == 4
+        first = context.calls[0]
+        assert first.cancelled is True
+        assert not context.calls[1].cancelled
+        assert all(0 < timeout <= 5 for timeout in context.timeouts)
+
+    def test_pool_full(self, monkeypatch):
+        # 线程池已满时在调用方的线程中调用
+        monkeypatch.setattr(call_policy, "_executor", BoundedExecutor(1))
+        release = threading.Event()
+        assert call_policy.get_executor().try_submit(release.wait) is not None
+        context = Context(3)
+        policy = CallPolicy("Demo.get", retries=1, hedge_delay=0.01, budget=RetryBudget())
+        assert policy.bind(context).call("arg") == 3
+        release.set()
+
+
+class TestBoundedExecutor(object):
+    def test_try_submit(self):
+        executor = BoundedExecutor(1)
+        release = threading.Event()
+        future = executor.try_submit(release.wait)
+        assert executor.try_submit(lambda: None) is None
+        release.set()
+        future.result()
+        assert executor.try_submit(lambda: 1).result() == 1
+
+
+class TestServiceConfig(object):
+    def test_method_config(self):
+        config = CallPolicy("Demo.get", deadline=1, retries=2, budget=RetryBudget()).method_config()
+        assert config["timeout"] == "1s"
+        assert config["retryPolicy"]["maxAttempts"] == 3
+        hedged = CallPolicy("Demo.get", retries=1, hedge_delay=0.1, budget=RetryBudget()).method_config()
+        assert hedged["hedgingPolicy"]["hedgingDelay"] == "0.1s"
+
+    def test_build(self):
+        config = json.loads(build_service_config([CallPolicy("Demo.get", retries=1, budget=RetryBudget())]))
+        assert config["retryThrottling"] == {"maxTokens": 10, "tokenRatio": 0.1}
+        assert "retryThrottling" not in json.loads(build_service_config([CallPolicy("Demo.get")]))
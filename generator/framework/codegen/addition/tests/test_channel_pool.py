@@ -0,0 +1,94 @@
+import threading
+
+from generator.framework.codegen.addition.channel_pool import ChannelPool
+from generator.framework.codegen.addition.resolver import Resolver, StaticResolver
+
+
+class Channel(object):
+    def __init__(self, target: str):
+        self.target = target
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Stub(object):
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class MutableResolver(Resolver):
+    def __init__(self, targets):
+        self.targets = targets
+
+    def resolve(self, rpc_name: str):
+        return self.targets
+
+
+def create_pool(resolver, pool_size: int = 2, closed: list = None) -> ChannelPool:
+    pool = ChannelPool("Demo", Stub, Channel, pool_size, resolver, refresh_interval=0)
+    if closed is not None:
+        pool.close_channel = closed.append
+    return pool
+
+
+class TestChannelPool(object):
+    def test_least_outstanding(self, monkeypatch):
+        monkeypatch.delenv("RPC_DEMO_POOL_SIZE", raising=False)
+        pool = create_pool(StaticResolver(["a:1", "b:1"]))
+        first = pool.acquire()
+        second = pool.acquire()
+        assert len(pool.channels) == 4
+        assert first is not second
+        # 空闲的 channel 优先于进行中请求更多的 channel
+        others = [pool.acquire(), pool.acquire()]
+        assert len({id(channel) for channel in [first, second] + others}) == 4
+        pool.release(first)
+        assert pool.acquire() is first
+        assert sorted(outstanding for (_, outstanding) in pool.get_stats()) == [1, 1, 1, 1]
+
+    def test_pool_size_env(self, monkeypatch):
+        monkeypatch.setenv("RPC_DEMO_POOL_SIZE", "3")
+        pool = create_pool(StaticResolver(["a:1"]))
+        pool.acquire()
+        assert len(pool.channels) == 3
+
+    def test_refresh(self, monkeypatch):
+        monkeypatch.delenv("RPC_DEMO_POOL_SIZE", raising=False)
+        closed = []
+        resolver = MutableResolver(["a:1", "b:1"])
+        pool = create_pool(resolver, 1, closed)
+        pool.acquire()
+        resolver.targets = ["b:1", "c:1"]
+        pool.refresh()
+        assert sorted(channel.target for channel in pool.channels) == ["b:1", "c:1"]
+        assert [channel.target for channel in closed] == ["a:1"]
+        # 解析失败时继续使用已有的副本
+        resolver.targets = []
+        pool.refresh()
+        assert len(pool.channels) == 2
+
+    def test_concurrent(self, monkeypatch):
+        monkeypatch.delenv("RPC_DEMO_POOL_SIZE", raising=False)
+        pool = create_pool(StaticResolver(["a:1", "b:1"]))
+        barrier = threading.Barrier(8)
+
+        def call():
+            barrier.wait()
+            for _ in range(500):
+                pool.release(pool.acquire())
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [outstanding for (_, outstanding) in pool.get_stats()] == [0, 0, 0, 0]
+
+    def test_close_sync(self):
+        pool = create_pool(StaticResolver(["a:1"]))
+        channel = pool.acquire()
+        pool.close_sync()
+        assert channel.channel.closed
+        assert pool.channels == []
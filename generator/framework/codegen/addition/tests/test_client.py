@@ -0,0 +1,79 @@
+import pytest
+
+from generator.framework.codegen.addition import client, sampling
+from generator.framework.codegen.addition.client import PooledServiceClient, reg_client
+
+
+class Arg(object):
+    def __init__(self, value):
+        self.value = value
+
+    def convert_pb2(self):
+        return self.value
+
+
+class Option(object):
+    timeout = 2.0
+
+
+class Stub(object):
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get(self, request, timeout=None, metadata=None):
+        if request < 0:
+            raise ValueError("negative")
+        return request, timeout, metadata
+
+    def list(self, request, timeout=None, metadata=None):
+        return iter(range(request))
+
+
+class DemoClient(PooledServiceClient):
+    from_project = "demo"
+    rpc_name = "Demo"
+    pool_size = 2
+
+
+@pytest.fixture()
+def demo_client(monkeypatch):
+    monkeypatch.setattr(client, "_client_stubs", {})
+    monkeypatch.delenv("RPC_DEMO_POOL_SIZE", raising=False)
+    reg_client("Demo", Stub)
+    demo = DemoClient("127.0.0.1:1,127.0.0.1:2")
+    yield demo
+    demo.close()
+
+
+def outstanding(demo: DemoClient):
+    return [count for (_, count) in demo.pool.get_stats()]
+
+
+class TestPooledServiceClient(object):
+    def test_call(self, demo_client):
+        context = demo_client.get_context("get")
+        assert context.call(Arg(1), Option()) == (1, 2.0, None)
+        assert len(demo_client.pool.channels) == 4
+        assert outstanding(demo_client) == [0, 0, 0, 0]
+        with sampling.Sampler("Demo.get", 0).call_scope():
+            assert context.call(Arg(1))[2] == ((sampling.sampled_key, "0"),)
+
+    def test_error_releases(self, demo_client):
+        with pytest.raises(ValueError):
+            demo_client.get_context("get").call(Arg(-1))
+        assert outstanding(demo_client) == [0, 0, 0, 0]
+
+    def test_stream(self, demo_client):
+        responses = demo_client.get_context("list").call(Arg(3))
+        assert next(responses) == 0
+        # 迭代结束前计入进行中的请求数
+        assert sum(outstanding(demo_client)) == 1
+        assert list(responses) == [1, 2]
+        assert sum(outstanding(demo_client)) == 0
+
+    def test_close(self, demo_client):
+        demo_client.get_context("get").call(Arg(1))
+        pool = demo_client.pool
+        demo_client.close()
+        assert demo_client.pool is None
+        assert pool.channels == []
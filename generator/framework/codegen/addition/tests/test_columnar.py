@@ -0,0 +1,63 @@
+from generator.framework.codegen.addition.columnar import ColumnarResult
+
+
+class Row(object):
+    def __init__(self, id: int = 0, name: str = ""):
+        self.id = id
+        self.name = name
+
+    def __eq__(self, other):
+        return (self.id, self.name) == (other.id, other.name)
+
+
+class FakeColumns(object):
+    """
+    代替 pb2 中按列保存的消息
+    """
+    def __init__(self):
+        self.id = []
+        self.name = []
+
+
+class RowsResult(ColumnarResult):
+    element_type = Row
+    column_names = ("id", "name")
+    pb2_type = FakeColumns
+
+
+class TestColumnarResult(object):
+    def test_from_rows(self):
+        result = RowsResult.from_rows([Row(1, "a"), Row(2, "b")])
+        assert len(result) == 2
+        assert result.columns() == {"id": [1, 2], "name": ["a", "b"]}
+        assert result[1] == Row(2, "b")
+        assert result[-1] == Row(2, "b")
+        assert result[0:1] == [Row(1, "a")]
+        assert list(result) == [Row(1, "a"), Row(2, "b")]
+
+    def test_from_dict_rows(self):
+        result = RowsResult.from_rows([{"id": 1, "name": "a"}, {"id": 2}])
+        assert result.columns() == {"id": [1, 2], "name": ["a", None]}
+
+    def test_pb2_round_trip(self):
+        message = RowsResult.to_pb2([Row(1, "a"), Row(2, "b")])
+        assert message.id == [1, 2]
+        assert message.name == ["a", "b"]
+
+        result = RowsResult()
+        result.from_pb2(message)
+        assert result == [Row(1, "a"), Row(2, "b")]
+
+    def test_from_dict(self):
+        result = RowsResult()
+        result.from_dict({"id": [3], "name": ["c"]})
+        assert result.rows() == [Row(3, "c")]
+
+        result.from_dict(None)
+        assert len(result) == 0
+
+    def test_empty(self):
+        result = RowsResult()
+        assert len(result) == 0
+        assert list(result) == []
+        assert RowsResult.from_rows(None).columns() == {"id": [], "name": []}
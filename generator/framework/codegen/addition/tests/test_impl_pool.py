@@ -0,0 +1,78 @@
+import threading
+
+from generator.framework.codegen.addition import impl_pool
+from generator.framework.codegen.addition.impl_pool import ImplPool, ThreadLocalImpl
+
+
+class Impl(object):
+    created = 0
+
+    def __init__(self, ctx):
+        Impl.created += 1
+        self.ctx = ctx
+
+
+class SetterImpl(Impl):
+    def set_context(self, ctx):
+        self.ctx = ("set", ctx)
+
+
+class TestImplPool(object):
+    def test_reuse_replaces_ctx(self):
+        Impl.created = 0
+        pool = ImplPool(Impl, 1)
+        with pool.use("first") as impl:
+            assert impl.ctx == "first"
+            assert impl_pool.current_context() == "first"
+        with pool.use("second") as reused:
+            # 没有 set_context 时同样不能沿用之前请求的 ctx
+            assert reused is impl
+            assert reused.ctx == "second"
+        assert impl_pool.current_context() is None
+        assert Impl.created == 1
+
+    def test_set_context(self):
+        pool = ImplPool(SetterImpl, 1)
+        with pool.use("first"):
+            pass
+        with pool.use("second") as impl:
+            assert impl.ctx == ("set", "second")
+
+    def test_size(self):
+        Impl.created = 0
+        pool = ImplPool(Impl, 1)
+        with pool.use("first"):
+            with pool.use("second"):
+                pass
+        assert Impl.created == 2
+        assert len(pool._idle) == 1
+
+
+class TestThreadLocalImpl(object):
+    def test_per_thread(self):
+        Impl.created = 0
+        holder = ThreadLocalImpl(Impl)
+        impls = []
+
+        def call(ctx):
+            with holder.use(ctx) as impl:
+                impls.append(impl)
+
+        call("main")
+        call("again")
+        assert impls[0] is impls[1]
+        assert impls[1].ctx == "again"
+
+        thread = threading.Thread(target=call, args=("thread",))
+        thread.start()
+        thread.join()
+        assert impls[2] is not impls[0]
+        assert Impl.created == 2
+
+    def test_reentrant(self):
+        holder = ThreadLocalImpl(Impl)
+        with holder.use("outer") as outer:
+            with holder.use("inner") as inner:
+                assert inner is not outer
+                assert inner.ctx == "inner"
+            assert outer.ctx == "outer"
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from generator.framework.codegen.addition import limiter
+from generator.framework.codegen.addition.limiter import MethodLimiter, AsyncMethodLimiter, LimitExceeded
+
+
+class TestMethodLimiter(object):
+    def test_admit_and_reject(self):
+        rejected = []
+        limiter.on_reject(rejected.append)
+        try:
+            method_limiter = MethodLimiter("Test.sync", 1)
+            with method_limiter.admit():
+                assert method_limiter.in_flight == 1
+                with pytest.raises(LimitExceeded) as e:
+                    with method_limiter.admit():
+                        pass
+                assert e.value.name == "Test.sync"
+            assert method_limiter.in_flight == 0
+            assert method_limiter.rejected == 1
+            assert rejected == ["Test.sync"]
+            assert limiter.get_stats()["Test.sync"] == {"max_concurrency": 1, "in_flight": 0, "rejected": 1}
+        finally:
+            limiter._reject_hooks.remove(rejected.append)
+
+    def test_unlimited(self):
+        method_limiter = MethodLimiter("Test.unlimited", 0)
+        with method_limiter.admit():
+            with method_limiter.admit():
+                pass
+        assert method_limiter.rejected == 0
+
+    def test_queue_timeout(self):
+        method_limiter = MethodLimiter("Test.queue", 1, 1)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with method_limiter.admit():
+                entered.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        entered.wait()
+        threading.Timer(0.05, release.set).start()
+        # 等待期间占用的请求结束, 不会被拒绝
+        with method_limiter.admit():
+            pass
+        thread.join()
+        assert method_limiter.rejected == 0
+        assert method_limiter.in_flight == 0
+
+    def test_concurrent_counters(self):
+        method_limiter = MethodLimiter("Test.threads", 4)
+        barrier = threading.Barrier(8)
+
+        def call():
+            barrier.wait()
+            for _ in range(200):
+                try:
+                    with method_limiter.admit():
+                        assert method_limiter.in_flight <= 4
+                except LimitExceeded:
+                    pass
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert method_limiter.in_flight == 0
+
+
+class TestAsyncMethodLimiter(object):
+    def test_admit_and_reject(self):
+        method_limiter = AsyncMethodLimiter("Test.async", 1)
+
+        async def main():
+            async with method_limiter.admit():
+                assert method_limiter.in_flight == 1
+                with pytest.raises(LimitExceeded):
+                    async with method_limiter.admit():
+                        pass
+            return method_limiter.in_flight
+
+        assert asyncio.run(main()) == 0
+        assert method_limiter.rejected == 1
@@ -0,0 +1,224 @@
+import asyncio
+import sys
+
+import grpc
+import pytest
+
+from generator.framework.codegen.addition import local, sampling
+from generator.framework.codegen.addition.local import LocalRpcError, bind_local, abind_local, get_local, reg_local
+
+
+class Arg(object):
+    def __init__(self, value):
+        self.value = value
+
+    def convert_pb2(self):
+        return self.value
+
+
+class Option(object):
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+
+class Client(object):
+    from_project = "demo"
+    rpc_name = "Demo"
+
+
+class RuntimeContext(object):
+    service_name = "Demo"
+
+    def call(self, arg, option=None):
+        raise AssertionError("注册了 servicer 时不应该经过 channel")
+
+
+class Servicer(object):
+    from_project = "demo"
+    rpc_name = "Demo"
+
+    def get(self, request, context):
+        if request < 0:
+            context.set_trailing_metadata((("x-rpc-validation-error", "value"),))
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "negative")
+        if request == 0:
+            raise ValueError("zero")
+        return request * 2
+
+    def metadata(self, request, context):
+        return tuple(context.invocation_metadata())
+
+    def list(self, request, context):
+        for i in range(request):
+            yield i
+
+    def get_many(self, request_iterator, context):
+        return [item * 2 for item in request_iterator]
+
+    def local_get(self, arg, context):
+        if arg.value == 0:
+            raise ValueError("zero")
+        arg.value += 1
+        return {"value": arg.value, "timeout": context.time_remaining()}
+
+    def local_list(self, arg, context):
+        for i in range(arg.value):
+            yield {"value": i}
+
+
+class AsyncServicer(object):
+    from_project = "demo"
+    rpc_name = "Demo"
+
+    async def get(self, request, context):
+        if request < 0:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "negative")
+        return request * 2
+
+    async def list(self, request, context):
+        for i in range(request):
+            yield i
+
+    async def get_many(self, request_iterator, context):
+        return [item * 2 async for item in request_iterator]
+
+    async def local_get(self, arg, context):
+        if arg.value < 0:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "negative")
+        return {"value": arg.value * 2}
+
+    async def local_list(self, arg, context):
+        for i in range(arg.value):
+            yield {"value": i}
+
+
+@pytest.fixture()
+def registry(monkeypatch):
+    monkeypatch.delitem(sys.modules, local.registry_module_name, raising=False)
+    monkeypatch.setattr(local, "_services", {})
+    monkeypatch.delenv("RPC_LOCAL", raising=False)
+    monkeypatch.delenv("RPC_LOCAL_COPY", raising=False)
+
+
+class TestBindLocal(object):
+    def test_not_registered(self, registry):
+        context = RuntimeContext()
+        assert bind_local(context, Client(), "get") is context
+
+    def test_disabled(self, registry, monkeypatch):
+        reg_local(Servicer)
+        monkeypatch.setenv("RPC_LOCAL", "0")
+        context = RuntimeContext()
+        assert bind_local(context, Client(), "get") is context
+
+    def test_call(self, registry):
+        reg_local(Servicer)
+        context = bind_local(RuntimeContext(), Client(), "get")
+        assert context.call(Arg(2)) == 4
+        # 其它属性使用原来的 context
+        assert context.service_name == "Demo"
+        assert local.get_local("demo", "Demo") is local.get_local("demo", "Demo")
+
+    def test_abort(self, registry):
+        reg_local(Servicer)
+        with pytest.raises(grpc.RpcError) as e:
+            bind_local(RuntimeContext(), Client(), "get").call(Arg(-1))
+        assert e.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+        assert e.value.details() == "negative"
+        assert e.value.trailing_metadata() == (("x-rpc-validation-error", "value"),)
+
+    def test_application_error(self, registry):
+        reg_local(Servicer)
+        with pytest.raises(LocalRpcError) as e:
+            bind_local(RuntimeContext(), Client(), "get").call(Arg(0))
+        assert e.value.code() == grpc.StatusCode.UNKNOWN
+        assert isinstance(e.value.__cause__, ValueError)
+
+    def test_stream(self, registry):
+        reg_local(Servicer)
+        assert list(bind_local(RuntimeContext(), Client(), "list").call(Arg(3))) == [0, 1, 2]
+        assert bind_local(RuntimeContext(), Client(), "get_many").call(Arg(iter([1, 2]))) == [2, 4]
+
+    def test_sampling_metadata(self, registry):
+        reg_local(Servicer)
+        context = bind_local(RuntimeContext(), Client(), "metadata")
+        assert context.call(Arg(None)) == ()
+        with sampling.Sampler("Demo.metadata", 0).call_scope():
+            assert context.call(Arg(None)) == ((sampling.sampled_key, "0"),)
+
+
+class TestAsyncBindLocal(object):
+    def test_call(self, registry):
+        reg_local(AsyncServicer)
+
+        async def main():
+            context = abind_local(RuntimeContext(), Client(), "get")
+            result = await context.call(Arg(2))
+            with pytest.raises(LocalRpcError) as e:
+                await context.call(Arg(-1))
+            return result, e.value.code()
+
+        assert asyncio.run(main()) == (4, grpc.StatusCode.INVALID_ARGUMENT)
+
+    def test_stream(self, registry):
+        reg_local(AsyncServicer)
+
+        async def main():
+            items = [item async for item in abind_local(RuntimeContext(), Client(), "list").stream(Arg(3))]
+            many = await abind_local(RuntimeContext(), Client(), "get_many").call(Arg(iter([1, 2])))
+            return items, many
+
+        assert asyncio.run(main()) == ([0, 1, 2], [2, 4])
+
+
+class TestGetLocal(object):
+    def test_disabled_after_lookup(self, registry, monkeypatch):
+        reg_local(Servicer)
+        assert get_local("demo", "Demo") is get_local("demo", "Demo")
+        # 已创建 servicer 后关闭同样生效
+        monkeypatch.setenv("RPC_LOCAL", "0")
+        assert get_local("demo", "Demo") is None
+        context = RuntimeContext()
+        assert bind_local(context, Client(), "get") is context
+
+    def test_call(self, registry):
+        reg_local(Servicer)
+        arg = Arg(1)
+        result = get_local("demo", "Demo").call("get", arg)
+        # Arg 直接传给 impl, 不经过 pb2 的转换
+        assert result == {"value": 2, "timeout": None}
+        assert arg.value == 2
+        assert 0 < get_local("demo", "Demo").call("get", Arg(1), Option(5))["timeout"] <= 5
+
+    def test_copy(self, registry, monkeypatch):
+        reg_local(Servicer)
+        monkeypatch.setenv("RPC_LOCAL_COPY", "1")
+        arg = Arg(1)
+        assert get_local("demo", "Demo").call("get", arg)["value"] == 2
+        assert arg.value == 1
+
+    def test_application_error(self, registry):
+        reg_local(Servicer)
+        with pytest.raises(LocalRpcError) as e:
+            get_local("demo", "Demo").call("get", Arg(0))
+        assert e.value.code() == grpc.StatusCode.UNKNOWN
+        assert isinstance(e.value.__cause__, ValueError)
+
+    def test_stream(self, registry, monkeypatch):
+        reg_local(Servicer)
+        monkeypatch.setenv("RPC_LOCAL_COPY", "1")
+        assert list(get_local("demo", "Demo").call("list", Arg(2))) == [{"value": 0}, {"value": 1}]
+
+    def test_async(self, registry):
+        reg_local(AsyncServicer)
+
+        async def main():
+            service = get_local("demo", "Demo")
+            result = await service.acall("get", Arg(2))
+            items = [item async for item in service.astream("list", Arg(2))]
+            with pytest.raises(LocalRpcError) as e:
+                await service.acall("get", Arg(-1))
+            return result, items, e.value.code()
+
+        assert asyncio.run(main()) == (
+            {"value": 4}, [{"value": 0}, {"value": 1}], grpc.StatusCode.INVALID_ARGUMENT)
@@ -0,0 +1,78 @@
+import threading
+import urllib.request
+
+import pytest
+
+from generator.framework.codegen.addition import metrics
+from generator.framework.codegen.addition.metrics import MethodMetric, Registry
+
+
+class Message(object):
+    def __init__(self, size: int):
+        self.size = size
+
+    def ByteSize(self):
+        return self.size
+
+
+class TestMethodMetric(object):
+    def test_track(self):
+        metric = MethodMetric("Test.track", buckets=(0.5, 10.0))
+        with metric.track(Message(3)) as track:
+            assert track.response(Message(5)).size == 5
+        with pytest.raises(KeyError):
+            with metric.track():
+                raise KeyError("x")
+
+        stats = metric.snapshot()
+        assert stats.started == stats.finished == 2
+        assert stats.errors == 1
+        assert stats.request_bytes == 3
+        assert stats.response_bytes == 5
+        assert stats.bucket_counts == [2, 0, 0]
+
+    def test_merge_thread_shards(self):
+        metric = MethodMetric("Test.threads")
+
+        def call():
+            for _ in range(100):
+                with metric.track():
+                    pass
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert metric.snapshot().finished == 400
+
+
+class TestRegistry(object):
+    def test_prometheus(self, monkeypatch):
+        registry = Registry()
+        monkeypatch.setattr(metrics, "registry", registry)
+        metric = MethodMetric("Demo.get", "client", buckets=(1.0,))
+        with metric.track():
+            pass
+        registry.record_rejected("Demo.get")
+
+        text = registry.to_prometheus()
+        assert "rpc_client_latency_seconds_bucket{method=\"Demo.get\",le=\"1.0\"} 1" in text
+        assert "rpc_client_latency_seconds_bucket{method=\"Demo.get\",le=\"+Inf\"} 1" in text
+        assert "rpc_client_requests_total{method=\"Demo.get\"} 1" in text
+        assert "rpc_client_in_flight{method=\"Demo.get\"} 0" in text
+        assert "rpc_server_rejected_total{method=\"Demo.get\"} 1" in text
+        assert "rpc_server_latency_seconds" not in text
+
+    def test_http_server(self, monkeypatch):
+        registry = Registry()
+        monkeypatch.setattr(metrics, "registry", registry)
+        registry.record_rejected("Demo.get")
+        server = metrics.start_http_server(0, "127.0.0.1")
+        try:
+            response = urllib.request.urlopen("http://127.0.0.1:%d/metrics" % server.server_address[1])
+            assert response.headers["Content-Type"] == metrics.content_type
+            assert b"rpc_server_rejected_total" in response.read()
+        finally:
+            server.shutdown()
+            server.server_close()
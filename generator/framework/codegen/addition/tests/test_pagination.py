@@ -0,0 +1,55 @@
+import pytest
+
+from generator.framework.codegen.addition.pagination import (
+    InvalidCursor, clamp_limit, decode_cursor, encode_cursor, iter_pages)
+from generator.framework.codegen.addition.validate import ValidationError
+
+
+class Arg(object):
+    def __init__(self, cursor=""):
+        self.cursor = cursor
+
+
+class Page(object):
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+class TestCursor(object):
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor({"id": 1024})) == {"id": 1024}
+        assert decode_cursor(encode_cursor(["名字", 1])) == ["名字", 1]
+        assert decode_cursor("", default=0) == 0
+
+    @pytest.mark.parametrize("cursor", ["%%%", "游标", "bm90IGpzb24"])
+    def test_invalid(self, cursor):
+        with pytest.raises(InvalidCursor) as e:
+            decode_cursor(cursor)
+        # 与参数校验错误一样转换为 400 / INVALID_ARGUMENT
+        assert isinstance(e.value, ValidationError)
+        assert e.value.field == "cursor"
+        assert e.value.message == "cursor is not a valid cursor"
+
+
+class TestClampLimit(object):
+    def test_clamp(self):
+        assert clamp_limit(None, 20, 200) == 20
+        assert clamp_limit(-1, 20, 200) == 20
+        assert clamp_limit(50, 20, 200) == 50
+        assert clamp_limit(500, 20, 200) == 200
+
+
+class TestIterPages(object):
+    def test_pages(self):
+        pages = {"": Page([1, 2], "a"), "a": Page([], "b"), "b": Page([3], "")}
+        calls = []
+
+        def call(arg, option=None):
+            calls.append(arg.cursor)
+            return pages[arg.cursor]
+
+        arg = Arg()
+        assert list(iter_pages(call, arg)) == [1, 2, 3]
+        assert calls == ["", "a", "b"]
+        assert arg.cursor == ""
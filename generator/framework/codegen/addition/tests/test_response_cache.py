@@ -0,0 +1,124 @@
+import pytest
+
+from generator.framework.codegen.addition import response_cache
+from generator.framework.codegen.addition.response_cache import ResponseCache, hashable_key
+
+
+class Message(object):
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def SerializeToString(self, deterministic=False):
+        return self.data
+
+
+class Info(object):
+    def __init__(self, age):
+        self.age = age
+
+
+class Arg(object):
+    def __init__(self, uid, info=None, tags=None, extra=None):
+        self.uid = uid
+        self.info = info or Info(0)
+        self.tags = tags or []
+        self.extra = extra or {}
+
+    def convert_pb2(self):
+        return Message(("%s:%s" % (self.uid, self.info.age)).encode())
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(response_cache, "_caches", {})
+
+
+class TestHashableKey(object):
+    def test_nested(self):
+        # 嵌套的参数类型按字段的值计算 key, 字典与键的顺序无关
+        assert hashable_key(Info(1)) == hashable_key(Info(1))
+        assert hashable_key(Info(1)) != hashable_key(Info(2))
+        assert hashable_key({"a": 1, "b": [2]}) == hashable_key({"b": [2], "a": 1})
+        assert hashable_key([Info(1), {"a": {1, 2}}]) == hashable_key([Info(1), {"a": {2, 1}}])
+        assert hashable_key(1) == 1
+        hash(hashable_key((1, Info([1]), {"a": [Info(2)]})))
+
+
+class TestResponseCache(object):
+    def test_whole_arg(self):
+        cache = ResponseCache("Demo.get", 10, 10)
+        cache.put(cache.key(Arg(1, Info(2))), "value")
+        assert cache.get(cache.key(Arg(1, Info(2)))) == "value"
+        assert cache.get(cache.key(Arg(1, Info(3)))) is None
+
+    def test_key_fields(self):
+        cache = ResponseCache("Demo.get", 10, 10, ("info", "extra"))
+        cache.put(cache.key(Arg(1, Info(2), extra={"a": 1, "b": 2})), "value")
+        # 不同的 Arg 对象, 字段的值相同时命中
+        assert cache.get(cache.key(Arg(3, Info(2), extra={"b": 2, "a": 1}))) == "value"
+        assert cache.get(cache.key(Arg(3, Info(4), extra={"b": 2, "a": 1}))) is None
+        assert cache.get_stats()["size"] == 1
+
+    def test_ttl(self, clock):
+        cache = ResponseCache("Demo.get", 10, 10, ("uid",))
+        cache.put(cache.key(Arg(1)), "value")
+        clock[0] += 9
+        assert cache.get(cache.key(Arg(1))) == "value"
+        clock[0] += 2
+        assert cache.get(cache.key(Arg(1))) is None
+        assert cache.get_stats() == {"hits": 1, "misses": 1, "size": 0}
+
+    def test_lru(self):
+        cache = ResponseCache("Demo.get", 10, 2, ("uid",))
+        cache.put(cache.key(Arg(1)), 1)
+        cache.put(cache.key(Arg(2)), 2)
+        # 访问 1 后淘汰最久未使用的 2
+        assert cache.get(cache.key(Arg(1))) == 1
+        cache.put(cache.key(Arg(3)), 3)
+        assert cache.get(cache.key(Arg(2))) is None
+        assert cache.get(cache.key(Arg(1))) == 1
+        assert cache.get(cache.key(Arg(3))) == 3
+
+    def test_invalidate_arg(self):
+        cache = ResponseCache("Demo.get", 10, 10, ("uid", "tags"))
+        cache.put(cache.key(Arg(1, tags=["a"])), 1)
+        cache.put(cache.key(Arg(2, tags=["a"])), 2)
+        cache.invalidate(Arg(1, tags=["a"]))
+        assert cache.get(cache.key(Arg(1, tags=["a"]))) is None
+        assert cache.get(cache.key(Arg(2, tags=["a"]))) == 2
+
+    def test_invalidate_fields(self):
+        cache = ResponseCache("Demo.get", 10, 10, ("uid", "tags"))
+        cache.put(cache.key(Arg(1, tags=["a"])), 1)
+        cache.invalidate(uid=1, tags=["a"])
+        assert cache.get(cache.key(Arg(1, tags=["a"]))) is None
+
+        single = ResponseCache("Demo.list", 10, 10, ("info",))
+        single.put(single.key(Arg(1, Info(5))), 1)
+        single.invalidate(info=Info(5))
+        assert single.get(single.key(Arg(1, Info(5)))) is None
+
+    def test_clear(self):
+        cache = ResponseCache("Demo.get", 10, 10, ("uid",))
+        cache.put(cache.key(Arg(1)), 1)
+        cache.invalidate()
+        assert cache.get_stats()["size"] == 0
+
+
+class TestRegistry(object):
+    def test_stats(self):
+        cache = ResponseCache("Demo.get", 10, 10, ("uid",))
+        cache.put(cache.key(Arg(1)), 1)
+        cache.get(cache.key(Arg(1)))
+        cache.get(cache.key(Arg(2)))
+        assert response_cache.get_cache("Demo.get") is cache
+        assert response_cache.get_stats() == {"Demo.get": {"hits": 1, "misses": 1, "size": 1}}
+        response_cache.clear_all()
+        assert response_cache.get_stats()["Demo.get"]["size"] == 0
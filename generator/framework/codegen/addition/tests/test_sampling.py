@@ -0,0 +1,124 @@
+import asyncio
+import contextlib
+
+import grpc
+
+from generator.framework.codegen.addition import sampling
+from generator.framework.codegen.addition.aio import acall_traced, aiter_traced
+from generator.framework.codegen.addition.sampling import Sampler, SamplingInterceptor, sampled_stub
+
+
+class ServicerContext(object):
+    def __init__(self, metadata=()):
+        self.metadata = metadata
+
+    def invocation_metadata(self):
+        return self.metadata
+
+
+class Trace(object):
+    """
+    代替 runtime 的 TraceContext, 记录被进入的 context
+    """
+    entered = []
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self):
+        self.entered.append(self.context)
+
+    def __exit__(self, *args):
+        pass
+
+
+class CallDetails(grpc.ClientCallDetails):
+    def __init__(self, metadata=None):
+        self.method = "/Demo/get"
+        self.timeout = 1.0
+        self.metadata = metadata
+        self.credentials = None
+        self.wait_for_ready = None
+        self.compression = None
+
+
+class TestSampler(object):
+    def test_rate(self, monkeypatch):
+        monkeypatch.delenv("RPC_TRACE_SAMPLE_RATE", raising=False)
+        assert Sampler("Demo.get", 0).decide() is False
+        assert Sampler("Demo.get", 1).decide() is True
+        assert Sampler("Demo.get", -1, 0.0).rate == 0.0
+        monkeypatch.setenv("RPC_TRACE_SAMPLE_RATE", "0.5")
+        assert Sampler("Demo.get", -1, 0.0).rate == 0.5
+        assert Sampler("Demo.get", 0.2, 0.0).rate == 0.2
+
+    def test_scope_uses_metadata(self):
+        sampler = Sampler("Demo.get", 1)
+        with sampler.scope(ServicerContext(((sampling.sampled_key, "0"),))) as sampled:
+            assert sampled is False
+            assert sampling.outgoing_metadata() == ((sampling.sampled_key, "0"),)
+        assert sampling.current() is None
+        assert sampling.outgoing_metadata() is None
+
+    def test_call_scope_follows_upstream(self):
+        with Sampler("Demo.get", 0).scope(ServicerContext()):
+            with Sampler("Demo.put", 1).call_scope() as sampled:
+                assert sampled is False
+        with Sampler("Demo.put", 1).call_scope() as sampled:
+            assert sampled is True
+            assert sampling.current() is True
+        assert sampling.current() is None
+
+    def test_trace(self):
+        Trace.entered = []
+        with Sampler("Demo.get", 0).trace(Trace, "skipped"):
+            assert sampling.current() is False
+        with Sampler("Demo.get", 1).trace(Trace, "traced"):
+            assert sampling.current() is True
+        assert Trace.entered == ["traced"]
+
+
+class TestSamplingInterceptor(object):
+    def test_with_metadata(self):
+        details = CallDetails((("key", "value"),))
+        assert SamplingInterceptor.with_metadata(details) is details
+        with Sampler("Demo.get", 0).call_scope():
+            new_details = SamplingInterceptor.with_metadata(details)
+        assert new_details.method == "/Demo/get"
+        assert new_details.timeout == 1.0
+        assert new_details.metadata == (("key", "value"), (sampling.sampled_key, "0"))
+
+    def test_sampled_stub(self):
+        with contextlib.closing(grpc.insecure_channel("localhost:1")) as channel:
+            stub = sampled_stub(lambda c: c)(channel)
+            assert stub is not channel
+            assert hasattr(stub, "unary_unary")
+
+
+class TestAsyncSampling(object):
+    def test_acall_traced(self):
+        Trace.entered = []
+
+        async def call(value):
+            return value, sampling.current()
+
+        async def main():
+            skipped = await acall_traced(Trace, "skipped", call, 1, sampler=Sampler("Demo.get", 0))
+            traced = await acall_traced(Trace, "traced", call, 2, sampler=Sampler("Demo.get", 1))
+            return skipped, traced
+
+        assert asyncio.run(main()) == ((1, False), (2, True))
+        # 每一步都会进入 trace
+        assert set(Trace.entered) == {"traced"}
+
+    def test_aiter_traced(self):
+        Trace.entered = []
+
+        def items():
+            yield sampling.current()
+
+        async def main():
+            return [item async for item in aiter_traced(Trace, "skipped", items, sampler=Sampler("Demo.list", 0))]
+
+        assert asyncio.run(main()) == [False]
+        assert Trace.entered == []
@@ -0,0 +1,159 @@
+import contextlib
+import json
+import os
+
+import grpc
+import pytest
+
+from generator.framework.codegen.addition import server
+from generator.framework.codegen.addition.limiter import LimitExceeded
+from generator.framework.codegen.addition.pagination import decode_cursor
+from generator.framework.codegen.addition.server import ServerOption, handle_errors
+from generator.framework.codegen.addition.validate import ValidationError
+
+
+class TestServerOption(object):
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("RPC_ADDRESS", "127.0.0.1:6000")
+        monkeypatch.setenv("RPC_SERVER_WORKERS", "3")
+        monkeypatch.delenv("RPC_SERVER_PROCESSES", raising=False)
+        option = ServerOption.from_env(workers=8, processes=2)
+        assert option.address == "127.0.0.1:6000"
+        assert option.workers == 3
+        assert option.processes == 2
+
+    def test_defaults(self):
+        option = ServerOption(processes=1)
+        assert option.get_workers() > 0
+        assert option.get_max_concurrent_rpcs() is None
+        assert option.channel_options() == []
+
+    def test_channel_options(self):
+        option = ServerOption(max_send_message_bytes=10, keepalive_time_ms=100, processes=2)
+        options = dict(option.channel_options())
+        assert options["grpc.max_send_message_length"] == 10
+        assert options["grpc.keepalive_time_ms"] == 100
+        assert options["grpc.so_reuseport"] == 1
+
+
+class Servicer(object):
+    from_project = "demo"
+    rpc_name = "Demo"
+
+
+class TestRegistry(object):
+    def test_reg_servicer(self, monkeypatch):
+        monkeypatch.setattr(server, "_servicers", [])
+
+        def add_func(servicer, grpc_server):
+            pass
+
+        server.reg_servicer(Servicer, add_func)
+        assert server.get_servicers() == [(Servicer, add_func)]
+
+    def test_run_single_process(self):
+        called = []
+        assert server.run_processes(lambda: called.append(1), 1) == 0
+        assert called == [1]
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_run_processes(self, monkeypatch):
+        # 不替换测试进程自身的信号处理
+        monkeypatch.setattr(server.signal, "signal", lambda signum, handler: None)
+        assert server.run_processes(lambda: None, 2) == 0
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_child_failure(self, monkeypatch, capfd):
+        monkeypatch.setattr(server.signal, "signal", lambda signum, handler: None)
+
+        def boom():
+            if os.environ[server.process_index_env] == "1":
+                raise OSError("bind failed")
+
+        # 子进程的异常不再被吞掉, 父进程返回非 0 的状态
+        assert server.run_processes(boom, 2) == 1
+        assert "OSError: bind failed" in capfd.readouterr().err
+
+    def test_loop_exit_status(self, monkeypatch):
+        monkeypatch.setattr(server, "_servicers", [])
+        monkeypatch.setattr(server, "registered", lambda rpc_names, address: contextlib.nullcontext())
+        monkeypatch.setattr(server, "run_processes", lambda target, processes: 1)
+        with pytest.raises(SystemExit) as e:
+            server.loop(ServerOption(processes=2))
+        assert e.value.code == 1
+
+
+class Aborted(Exception):
+    pass
+
+
+class Context(object):
+    def __init__(self):
+        self.code = None
+        self.details = None
+        self.trailing_metadata = None
+
+    def set_trailing_metadata(self, trailing_metadata):
+        self.trailing_metadata = trailing_metadata
+
+    def abort(self, code, details):
+        self.code = code
+        self.details = details
+        raise Aborted()
+
+
+class TestHandleErrors(object):
+    def test_limit_exceeded(self):
+        context = Context()
+        with pytest.raises(Aborted):
+            with handle_errors(context):
+                raise LimitExceeded("Demo.get", "busy")
+        assert context.code == grpc.StatusCode.RESOURCE_EXHAUSTED
+        assert context.details == "busy"
+
+    def test_validation_error(self):
+        context = Context()
+        with pytest.raises(Aborted):
+            with handle_errors(context):
+                raise ValidationError("name", "min_length", 1)
+        assert context.code == grpc.StatusCode.INVALID_ARGUMENT
+        assert context.details == "name length must be >= 1"
+        ((key, value),) = context.trailing_metadata
+        assert key == "validation-error"
+        assert json.loads(value)["rule"] == "min_length"
+
+    def test_invalid_cursor(self):
+        context = Context()
+        with pytest.raises(Aborted):
+            with handle_errors(context):
+                decode_cursor("bm90IGpzb24")
+        assert context.code == grpc.StatusCode.INVALID_ARGUMENT
+        assert context.details == "cursor is not a valid cursor"
+
+    def test_other_errors(self):
+        context = Context()
+        with pytest.raises(KeyError):
+            with handle_errors(context):
+                raise KeyError("x")
+        assert context.code is None
+
+
+class TestLoop(object):
+    def test_register_from_parent(self, monkeypatch):
+        monkeypatch.setattr(server, "_servicers", [(Servicer, None)])
+        events = []
+
+        @contextlib.contextmanager
+        def registered(rpc_names, address):
+            events.append(("register", rpc_names, address))
+            yield
+            events.append("deregister")
+
+        def run_processes(target, processes):
+            events.append(("run", processes))
+
+        monkeypatch.setattr(server, "registered", registered)
+        monkeypatch.setattr(server, "run_processes", run_processes)
+        server.loop(ServerOption(address="127.0.0.1:6000", processes=4))
+        # 子进程共用同一地址，只由父进程注册一次
+        assert events == [("register", ["Demo"], "127.0.0.1:6000"), ("run", 4), "deregister"]
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+import pytest
+
+from generator.framework.codegen.addition.single_flight import SingleFlight, AsyncSingleFlight
+
+
+class Message(object):
+    def __init__(self, value):
+        self.value = value
+
+    def SerializeToString(self, deterministic=False):
+        assert deterministic
+        return str(self.value).encode()
+
+
+class Arg(object):
+    def __init__(self, value):
+        self.value = value
+
+    def convert_pb2(self):
+        return Message(self.value)
+
+
+class Context(object):
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def call(self, arg, option=None):
+        self.calls += 1
+        self.release.wait(5)
+        if arg.convert_pb2().value < 0:
+            raise ValueError("negative")
+        return arg.convert_pb2().value * 2
+
+
+class AsyncContext(object):
+    def __init__(self):
+        self.calls = 0
+
+    async def call(self, arg, option=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if arg.convert_pb2().value < 0:
+            raise ValueError("negative")
+        return arg.convert_pb2().value * 2
+
+
+def run_together(flight: SingleFlight, context: Context, values):
+    results = [None] * len(values)
+
+    def call(index):
+        try:
+            results[index] = flight.call(context, Arg(values[index]))
+        except ValueError as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(values))]
+    for thread in threads:
+        thread.start()
+    # 等待所有调用都进入 do 后再让第一个调用返回
+    while flight.calls + flight.shared < len(values):
+        threading.Event().wait(0.001)
+    context.release.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(object):
+    def test_share_result(self):
+        flight = SingleFlight("Demo.get")
+        context = Context()
+        assert run_together(flight, context, [1, 1, 1, 2]) == [2, 2, 2, 4]
+        assert context.calls == 2
+        assert flight.get_stats() == {"calls": 2, "shared": 2}
+        assert flight._flights == {}
+
+    def test_share_error(self):
+        flight = SingleFlight("Demo.get")
+        results = run_together(flight, Context(), [-1, -1])
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.get_stats() == {"calls": 1, "shared": 1}
+
+    def test_sequential_calls(self):
+        flight = SingleFlight("Demo.get")
+        context = Context()
+        context.release.set()
+        assert flight.call(context, Arg(1)) == 2
+        assert flight.call(context, Arg(1)) == 2
+        assert context.calls == 2
+
+
+class TestAsyncSingleFlight(object):
+    def test_share_result(self):
+        flight = AsyncSingleFlight("Demo.get")
+        context = AsyncContext()
+
+        async def main():
+            return await asyncio.gather(*[flight.acall(context, Arg(value)) for value in (1, 1, 2)])
+
+        assert asyncio.run(main()) == [2, 2, 4]
+        assert context.calls == 2
+        assert flight._tasks == {}
+
+    def test_cancel_waiter(self):
+        flight = AsyncSingleFlight("Demo.get")
+        context = AsyncContext()
+
+        async def main():
+            first = asyncio.ensure_future(flight.acall(context, Arg(1)))
+            second = asyncio.ensure_future(flight.acall(context, Arg(1)))
+            await asyncio.sleep(0)
+            first.cancel()
+            # 取消某个等待者不影响共享的调用
+            return await second, first.cancelled()
+
+        assert asyncio.run(main()) == (2, True)
+        assert context.calls == 1
+
+    def test_share_error(self):
+        flight = AsyncSingleFlight("Demo.get")
+
+        async def main():
+            return await asyncio.gather(*[flight.acall(AsyncContext(), Arg(-1)) for _ in range(2)],
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            asyncio.run(flight.acall(AsyncContext(), Arg(-1)))
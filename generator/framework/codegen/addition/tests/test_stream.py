@@ -0,0 +1,55 @@
+from generator.framework.codegen.addition.stream import iter_traced, iter_elements, iter_data
+
+
+class FakeTrace(object):
+    def __init__(self):
+        self.active = False
+        self.entered = 0
+
+    def __enter__(self):
+        self.active = True
+        self.entered += 1
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.active = False
+
+
+class Message(object):
+    def __init__(self, data):
+        self.data = data
+
+
+class Element(object):
+    def from_pb2(self, message):
+        self.value = message.data
+
+
+class TestIterTraced(object):
+    def test_scope_held_until_exhausted(self):
+        trace = FakeTrace()
+
+        def call(arg, option=None):
+            for i in range(arg):
+                yield i, trace.active, option
+
+        responses = iter_traced(trace, call, 3, option="opt")
+        # 首次迭代时才发起调用
+        assert trace.entered == 0
+        assert list(responses) == [(0, True, "opt"), (1, True, "opt"), (2, True, "opt")]
+        assert trace.entered == 1
+        assert not trace.active
+
+    def test_scope_exited_on_close(self):
+        trace = FakeTrace()
+        responses = iter_traced(trace, iter, [1, 2, 3])
+        assert next(responses) == 1
+        assert trace.active
+        responses.close()
+        assert not trace.active
+
+
+class TestIterElements(object):
+    def test_convert(self):
+        messages = [Message(1), Message(2)]
+        assert [item.value for item in iter_elements(messages, Element)] == [1, 2]
+        assert list(iter_data(messages)) == [1, 2]
@@ -0,0 +1,97 @@
+import flask
+import pytest
+from werkzeug.exceptions import BadRequest, HTTPException
+
+from generator.framework.codegen.addition.pagination import decode_cursor
+from generator.framework.codegen.addition.validate import ValidationError
+from generator.framework.codegen.addition.web_args import ArgPlan, check_arg, handle_validation, parse_bool
+
+
+class Arg(object):
+    def from_dict(self, context):
+        self.__dict__.update(context)
+
+    def validate(self):
+        if getattr(self, "page", 1) < 1:
+            raise ValidationError("page", "minimum", 1)
+
+
+app = flask.Flask(__name__)
+
+plan = ArgPlan(
+    Arg,
+    path=("uid",),
+    query=(("page", int, False), ("tags", str, True), ("active", parse_bool, False)),
+    body=("name",),
+    header=(("token", str, False),),
+)
+
+
+class TestParseBool(object):
+    def test_values(self):
+        assert parse_bool("True") is True
+        assert parse_bool("on") is True
+        assert parse_bool("0") is False
+        assert parse_bool("") is False
+        with pytest.raises(ValueError):
+            parse_bool("maybe")
+
+
+class TestArgPlan(object):
+    def test_collect(self):
+        with app.test_request_context(
+                "/user/1?page=2&tags=a&tags=b&active=yes", method="POST", json={"name": "x", "other": 1},
+                headers={"token": "abc"}):
+            values = plan.collect(flask.request, {"uid": 1})
+        assert values == {"uid": 1, "page": 2, "tags": ["a", "b"], "active": True, "name": "x", "token": "abc"}
+
+    def test_missing(self):
+        # 未出现的参数不包含在结果中, 由 from_dict 使用默认值
+        with app.test_request_context("/user/1"):
+            assert plan.collect(flask.request, {}) == {}
+
+    def test_extract(self):
+        with app.test_request_context("/user/1?page=3"):
+            arg = plan.extract(flask.request, {"uid": 1})
+        assert (arg.uid, arg.page) == (1, 3)
+
+    def test_invalid_value(self):
+        with app.test_request_context("/user/1?page=x"):
+            with pytest.raises(BadRequest) as e:
+                plan.collect(flask.request, {})
+        assert "page" in e.value.description
+
+    def test_body_not_object(self):
+        with app.test_request_context("/user/1", method="POST", json=[1, 2]):
+            with pytest.raises(BadRequest):
+                plan.collect(flask.request, {})
+
+
+class TestCheckArg(object):
+    def test_valid(self):
+        arg = Arg()
+        arg.from_dict({"page": 1})
+        check_arg(arg)
+
+    def test_invalid(self):
+        arg = Arg()
+        arg.from_dict({"page": 0})
+        with pytest.raises(HTTPException) as e:
+            check_arg(arg)
+        assert e.value.code == 400
+        assert e.value.data["errors"] == {"page": "page must be >= 1"}
+        assert e.value.data["validation"]["rule"] == "minimum"
+
+
+class TestHandleValidation(object):
+    def test_invalid_cursor(self):
+        with pytest.raises(HTTPException) as e:
+            with handle_validation():
+                decode_cursor("bm90IGpzb24")
+        assert e.value.code == 400
+        assert e.value.data["errors"] == {"cursor": "cursor is not a valid cursor"}
+
+    def test_other_errors(self):
+        with pytest.raises(KeyError):
+            with handle_validation():
+                raise KeyError("x")
@@ -0,0 +1,108 @@
+import json
+
+import flask
+import pytest
+from flask_restplus import Api
+
+from generator.framework.codegen.addition import web_cache
+from generator.framework.codegen.addition.web_cache import HttpCache, hashable_key, register_stats
+
+app = flask.Flask(__name__)
+
+
+class Arg(object):
+    def __init__(self, uid=1, tags=None):
+        self.uid = uid
+        self.tags = tags
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(web_cache, "_caches", {})
+
+
+def fill(cache: HttpCache, arg: Arg, headers=None):
+    with app.test_request_context("/", headers=headers or {}):
+        key = cache.key(arg)
+        response = cache.get(key)
+        if response is None:
+            response = cache.put(key, {"uid": arg.uid})
+        return key, response
+
+
+class TestHashableKey(object):
+    def test_canonical(self):
+        assert hashable_key(1) == 1
+        assert hashable_key(["a", ["b"]]) == ("a", ("b",))
+        assert hashable_key({"a": 1, "b": [2]}) == hashable_key({"b": [2], "a": 1})
+        hash(hashable_key((1, {"a": [1, 2]}, {3})))
+
+
+class TestHttpCache(object):
+    def test_hit(self):
+        cache = HttpCache("Demo.get", 60, 10, ("uid",))
+        _, first = fill(cache, Arg(1))
+        _, second = fill(cache, Arg(1))
+        assert json.loads(second.get_data()) == {"uid": 1}
+        assert second.headers["ETag"] == first.headers["ETag"]
+        stats = web_cache.get_stats()["Demo.get"]
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_not_modified(self):
+        cache = HttpCache("Demo.get", 60, 10, ("uid",))
+        _, response = fill(cache, Arg(1))
+        _, response = fill(cache, Arg(1), {"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+
+    def test_expires(self, monkeypatch):
+        cache = HttpCache("Demo.get", 0.001, 10, ("uid",))
+        key, _ = fill(cache, Arg(1))
+        now = web_cache.time.monotonic() + 1
+        monkeypatch.setattr(web_cache.time, "monotonic", lambda: now)
+        with app.test_request_context("/"):
+            assert cache.get(key) is None
+
+    def test_lru(self):
+        cache = HttpCache("Demo.get", 60, 2, ("uid",))
+        fill(cache, Arg(1))
+        fill(cache, Arg(2))
+        fill(cache, Arg(1))
+        fill(cache, Arg(3))
+        assert list(cache._entries) == [1, 3]
+
+    def test_vary_headers(self):
+        cache = HttpCache("Demo.get", 60, 10, ("uid",), ("Accept-Language",))
+        zh, response = fill(cache, Arg(1), {"Accept-Language": "zh"})
+        en, _ = fill(cache, Arg(1), {"Accept-Language": "en"})
+        assert zh != en
+        assert response.headers["Vary"] == "Accept-Language"
+
+
+class TestInvalidate(object):
+    def test_scalar(self):
+        cache = HttpCache("Demo.get", 60, 10, ("uid",))
+        fill(cache, Arg(1))
+        fill(cache, Arg(2))
+        cache.invalidate(Arg(1))
+        assert list(cache._entries) == [2]
+        cache.invalidate()
+        assert len(cache._entries) == 0
+
+    def test_list_arg_with_headers(self):
+        # 列表参数与 vary_headers 同时使用时同样可以按参数失效
+        cache = HttpCache("Demo.get", 60, 10, ("uid", "tags"), ("Accept-Language",))
+        fill(cache, Arg(1, ["a"]), {"Accept-Language": "zh"})
+        fill(cache, Arg(1, ["a"]), {"Accept-Language": "en"})
+        fill(cache, Arg(1, ["b"]), {"Accept-Language": "zh"})
+        cache.invalidate(Arg(1, ["a"]))
+        assert [key[0] for key in cache._entries] == [(1, ("b",))]
+
+
+class TestRegisterStats(object):
+    def test_route(self):
+        stats_app = flask.Flask(__name__)
+        register_stats(Api(stats_app))
+        HttpCache("Demo.get", 60, 10, ("uid",))
+        response = stats_app.test_client().get("/_cache/stats")
+        assert response.status_code == 200
+        assert json.loads(response.get_data())["Demo.get"]["size"] == 0
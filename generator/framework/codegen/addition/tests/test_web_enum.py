@@ -0,0 +1,54 @@
+import json
+
+import flask
+
+from generator.framework.codegen.addition import web_enum
+from generator.framework.codegen.addition.web_enum import EnumPayloads
+
+app = flask.Flask(__name__)
+
+
+def payloads() -> EnumPayloads:
+    enums = EnumPayloads()
+    enums.add("Color", {"info": [{"key": "RED", "value": 1, "description": "red"}]})
+    enums.add("Size", {"info": [{"key": "BIG", "value": 2, "description": "big"}]})
+    return enums
+
+
+class TestEnumPayloads(object):
+    def test_response(self, monkeypatch):
+        monkeypatch.setenv("WEB_ENUM_CACHE_CONTROL", "no-cache")
+        enums = payloads()
+        with app.test_request_context("/enum/Color"):
+            response = enums.response("Color")
+        assert json.loads(response.get_data())["info"][0]["key"] == "RED"
+        assert response.headers["Cache-Control"] == "no-cache"
+
+        etag = response.headers["ETag"]
+        with app.test_request_context("/enum/Color", headers={"If-None-Match": etag}):
+            assert enums.response("Color").status_code == 304
+
+    def test_response_all(self):
+        enums = payloads()
+        with app.test_request_context("/enum/_all"):
+            response = enums.response_all()
+        assert set(json.loads(response.get_data())) == {"Color", "Size"}
+        assert response.headers["Cache-Control"] == web_enum.default_cache_control
+
+    def test_filtered(self):
+        enums = payloads()
+        with app.test_request_context("/enum/_all"):
+            # 不存在的名称被忽略, 名称的顺序及重复不影响结果
+            first = enums.response_all("Size, Missing,Size")
+            second = enums.response_all("Size")
+        assert list(json.loads(first.get_data())) == ["Size"]
+        assert first.headers["ETag"] == second.headers["ETag"]
+        assert list(enums._filtered) == [("Size",)]
+
+    def test_max_filtered(self, monkeypatch):
+        monkeypatch.setattr(web_enum, "max_filtered", 1)
+        enums = payloads()
+        with app.test_request_context("/enum/_all"):
+            enums.response_all("Color")
+            enums.response_all("Size")
+        assert list(enums._filtered) == [("Size",)]
@@ -0,0 +1,93 @@
+import itertools
+import sys
+
+import flask
+import pytest
+from flask_restplus import Api
+from werkzeug.exceptions import NotFound
+
+from generator.framework.codegen.addition.web_lazy import LazyRegistry
+
+resource_module = """
+from flask_restplus import Resource
+
+from . import api
+
+ns = api.namespace("user")
+
+
+@ns.route("/<int:uid>")
+class UserResource(Resource):
+    def get(self, uid):
+        return {"uid": uid}
+"""
+
+_counter = itertools.count()
+
+
+@pytest.fixture()
+def package(tmp_path, monkeypatch):
+    """
+    生成只包含一个接口模块的包, 接口模块使用包中的 api
+    """
+    name = "lazy_api_%d" % next(_counter)
+    root = tmp_path / name
+    root.mkdir()
+    (root / "__init__.py").write_text("api = None\n")
+    (root / "user.py").write_text(resource_module)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    for module in [module for module in sys.modules if module.startswith(name)]:
+        del sys.modules[module]
+
+
+def create(package: str):
+    app = flask.Flask(__name__)
+    api = Api(app)
+    __import__(package).api = api
+    registry = LazyRegistry(api, package + ".api_reg", {"user": [".user"]})
+    return app, registry
+
+
+class TestLazyRegistry(object):
+    def test_first_request(self, package, monkeypatch):
+        monkeypatch.delenv("WEB_LAZY_IMPORT", raising=False)
+        app, registry = create(package)
+        assert package + ".user" not in sys.modules
+        response = app.test_client().get("/user/1")
+        assert response.status_code == 200
+        assert response.get_json() == {"uid": 1}
+        assert registry.pending == {}
+
+    def test_loaded_by_other_request(self, package, monkeypatch):
+        monkeypatch.delenv("WEB_LAZY_IMPORT", raising=False)
+        app, registry = create(package)
+        with app.test_request_context("/user/1"):
+            assert isinstance(flask.request.routing_exception, NotFound)
+            # 本次请求匹配之后, 其它请求导入了该 namespace
+            registry.load("user")
+            assert registry.pending == {}
+            registry.before_request()
+            assert flask.request.routing_exception is None
+            assert flask.request.view_args == {"uid": 1}
+
+    def test_not_found(self, package, monkeypatch):
+        monkeypatch.delenv("WEB_LAZY_IMPORT", raising=False)
+        app, registry = create(package)
+        client = app.test_client()
+        assert client.get("/other/1").status_code == 404
+        assert registry.pending
+        assert client.get("/user/x").status_code == 404
+        assert registry.pending == {}
+
+    def test_disabled(self, package, monkeypatch):
+        monkeypatch.setenv("WEB_LAZY_IMPORT", "0")
+        _, registry = create(package)
+        assert package + ".user" in sys.modules
+        assert registry.pending == {}
+
+    def test_namespace_of(self, package):
+        _, registry = create(package)
+        assert registry.namespace_of("/user/1") == "user"
+        registry.api.prefix = "/api"
+        assert registry.namespace_of("/api/user/1") == "user"
@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+
+import flask
+
+from generator.framework.codegen.addition.web_marshal import cached_response, dumps, json_response, marshal_list, \
+    to_bytes
+
+app = flask.Flask(__name__)
+
+
+@pytest.fixture()
+def local_tz(monkeypatch):
+    """
+    使用与 UTC 不同的本地时区
+    """
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+class TestEncode(object):
+    def test_dumps(self):
+        assert json.loads(to_bytes({"name": "名字", "ids": [1, 2]})) == {"name": "名字", "ids": [1, 2]}
+        body = dumps({"a": 1})
+        assert json.loads(body if isinstance(body, str) else body.decode("utf-8")) == {"a": 1}
+
+    def test_json_response(self):
+        with app.app_context():
+            response = json_response({"id": 1}, 201, {"X-Demo": "1"})
+        assert response.status_code == 201
+        assert response.mimetype == "application/json"
+        assert response.headers["X-Demo"] == "1"
+        assert json.loads(response.get_data()) == {"id": 1}
+
+    def test_marshal_list(self):
+        assert marshal_list(None) is None
+        assert marshal_list((1, 2)) == [1, 2]
+        assert marshal_list([1, 2], lambda value: {"id": value}) == [{"id": 1}, {"id": 2}]
+
+
+class TestCachedResponse(object):
+    def test_full_response(self):
+        with app.test_request_context("/"):
+            response = cached_response(b"{}", "abc", "max-age=60", last_modified=0)
+        assert response.status_code == 200
+        assert response.get_data() == b"{}"
+        assert response.headers["ETag"] == "\"abc\""
+        assert response.headers["Cache-Control"] == "max-age=60"
+        assert "Last-Modified" in response.headers
+
+    def test_if_none_match(self):
+        with app.test_request_context("/", headers={"If-None-Match": "\"abc\""}):
+            assert cached_response(b"{}", "abc").status_code == 304
+        with app.test_request_context("/", headers={"If-None-Match": "\"other\""}):
+            assert cached_response(b"{}", "abc").status_code == 200
+
+    def test_if_modified_since(self):
+        modified = time.time() - 60
+        with app.test_request_context("/"):
+            response = cached_response(b"{}", "abc", last_modified=modified)
+        since = response.headers["Last-Modified"]
+        with app.test_request_context("/", headers={"If-Modified-Since": since}):
+            assert cached_response(b"{}", "abc", last_modified=modified).status_code == 304
+            # 内容在之后更新时返回完整的响应
+            assert cached_response(b"{}", "abc", last_modified=modified + 120).status_code == 200
+        # 同时存在时以 If-None-Match 为准
+        with app.test_request_context("/", headers={"If-Modified-Since": since, "If-None-Match": "\"other\""}):
+            assert cached_response(b"{}", "abc", last_modified=modified).status_code == 200
+
+    def test_if_modified_since_timezone(self, local_tz):
+        modified = time.time() - 7200
+        with app.test_request_context("/"):
+            since = cached_response(b"{}", "abc", last_modified=modified).headers["Last-Modified"]
+        with app.test_request_context("/", headers={"If-Modified-Since": since}):
+            assert cached_response(b"{}", "abc", last_modified=modified).status_code == 304
+            # 一小时后更新的内容不能因本地时区的偏移返回 304
+            assert cached_response(b"{}", "abc", last_modified=modified + 3600).status_code == 200
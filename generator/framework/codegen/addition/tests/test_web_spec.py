@@ -0,0 +1,51 @@
+import json
+
+import flask
+from flask_restplus import Api
+
+from generator.framework.codegen.addition.web_spec import StaticSpec, register_models, register_spec, skip_doc
+
+spec = {"swagger": "2.0", "info": {"title": "API", "version": "1.0"}, "paths": {"/user": {}}}
+
+
+class TestRegisterModels(object):
+    def test_env(self, monkeypatch):
+        monkeypatch.delenv("WEB_REGISTER_MODELS", raising=False)
+        assert register_models() is True
+        monkeypatch.setenv("WEB_REGISTER_MODELS", "0")
+        assert register_models() is False
+
+    def test_skip_doc(self):
+        def get():
+            pass
+
+        assert skip_doc(get) is get
+
+
+class TestStaticSpec(object):
+    def test_prepare(self):
+        api = Api(title="Demo", version="2.0")
+        static_spec = StaticSpec(api, spec)
+        body, etag = static_spec.prepare()
+        data = json.loads(body)
+        assert data["info"] == {"title": "Demo", "version": "2.0"}
+        assert data["paths"] == {"/user": {}}
+        # 只编码一次, 且不修改生成的文档
+        assert static_spec.prepare() == (body, etag)
+        assert spec["info"]["title"] == "API"
+
+    def test_register_spec(self, tmp_path):
+        spec_file = tmp_path / "swagger.json"
+        spec_file.write_text(json.dumps(spec))
+        app = flask.Flask(__name__)
+        api = Api(app, title="Demo")
+        register_spec(api, str(spec_file))
+        # /swagger.json 同样使用生成的文档
+        assert api.__schema__ == spec
+
+        client = app.test_client()
+        response = client.get("/openapi.json")
+        assert response.status_code == 200
+        assert json.loads(response.get_data())["info"]["title"] == "Demo"
+        etag = response.headers["ETag"]
+        assert client.get("/openapi.json", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,36 @@
+import json
+
+import flask
+
+from generator.framework.codegen.addition.web_stream import iter_chunks, stream_response
+
+app = flask.Flask(__name__)
+
+
+def rows(count):
+    for i in range(count):
+        yield {"id": i}
+
+
+class TestIterChunks(object):
+    def test_array(self):
+        chunks = list(iter_chunks(rows(3), lambda row: row["id"], chunk_bytes=2))
+        assert len(chunks) > 1
+        assert json.loads(b"".join(chunks)) == [0, 1, 2]
+
+    def test_empty(self):
+        assert b"".join(iter_chunks(rows(0))) == b"[]"
+        assert list(iter_chunks(rows(0), fmt="ndjson")) == []
+
+    def test_ndjson(self):
+        body = b"".join(iter_chunks(rows(2), fmt="ndjson"))
+        assert [json.loads(line) for line in body.splitlines()] == [{"id": 0}, {"id": 1}]
+
+
+class TestStreamResponse(object):
+    def test_response(self):
+        with app.test_request_context("/"):
+            response = stream_response(rows(2), fmt="ndjson")
+            assert response.mimetype == "application/x-ndjson"
+            assert response.is_streamed
+            assert len(response.get_data().splitlines()) == 2
@@ -0,0 +1,44 @@
+"""
+参数约束的校验错误, 生成的参数类型的 validate 方法逐个检查字段的约束，遇到第一个不满足的约束时抛出 ValidationError,
+Flask 接口将其转换为 400, gRPC 服务端将其转换为 INVALID_ARGUMENT
+"""
+
+import typing
+
+# 各约束不满足时的错误信息
+messages = {
+    "required": "%(field)s is required",
+    "min_length": "%(field)s length must be >= %(limit)r",
+    "max_length": "%(field)s length must be <= %(limit)r",
+    "minimum": "%(field)s must be >= %(limit)r",
+    "maximum": "%(field)s must be <= %(limit)r",
+    "min_items": "%(field)s must have at least %(limit)r items",
+    "max_items": "%(field)s must have at most %(limit)r items",
+    "must_true": "%(field)s must be true",
+    "must_false": "%(field)s must be false",
+    "cursor": "%(field)s is not a valid cursor",
+}
+
+
+class ValidationError(ValueError):
+    """
+    参数不满足约束
+    """
+
+    def __init__(self, field: str, rule: str, limit: typing.Any = None):
+        """
+        :param field: 字段的路径, 嵌套字段使用 . 连接, 列表元素使用 [index], 如 rows[0].name
+        :param rule: 不满足的约束名称，与 fields 定义时的参数名相同
+        :param limit: 约束的值
+        """
+        self.field = field
+        self.rule = rule
+        self.limit = limit
+        super().__init__(self.message)
+
+    @property
+    def message(self) -> str:
+        return messages.get(self.rule, "%(field)s is invalid") % {"field": self.field, "limit": self.limit}
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {"field": self.field, "rule": self.rule, "limit": self.limit, "message": self.message}
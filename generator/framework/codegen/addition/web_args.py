@@ -0,0 +1,134 @@
+"""
+Flask 接口的静态参数提取计划, 参数来源 (path / query / body / header)、类型及是否为列表在生成时已经确定,
+导入时构建一次，每次请求只需要按计划查找字典并转换类型，不再反射参数定义
+"""
+
+import contextlib
+import typing
+
+from flask_restplus import abort
+from werkzeug.exceptions import BadRequest
+
+from .validate import ValidationError
+
+
+def parse_bool(value: str) -> bool:
+    """
+    query 及 header 中的布尔值
+    """
+    lower = value.lower()
+    if lower in ("1", "true", "yes", "on"):
+        return True
+    if lower in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError("invalid bool value %r" % value)
+
+
+# 字段的提取方式: (参数名, 类型转换函数, 是否为列表)
+FieldPlan = typing.Tuple[str, typing.Callable[[str], typing.Any], bool]
+
+
+class ArgPlan(object):
+    """
+    单个接口的参数提取计划
+    """
+    __slots__ = ("arg_type", "path", "query", "body", "header")
+
+    def __init__(
+            self,
+            arg_type,
+            path: typing.Sequence[str] = (),
+            query: typing.Sequence[FieldPlan] = (),
+            body: typing.Sequence[str] = (),
+            header: typing.Sequence[FieldPlan] = ()
+    ):
+        """
+        :param arg_type: 生成的 Arg 类型
+        :param path: 来自 url 的参数名, 由 Flask 的 url converter 完成类型转换
+        :param query: 来自 query string 的参数
+        :param body: 来自 json body 的参数名, 保持 json 中的类型
+        :param header: 来自 header 的参数
+        """
+        self.arg_type = arg_type
+        self.path = tuple(path)
+        self.query = tuple(query)
+        self.body = tuple(body)
+        self.header = tuple(header)
+
+    def collect(self, request, view_args: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        """
+        按计划收集请求中的参数，未出现的参数不包含在结果中, 由 Arg 的 from_dict 使用默认值
+        :param request: Flask 的 request
+        :param view_args: Flask 传递给接口方法的 url 参数
+        """
+        values = {}
+        for name in self.path:
+            if name in view_args:
+                values[name] = view_args[name]
+
+        if self.query:
+            query = request.args
+            for (name, convert, is_list) in self.query:
+                if is_list:
+                    raw = query.getlist(name)
+                    if raw:
+                        values[name] = [convert_value(name, convert, item) for item in raw]
+                else:
+                    raw = query.get(name)
+                    if raw is not None:
+                        values[name] = convert_value(name, convert, raw)
+
+        if self.body:
+            body = request.get_json(silent=True)
+            if body is not None and not isinstance(body, dict):
+                raise BadRequest("request body must be a json object")
+            if body:
+                for name in self.body:
+                    if name in body:
+                        values[name] = body[name]
+
+        if self.header:
+            headers = request.headers
+            for (name, convert, _) in self.header:
+                raw = headers.get(name)
+                if raw is not None:
+                    values[name] = convert_value(name, convert, raw)
+        return values
+
+    def extract(self, request, view_args: typing.Dict[str, typing.Any]):
+        """
+        提取参数并构建 Arg
+        """
+        arg = self.arg_type()
+        arg.from_dict(self.collect(request, view_args))
+        return arg
+
+
+def check_arg(arg):
+    """
+    校验提取得到的参数，不满足约束时返回与 flask_restplus 校验失败时相同格式的 400
+    :param arg: 生成的 Arg 类型
+    """
+    with handle_validation():
+        arg.validate()
+
+
+@contextlib.contextmanager
+def handle_validation():
+    """
+    将范围内抛出的 ValidationError 转换为与 flask_restplus 校验失败时相同格式的 400,
+    分页接口的 impl 在此范围内调用, decode_cursor 抛出的 InvalidCursor 不会成为 500
+    """
+    try:
+        yield
+    except ValidationError as e:
+        abort(400, "Input payload validation failed", errors={e.field: e.message}, validation=e.to_dict())
+
+
+def convert_value(name: str, convert: typing.Callable[[str], typing.Any], raw: str):
+    if convert is str:
+        return raw
+    try:
+        return convert(raw)
+    except (TypeError, ValueError):
+        raise BadRequest("argument %s: invalid value %r" % (name, raw))
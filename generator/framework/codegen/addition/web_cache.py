@@ -0,0 +1,224 @@
+"""
+Flask GET 接口的进程内响应缓存, 有上限的 LRU 缓存，每个条目在 ttl 秒后过期
+
+缓存保存的是编码后的 json 及其 ETag / Last-Modified, 命中时不再调用 impl, 请求的 If-None-Match 与缓存的 ETag
+相同时直接返回 304, 所有缓存的命中率及耗时可以通过 get_stats 获取, 设置 web_cache_stats 时
+还可以通过 register_stats 注册的接口查看
+"""
+
+import hashlib
+import threading
+import time
+import typing
+
+from collections import OrderedDict
+from operator import attrgetter
+
+from flask import request
+from flask_restplus import Resource
+
+from .response_cache import hashable_key
+from .web_marshal import to_bytes, cached_response, json_response
+
+# 所有已创建的缓存，key 为 Resource.method
+_caches: typing.Dict[str, "HttpCache"] = {}
+
+
+def get_cache(name: str) -> "HttpCache":
+    """
+    获取接口的缓存
+    :param name: Resource.method
+    """
+    return _caches[name]
+
+
+def clear_all():
+    """
+    清空所有接口的缓存
+    """
+    for cache in list(_caches.values()):
+        cache.clear()
+
+
+def get_stats() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """
+    获取所有缓存的当前状态
+    """
+    return {name: cache.get_stats() for (name, cache) in _caches.items()}
+
+
+class CachedBody(object):
+    """
+    缓存的单个响应
+    """
+    __slots__ = ("expires", "body", "etag", "last_modified")
+
+    def __init__(self, expires: float, body: bytes, etag: str, last_modified: float):
+        self.expires = expires
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class HttpCache(object):
+    """
+    单个接口的缓存, eg:
+
+        cache_key = cache.key(args)
+        response = cache.get(cache_key)
+        if response is not None:
+            return response
+        return cache.put(cache_key, marshal_result(impl.get(args)))
+    """
+
+    def __init__(
+            self,
+            name: str,
+            ttl: float,
+            max_entries: int,
+            vary_args: typing.Sequence[str] = (),
+            vary_headers: typing.Sequence[str] = (),
+            cache_control: str = "no-cache"
+    ):
+        """
+        :param name: Resource.method
+        :param ttl: 条目的有效秒数
+        :param max_entries: 最多保存的条目数，超出时淘汰最久未使用的条目
+        :param vary_args: 作为缓存 key 的参数名
+        :param vary_headers: 作为缓存 key 的请求头, 同时作为响应的 Vary 头
+        :param cache_control: 响应的 Cache-Control
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.vary_args = tuple(vary_args)
+        self.vary_headers = tuple(vary_headers)
+        self.cache_control = cache_control
+        self._arg_getter = self.vary_args and attrgetter(*self.vary_args) or None
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        self.miss_max_seconds = 0.0
+        self._entries: typing.OrderedDict[typing.Hashable, CachedBody] = OrderedDict()
+        self._lock = threading.Lock()
+        # 未命中时记录开始时间，put 时计算调用 impl 及编码的耗时
+        self._local = threading.local()
+        _caches[name] = self
+
+    def key(self, args) -> typing.Hashable:
+        """
+        根据参数及请求头计算缓存 key
+        :param args: 生成的 Arg 类型
+        """
+        arg_key = hashable_key(self._arg_getter(args) if self._arg_getter is not None else None)
+        if self.vary_headers:
+            headers = request.headers
+            return arg_key, tuple(headers.get(name) for name in self.vary_headers)
+        return arg_key
+
+    def get(self, key: typing.Hashable):
+        """
+        获取未过期的缓存对应的响应，不存在时返回 None
+        """
+        start = time.perf_counter()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached.expires > now:
+                    self._entries.move_to_end(key)
+                else:
+                    del self._entries[key]
+                    cached = None
+            if cached is None:
+                self.misses += 1
+
+        if cached is None:
+            self._local.start = start
+            return None
+
+        response = self.response(cached)
+        with self._lock:
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - start
+        return response
+
+    def put(self, key: typing.Hashable, data):
+        """
+        编码并缓存接口的返回值
+        :param key: key 方法计算的缓存 key
+        :param data: marshal 函数的结果
+        :return: 对应的响应
+        """
+        body = to_bytes(data)
+        cached = CachedBody(time.monotonic() + self.ttl, body, hashlib.sha1(body).hexdigest(), time.time())
+        start = getattr(self._local, "start", None)
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if start is not None:
+                elapsed = time.perf_counter() - start
+                self.miss_seconds += elapsed
+                self.miss_max_seconds = max(self.miss_max_seconds, elapsed)
+        self._local.start = None
+        return self.response(cached)
+
+    def response(self, cached: CachedBody):
+        response = cached_response(cached.body, cached.etag, self.cache_control, cached.last_modified)
+        if self.vary_headers:
+            response.headers["Vary"] = ", ".join(self.vary_headers)
+        return response
+
+    def invalidate(self, args=None):
+        """
+        使缓存失效
+        :param args: 生成的 Arg 类型, 使该参数对应的所有条目失效, 未指定时清空缓存
+        """
+        if args is None:
+            self.clear()
+            return
+
+        arg_key = hashable_key(self._arg_getter(args) if self._arg_getter is not None else None)
+        with self._lock:
+            if not self.vary_headers:
+                self._entries.pop(arg_key, None)
+                return
+            for key in [k for k in self._entries if k[0] == arg_key]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        获取命中数、未命中数、命中率、当前的条目数及命中与未命中时的平均耗时
+        """
+        hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size": len(self._entries),
+            "hit_avg_ms": self.hit_seconds / hits * 1e3 if hits else 0.0,
+            "miss_avg_ms": self.miss_seconds / misses * 1e3 if misses else 0.0,
+            "miss_max_ms": self.miss_max_seconds * 1e3,
+        }
+
+
+def register_stats(api, url: str = "/_cache/stats"):
+    """
+    注册查看所有接口缓存状态的接口, 该接口没有鉴权, 只应在内部使用的服务中注册
+    :param api: flask_restplus 的 Api
+    :param url: 接口地址
+    """
+
+    class HttpCacheStats(Resource):
+        def get(self):
+            return json_response(get_stats())
+
+    # doc 只能通过 route 指定, add_resource 会将其传给 add_url_rule
+    api.route(url, doc=False)(HttpCacheStats)
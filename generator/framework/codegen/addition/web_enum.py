@@ -0,0 +1,76 @@
+"""
+预先编码的枚举接口返回值, 每个枚举的返回值在导入时编码一次, 所有枚举合并的返回值在 freeze 时编码,
+按名称过滤的合并结果编码后缓存, 每次请求直接返回编码后的内容并带有强 ETag
+"""
+
+import hashlib
+import os
+import threading
+import typing
+
+from .web_marshal import to_bytes, cached_response
+
+# 枚举接口响应的 Cache-Control, 可通过 WEB_ENUM_CACHE_CONTROL 覆盖
+default_cache_control = "public, max-age=300"
+
+# 最多缓存的过滤组合数
+max_filtered = 256
+
+
+def etag_of(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class EnumPayloads(object):
+    """
+    所有枚举接口的返回值
+    """
+
+    def __init__(self):
+        self.cache_control = os.environ.get("WEB_ENUM_CACHE_CONTROL", default_cache_control)
+        self.payloads: typing.Dict[str, dict] = {}
+        self.bodies: typing.Dict[str, typing.Tuple[bytes, str]] = {}
+        self.all_body: typing.Union[typing.Tuple[bytes, str], None] = None
+        self._filtered: typing.Dict[typing.Tuple[str, ...], typing.Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, payload: dict):
+        """
+        添加一个枚举的返回值并编码
+        """
+        body = to_bytes(payload)
+        self.payloads[name] = payload
+        self.bodies[name] = (body, etag_of(body))
+
+    def freeze(self):
+        """
+        所有枚举添加完成后编码合并的返回值
+        """
+        body = to_bytes(self.payloads)
+        self.all_body = (body, etag_of(body))
+
+    def response(self, name: str):
+        body, etag = self.bodies[name]
+        return cached_response(body, etag, self.cache_control)
+
+    def response_all(self, names: str = None):
+        """
+        合并的返回值, key 为枚举名称
+        :param names: 以逗号分隔的枚举名称, 为空时返回所有枚举, 不存在的名称被忽略
+        """
+        if not names:
+            if self.all_body is None:
+                self.freeze()
+            body, etag = self.all_body
+            return cached_response(body, etag, self.cache_control)
+
+        key = tuple(sorted(set(name.strip() for name in names.split(",") if name.strip() in self.payloads)))
+        cached = self._filtered.get(key)
+        if cached is None:
+            body = to_bytes({name: self.payloads[name] for name in key})
+            cached = (body, etag_of(body))
+            with self._lock:
+                if len(self._filtered) >= max_filtered:
+                    self._filtered.clear()
+                self._filtered[key] = cached
+        return cached_response(cached[0], cached[1], self.cache_control)
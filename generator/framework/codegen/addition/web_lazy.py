@@ -0,0 +1,120 @@
+"""
+按需导入生成的接口模块, api_reg.py 只记录 namespace 与模块的对应关系, 请求第一次访问某个 namespace 的路径时
+才导入对应的模块 (同时导入其 _def 及 impl 模块) 并注册路由, 也可以在启动后调用 warm_up 提前导入
+
+Flask 在 debug 模式下不允许处理请求后再注册路由，此时在注册时导入全部模块,
+设置 WEB_LAZY_IMPORT=0 时同样在注册时导入全部模块
+"""
+
+import importlib
+import os
+import threading
+import typing
+
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException, NotFound
+
+# 关闭按需导入的环境变量
+lazy_import_env = "WEB_LAZY_IMPORT"
+
+
+class LazyRegistry(object):
+    """
+    namespace 与接口模块的对应关系
+    """
+
+    def __init__(self, api, package: str, modules: typing.Dict[str, typing.Sequence[str]]):
+        """
+        :param api: flask_restplus 的 Api
+        :param package: 模块相对导入的基准包, 即 api_reg 的 __name__
+        :param modules: namespace 名称与其所有模块的相对路径
+        """
+        self.api = api
+        self.package = package.rpartition(".")[0]
+        self.names = frozenset(modules)
+        self.pending: typing.Dict[str, typing.Tuple[str, ...]] = {
+            name: tuple(names) for (name, names) in modules.items()
+        }
+        self._lock = threading.Lock()
+
+        app = getattr(api, "app", None)
+        if os.environ.get(lazy_import_env, "1") == "0" or (app is not None and app.debug):
+            self.warm_up()
+            return
+
+        if app is not None:
+            app.before_request(self.before_request)
+        elif getattr(api, "blueprint", None) is not None:
+            api.blueprint.before_app_request(self.before_request)
+
+    def init_app(self, app):
+        """
+        Api 在导入 api_reg 之后才绑定 app 时, 需要显式调用
+        """
+        if app.debug:
+            self.warm_up()
+        else:
+            app.before_request(self.before_request)
+
+    def load(self, name: str) -> bool:
+        """
+        导入 namespace 对应的模块
+        :return: 是否有新导入的模块
+        """
+        if name not in self.pending:
+            return False
+        with self._lock:
+            module_names = self.pending.get(name)
+            if module_names is None:
+                return False
+            for module_name in module_names:
+                importlib.import_module(module_name, self.package)
+            del self.pending[name]
+        return True
+
+    def warm_up(self):
+        """
+        导入所有尚未导入的模块
+        """
+        for name in list(self.pending):
+            self.load(name)
+
+    def namespace_of(self, path: str) -> str:
+        """
+        请求路径对应的 namespace 名称
+        """
+        prefix = (getattr(self.api, "prefix", "") or "").rstrip("/")
+        blueprint = getattr(self.api, "blueprint", None)
+        if blueprint is not None:
+            prefix = (getattr(blueprint, "url_prefix", "") or "").rstrip("/") + prefix
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix):]
+        return path.lstrip("/").split("/", 1)[0]
+
+    def before_request(self):
+        if isinstance(request.routing_exception, NotFound):
+            name = self.namespace_of(request.path)
+            if name not in self.names:
+                return None
+            # 路由可能由其它请求在本次请求匹配之后注册, 因此只要 namespace 存在就重新匹配,
+            # 其它请求正在导入时 load 等待其完成
+            self.load(name)
+            self.rematch()
+        elif self.pending and request.url_rule is not None \
+                and request.url_rule.endpoint == self.api.endpoint("specs") and not getattr(self.api, "_schema", None):
+            # 运行时生成的文档需要所有模型
+            self.warm_up()
+        return None
+
+    @staticmethod
+    def rematch():
+        """
+        使用已注册的路由重新匹配请求, 仍然无法匹配时保留新的 routing_exception,
+        url_adapter 保存在请求上下文中而不是 request 上, 因此重新创建
+        """
+        try:
+            adapter = current_app.create_url_adapter(request)
+            request.url_rule, request.view_args = adapter.match(return_rule=True)
+            request.routing_exception = None
+        except HTTPException as e:
+            request.routing_exception = e
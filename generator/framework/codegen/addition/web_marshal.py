@@ -0,0 +1,98 @@
+"""
+Flask 接口返回值的预编译序列化, 生成的 marshal 函数按生成时确定的字段直接读取 Result 的属性, 得到可以直接编码为 json 的
+dict / list, 不再在每次请求时由 flask_restplus 遍历 model 的字段
+
+安装了 orjson 或 ujson 时使用其编码，否则使用标准库的 json
+"""
+
+import calendar
+import json
+import typing
+
+from flask import current_app, request
+from werkzeug.http import http_date
+
+try:
+    import orjson
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data)
+
+    encoder_name = "orjson"
+except ImportError:
+    try:
+        import ujson
+
+        def dumps(data) -> str:
+            return ujson.dumps(data, ensure_ascii=False)
+
+        encoder_name = "ujson"
+    except ImportError:
+        _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+        def dumps(data) -> str:
+            return _encoder.encode(data)
+
+        encoder_name = "json"
+
+
+def json_response(data, status: int = 200, headers: typing.Dict[str, str] = None):
+    """
+    将 marshal 函数的结果编码为 json 响应
+    :param data: marshal 函数的结果
+    :param status: http 状态码
+    :param headers: 额外的响应头
+    """
+    return current_app.response_class(dumps(data), status=status, headers=headers, mimetype="application/json")
+
+
+def marshal_list(values, marshal: typing.Union[typing.Callable, None] = None):
+    """
+    转换 List 类型的返回值, 与 flask_restplus 相同，值为 None 时返回 None
+    :param values: impl 返回的列表
+    :param marshal: 生成的元素 marshal 函数, 为 None 时元素直接编码
+    """
+    if values is None:
+        return None
+    if marshal is None:
+        return list(values)
+    return [marshal(value) for value in values]
+
+
+def to_bytes(data) -> bytes:
+    """
+    编码为 json 的字节串
+    """
+    body = dumps(data)
+    return body if isinstance(body, bytes) else body.encode("utf-8")
+
+
+def not_modified(etag: str, last_modified: float = None) -> bool:
+    """
+    请求的条件是否满足，优先使用 If-None-Match, 没有该请求头时才比较 If-Modified-Since
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # werkzeug 返回不带时区的 UTC 时间, 不能用 timestamp() 按本地时区换算
+        return int(last_modified) <= calendar.timegm(request.if_modified_since.utctimetuple())
+    return False
+
+
+def cached_response(body: bytes, etag: str, cache_control: str = "no-cache", last_modified: float = None):
+    """
+    返回预先编码的内容, 请求的 If-None-Match 包含 etag 或 If-Modified-Since 不早于 last_modified 时返回 304
+    :param body: 预先编码的 json
+    :param etag: body 的强 ETag, 不带引号
+    :param cache_control: Cache-Control 响应头
+    :param last_modified: 内容生成的时间戳, 为 None 时不返回 Last-Modified
+    """
+    if not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,93 @@
+"""
+提供生成时输出的 swagger.json, 第一次请求时加入 Api 的标题、版本及 basePath 后编码一次,
+之后每次请求直接返回编码后的内容，请求带有相同的 If-None-Match 时返回 304
+
+生成的 api.model / ns.doc 只用于生成文档, 设置 WEB_REGISTER_MODELS=0 时跳过注册以减少启动时间
+"""
+
+import hashlib
+import json
+import os
+import threading
+import typing
+
+from flask_restplus import Resource
+
+from .web_marshal import cached_response
+
+# 跳过模型注册的环境变量
+register_models_env = "WEB_REGISTER_MODELS"
+
+
+def register_models() -> bool:
+    """
+    是否注册生成的文档模型
+    """
+    return os.environ.get(register_models_env, "1") != "0"
+
+
+def skip_doc(func):
+    """
+    跳过模型注册时代替 ns.doc / ns.response 的装饰器
+    """
+    return func
+
+
+class StaticSpec(object):
+    """
+    预先编码的文档
+    """
+
+    def __init__(self, api, spec: dict):
+        self.api = api
+        self.spec = spec
+        self.body: typing.Union[bytes, None] = None
+        self.etag = ""
+        self._lock = threading.Lock()
+
+    def prepare(self) -> typing.Tuple[bytes, str]:
+        if self.body is None:
+            with self._lock:
+                if self.body is None:
+                    spec = dict(self.spec)
+                    info = dict(spec.get("info") or {})
+                    for key in ("title", "version", "description"):
+                        value = getattr(self.api, key, None)
+                        if value:
+                            info[key] = value
+                    spec["info"] = info
+                    try:
+                        spec["basePath"] = self.api.base_path
+                    except RuntimeError:
+                        pass
+                    body = json.dumps(spec, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    self.etag = hashlib.sha1(body).hexdigest()
+                    self.body = body
+        return self.body, self.etag
+
+    def response(self):
+        body, etag = self.prepare()
+        return cached_response(body, etag)
+
+
+def register_spec(api, spec_file: str, url: str = "/openapi.json") -> StaticSpec:
+    """
+    注册生成的文档, flask_restplus 的 /swagger.json 同样使用该文档, 不再在运行时遍历所有模型
+    :param api: flask_restplus 的 Api
+    :param spec_file: 生成的 swagger.json 路径
+    :param url: 提供预编码文档的地址
+    """
+    with open(spec_file, "rb") as f:
+        spec = json.load(f)
+
+    static_spec = StaticSpec(api, spec)
+    # flask_restplus 只在 _schema 为空时根据模型生成文档
+    api._schema = spec
+
+    class OpenApiSpec(Resource):
+        def get(self):
+            return static_spec.response()
+
+    # doc 只能通过 route 指定, add_resource 会将其传给 add_url_rule
+    api.route(url, doc=False)(OpenApiSpec)
+    return static_spec
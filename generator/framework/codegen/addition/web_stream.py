@@ -0,0 +1,77 @@
+"""
+Flask 接口的流式 json 返回值, impl 返回生成器时逐个转换并编码元素, 累积到 chunk_bytes 后发送一次,
+内存占用与结果的总行数无关, 客户端在第一批元素编码完成后即可开始接收
+
+支持两种格式:
+    array: 完整的 json 数组, 与非流式接口的返回值相同
+    ndjson: 每行一个 json 元素, Content-Type 为 application/x-ndjson
+
+响应开始发送后无法再修改状态码, impl 在迭代中抛出的异常会中断连接, 客户端得到不完整的 json
+"""
+
+import typing
+
+from flask import current_app, stream_with_context
+
+from .web_marshal import to_bytes
+
+# 每次发送的最小字节数
+default_chunk_bytes = 64 * 1024
+
+content_types = {
+    "array": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_chunks(
+        items: typing.Iterable,
+        marshal: typing.Union[typing.Callable, None] = None,
+        fmt: str = "array",
+        chunk_bytes: int = default_chunk_bytes
+) -> typing.Iterator[bytes]:
+    """
+    将元素编码为 json 并按 chunk_bytes 分批
+    :param items: impl 返回的生成器
+    :param marshal: 生成的元素 marshal 函数, 为 None 时元素直接编码
+    :param fmt: array 或 ndjson
+    :param chunk_bytes: 每批的最小字节数
+    """
+    ndjson = fmt == "ndjson"
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    separator = b"\n" if ndjson else b","
+    first = True
+    for item in items:
+        if not ndjson and not first:
+            buffer += separator
+        first = False
+        buffer += to_bytes(marshal(item) if marshal is not None else item)
+        if ndjson:
+            buffer += separator
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_response(
+        items: typing.Iterable,
+        marshal: typing.Union[typing.Callable, None] = None,
+        fmt: str = "array",
+        chunk_bytes: int = default_chunk_bytes
+):
+    """
+    流式返回 impl 的结果, 迭代时保持请求上下文, impl 的生成器中可以继续访问 request
+    :param items: impl 返回的生成器
+    :param marshal: 生成的元素 marshal 函数, 为 None 时元素直接编码
+    :param fmt: array 或 ndjson
+    :param chunk_bytes: 每批的最小字节数
+    """
+    return current_app.response_class(
+        stream_with_context(iter_chunks(items, marshal, fmt, chunk_bytes)),
+        mimetype=content_types[fmt]
+    )
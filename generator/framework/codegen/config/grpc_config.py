@@ -2,7 +2,9 @@ from ....common import MetaData, Entry, Arg, type_def
 from ...util.text import upper_first_character, pretty_name
 from ...util.cfg_generator import CfgGenerator
 from ...codegen.grpc_py_mapping import mapping
+from ...analyser.option import is_columnar, is_stream, is_bulk, bulk_name, get_option, can_batch
 from ..base import ConfigBase
+from .... import config
 
 
 class GrpcConfig(ConfigBase, CfgGenerator):
@@ -41,6 +43,9 @@ class GrpcConfig(ConfigBase, CfgGenerator):
         for entry in self.meta_data.entries:
             self.process_entry(entry)
 
+        if config.rpc_batch:
+            self.process_batch()
+
         self.process_service()
 
     def process_entry(self, entry: Entry):
@@ -53,16 +58,87 @@ class GrpcConfig(ConfigBase, CfgGenerator):
         self.append_with("}", new_line=True)
         self.append_with("", new_line=True)
         self.process_return(entry)
+        if is_bulk(entry):
+            self.process_bulk(entry)
 
         self.exit_entry()
 
+    def process_bulk(self, entry: Entry):
+        """
+        生成批量接口的参数及返回值, client streaming 时参数直接使用 Arg 的 stream
+        :param entry:
+        :return:
+        """
+        if get_option(entry).bulk == "repeated":
+            self.append_with("message %s {" % self.get_entry_name("ManyArg"))
+            with self.with_ident():
+                self.append_with("repeated %s data = 1;" % self.get_entry_name("Arg"))
+            self.append_with("}", new_line=True)
+            self.append_with("", new_line=True)
+
+        self.append_with("message %s {" % self.get_entry_name("ManyResult"))
+        with self.with_ident():
+            self.append_with("repeated %s data = 1;" % self.get_entry_name("Result"))
+        self.append_with("}", new_line=True)
+        self.append_with("", new_line=True)
+
+    def process_batch(self):
+        """
+        生成服务级别 Batch 接口的参数及返回值，每个子请求及子结果使用 oneof 标记所属的方法,
+        子请求失败时结果为 error
+        :return:
+        """
+        entries = [entry for entry in self.meta_data.entries if can_batch(entry)]
+
+        self.append_with("message %s {" % self.get_entry_name("BatchRequest"))
+        with self.with_ident():
+            self.append_with("message Item {")
+            with self.with_ident():
+                self.append_with("oneof arg {")
+                with self.with_ident():
+                    for (index, entry) in enumerate(entries):
+                        self.enter_entry(entry.name)
+                        self.append_with("%s %s = %d;" % (self.get_entry_name("Arg"), entry.name, index + 1))
+                        self.exit_entry()
+                self.append_with("}")
+            self.append_with("}")
+            self.append_with("repeated Item items = 1;")
+        self.append_with("}", new_line=True)
+        self.append_with("", new_line=True)
+
+        self.append_with("message %s {" % self.get_entry_name("BatchResponse"))
+        with self.with_ident():
+            self.append_with("message Item {")
+            with self.with_ident():
+                self.append_with("oneof result {")
+                with self.with_ident():
+                    self.append_with("string error = 1;")
+                    for (index, entry) in enumerate(entries):
+                        self.enter_entry(entry.name)
+                        self.append_with("%s %s = %d;" % (self.get_entry_name("Result"), entry.name, index + 2))
+                        self.exit_entry()
+                self.append_with("}")
+            self.append_with("}")
+            self.append_with("repeated Item items = 1;")
+        self.append_with("}", new_line=True)
+        self.append_with("", new_line=True)
+
     def process_return(self, entry: Entry):
+        if is_stream(entry):
+            self.process_stream_return(entry)
+            return
+
         # 特殊处理 return 类型的第一层
         # 所有的 return 类型，都会将具体的返回值包装到 data 字段中
         self.append_with("message %s {" % self.get_entry_name("Result"), new_line=True)
         # self.enter_entry("Result")
         with self.with_ident():
-            if type_def.is_base_type(entry.result):
+            if is_columnar(entry):
+                # 列式编码，每一列为一个 repeated 字段, proto3 的数值类型默认即为 packed 编码
+                elem_info = entry.result.get_elem().get_elem_info()
+                for (new_index, (key, value)) in enumerate(elem_info.items()):
+                    self.append_with("repeated %s %s = %d;" % (mapping(value), key, new_index + 1))
+            elif type_def.is_base_type(entry.result):
                 # t = type_def.Dict(True)
                 # t.add_field("data", entry.result)
                 conf = "%s %s = %d;" % (mapping(entry.result), "data", 1)
@@ -93,6 +169,28 @@ class GrpcConfig(ConfigBase, CfgGenerator):
         self.append_with("}", new_line=True)
         self.append_with("", new_line=True)
 
+    def process_stream_return(self, entry: Entry):
+        """
+        server streaming 的接口逐个返回列表元素，只需要生成元素的定义,
+        基础类型的元素同样包装到 data 字段中
+        :param entry:
+        :return:
+        """
+        elem_type = entry.result.get_elem()
+        self.append_with("message %s {" % self.get_entry_name("ResultElement"), new_line=True)
+        with self.with_ident():
+            if type_def.is_dict(elem_type):
+                for (new_index, (key, value)) in enumerate(elem_type.get_elem_info().items()):
+                    if type_def.is_base_type(value):
+                        self.append_with("%s %s = %d;" % (mapping(value), key, new_index + 1))
+                    else:
+                        self.process_type(key, value, new_index + 1)
+            else:
+                self.append_with("%s %s = %d;" % (mapping(elem_type), "data", 1))
+
+        self.append_with("}", new_line=True)
+        self.append_with("", new_line=True)
+
     def process_arg(self, arg: Arg, index: int):
         """
         处理单个参数
@@ -153,12 +251,29 @@ class GrpcConfig(ConfigBase, CfgGenerator):
         with self.with_ident():
             for entry in self.meta_data.entries:
                 self.enter_entry(entry.name)
+                result_name = self.get_entry_name("Result")
+                if is_stream(entry):
+                    result_name = "stream %s" % self.get_entry_name("ResultElement")
                 self.append_with(
                     "rpc %s (%s) returns (%s) {}" %
-                    (entry.name, self.get_entry_name("Arg"), self.get_entry_name("Result"))
+                    (entry.name, self.get_entry_name("Arg"), result_name)
                 )
+                if is_bulk(entry):
+                    arg_name = self.get_entry_name("ManyArg")
+                    if get_option(entry).bulk == "stream":
+                        arg_name = "stream %s" % self.get_entry_name("Arg")
+                    self.append_with(
+                        "rpc %s (%s) returns (%s) {}" %
+                        (bulk_name(entry), arg_name, self.get_entry_name("ManyResult"))
+                    )
                 self.exit_entry()
 
+            if config.rpc_batch:
+                self.append_with(
+                    "rpc Batch (%s) returns (%s) {}" %
+                    (self.get_entry_name("BatchRequest"), self.get_entry_name("BatchResponse"))
+                )
+
         self.append_with("}")
 
     def enter_entry(self, name: str):
@@ -57,6 +57,9 @@ class ClientDirConfig(object):
         # 通用 rpc 运行时的目录
         self.runtime = path.join(self.client_path, "./runtime")
 
+        # 随生成代码输出的附加模块目录
+        self.addition = path.join(self.client_path, "./addition")
+
     def ensure_dir(self):
         """
         初始化 rpc 目录
@@ -104,6 +107,8 @@ class ServerDirConfig(ClientDirConfig):
         self.impl = path.join(self.root, "./impl")
         # 通用 rpc 运行时的目录
         self.runtime = path.join(self.root, "./runtime")
+        # 随生成代码输出的附加模块目录
+        self.addition = path.join(self.root, "./addition")
 
     def ensure_dir(self):
         """
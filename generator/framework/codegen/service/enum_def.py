@@ -1,3 +1,4 @@
+from .... import config
 from ..config import ConfigBase
 from ...util.cfg_generator import CfgGenerator
 from ...util.text import pretty_name
@@ -15,7 +16,8 @@ class EnumDef(ConfigBase, CfgGenerator):
             self,
             enum_info: EnumWithVar,
             runtime_path: str = "runtime",
-            api_path: str = "src"
+            api_path: str = "src",
+            addition_path: str = ".addition"
     ):
         ConfigBase.__init__(self, None)
         CfgGenerator.__init__(self)
@@ -31,13 +33,23 @@ class EnumDef(ConfigBase, CfgGenerator):
 
         self.enum_info = enum_info
 
+        # addition 模块相对于生成文件的导入路径
+        self.addition_path = addition_path
+
     def gen_conf(self):
         header = self.header_def
         header.append_with("from flask_restplus import fields, Resource")
         header.append_with(f"from {self.api_path} import api")
+        if config.web_openapi:
+            header.append_with(f"from {self.addition_path}.web_spec import register_models, skip_doc")
+        if config.web_enum_precompute:
+            header.append_with("from flask import request")
+            header.append_with(f"from {self.addition_path}.web_enum import EnumPayloads")
         header.append_with()
         header.append_with()
         header.append_with(f"ns = api.namespace(\"enum\", description=\"枚举定义信息\")")
+        if config.web_enum_precompute:
+            header.append_with("enum_payloads = EnumPayloads()")
         header.append_with()
         header.append_with()
 
@@ -91,8 +103,20 @@ class EnumDef(ConfigBase, CfgGenerator):
         if not name:
             raise ValueError("枚举类型必须有确定的名称")
 
-        self.gen_enum_model(name)
+        if config.web_openapi:
+            self.append_with("if register_models():")
+            with self.with_ident():
+                self.gen_enum_model(name)
+            self.append_with("else:")
+            with self.with_ident():
+                self.append_with(f"{pretty_name(name)}EnumResultModel = skip_doc")
+        else:
+            self.gen_enum_model(name)
         self.append_with()
+        if config.web_enum_precompute:
+            # 返回值在导入时编码一次
+            self.gen_enum_result(f"enum_payloads.add(\"{name}\", {{", "})")
+            self.append_with()
         self.append_with()
 
         self.append_with(f"@ns.route(\"/{name}\")")
@@ -101,13 +125,16 @@ class EnumDef(ConfigBase, CfgGenerator):
             self.append_with(f"@{pretty_name(name)}EnumResultModel")
             self.append_with("def get(self):")
             with self.with_ident():
-                self.gen_enum_result()
+                if config.web_enum_precompute:
+                    self.append_with(f"return enum_payloads.response(\"{name}\")")
+                else:
+                    self.gen_enum_result()
 
-    def gen_enum_result(self):
+    def gen_enum_result(self, head: str = "return {", tail: str = "}"):
         """
         生成枚举接口的返回值
         """
-        self.append_with("return {")
+        self.append_with(head)
         with self.with_ident():
             self.append_with("\"info\": [")
             with self.with_ident():
@@ -119,4 +146,24 @@ class EnumDef(ConfigBase, CfgGenerator):
                         self.append_with(f"\"description\": \"{value.description}\",")
                     self.append_with("},")
             self.append_with("]")
-        self.append_with("}")
+        self.append_with(tail)
+
+
+def gen_all_enum_resource() -> str:
+    """
+    生成合并所有枚举的接口, 需要在所有枚举接口之后生成
+    """
+    gen = CfgGenerator()
+    gen.append_with()
+    gen.append_with()
+    gen.append_with("@ns.route(\"/_all\")")
+    gen.append_with("class AllEnums(Resource):")
+    with gen.with_ident():
+        gen.append_with("@ns.doc(params={\"names\": \"以逗号分隔的枚举名称, 为空时返回所有枚举\"})")
+        gen.append_with("def get(self):")
+        with gen.with_ident():
+            gen.append_with("return enum_payloads.response_all(request.args.get(\"names\"))")
+    gen.append_with()
+    gen.append_with()
+    gen.append_with("enum_payloads.freeze()")
+    return "".join(gen.conf)
@@ -1,3 +1,4 @@
+from .... import config
 from ..config import ConfigBase
 from ...util.cfg_generator import CfgGenerator
 from ..grpc_py_mapping import get_default
@@ -5,6 +6,9 @@ from ...analyser.module_scanner import EnumWithVar
 
 from .flask_mapping import flask_mapping_literal
 
+# enum 模式下可以混入 Enum 的基础类型
+mixin_types = ("str", "float")
+
 
 class EnumPyDef(ConfigBase, CfgGenerator):
     """
@@ -32,7 +36,12 @@ class EnumPyDef(ConfigBase, CfgGenerator):
         self.enum_info = enum_info
 
     def gen_conf(self):
-        self.gen_enum_define()
+        if config.enum_style == "const":
+            self.gen_const_define()
+        elif config.enum_style == "enum":
+            self.gen_std_enum_define()
+        else:
+            self.gen_enum_define()
 
     def get_header_conf(self) -> str:
         return "".join(self.header_def.conf)
@@ -78,3 +87,131 @@ class EnumPyDef(ConfigBase, CfgGenerator):
         self.append_with(f"{self.enum_info.enum.name} = _{self.enum_info.enum.name}()")
         self.append_with()
         self.append_with()
+
+    def gen_lookup_dicts(self):
+        """
+        生成 值 -> 描述 及 值 -> 名称 的字典
+        """
+        self.append_with("enum_description = {")
+        with self.with_ident():
+            for key, value in self.enum_info.enum.enum_dict.items():
+                self.append_with(f"{get_default(value)}: \"{value.description}\",")
+        self.append_with("}")
+        self.append_with("enum_name = {")
+        with self.with_ident():
+            for key, value in self.enum_info.enum.enum_dict.items():
+                self.append_with(f"{get_default(value)}: \"{key}\",")
+        self.append_with("}")
+
+    def gen_const_define(self):
+        """
+        生成以类常量定义成员的枚举类, 成员在类定义后不能修改
+        """
+        self.append_with(f"class {self.enum_info.enum.name}(FrozenEnum):")
+        with self.with_ident():
+            self.append_with('"""')
+            self.append_with(self.enum_info.enum.description)
+            self.append_with('"""')
+            for key, value in self.enum_info.enum.enum_dict.items():
+                self.append_with(f"# {value.description}")
+                self.append_with(f"{key}: {flask_mapping_literal(value)} = {get_default(value)}")
+            self.append_with()
+            self.gen_lookup_dicts()
+
+        self.append_with()
+        self.append_with()
+
+    def gen_std_enum_define(self):
+        """
+        生成标准库的枚举类, 整数值使用 IntEnum, 字符串及浮点数混入对应的基础类型，成员可以直接与值比较,
+        bool 不能被继承, 日期类型也不在生成的模块中导入, 因此使用不混入基础类型的 Enum
+        """
+        value_type = flask_mapping_literal(self.enum_info.enum.rpc_type)
+        if value_type == "int":
+            base = "enum.IntEnum"
+        elif value_type in mixin_types:
+            base = f"{value_type}, enum.Enum"
+        else:
+            base = "enum.Enum"
+        annotation = value_type in mixin_types + ("int",) and f": {value_type}" or ""
+        name = self.enum_info.enum.name
+        self.append_with(f"class {name}({base}):")
+        with self.with_ident():
+            self.append_with('"""')
+            self.append_with(self.enum_info.enum.description)
+            self.append_with('"""')
+            for key, value in self.enum_info.enum.enum_dict.items():
+                self.append_with(f"# {value.description}")
+                self.append_with(f"{key} = {get_default(value)}")
+            self.append_with()
+            self.append_with("@classmethod")
+            self.append_with(f"def get_desc(cls, value{annotation}) -> str:")
+            with self.with_ident():
+                self.append_with(f"return _{name}_description.get(value, \"\")")
+            self.append_with()
+            self.append_with("@classmethod")
+            self.append_with(f"def get_name(cls, value{annotation}) -> str:")
+            with self.with_ident():
+                self.append_with("member = cls._value2member_map_.get(value)")
+                self.append_with("return member.name if member is not None else \"\"")
+
+        self.append_with()
+        self.append_with()
+        # 枚举类中的字典会成为成员，描述保存在模块级别
+        self.append_with(f"_{name}_description = {{")
+        with self.with_ident():
+            for key, value in self.enum_info.enum.enum_dict.items():
+                self.append_with(f"{get_default(value)}: \"{value.description}\",")
+        self.append_with("}")
+        self.append_with(f"{name}.enum_description = _{name}_description")
+        self.append_with()
+        self.append_with()
+
+
+def gen_enum_header() -> str:
+    """
+    生成枚举定义文件的头部, const 模式下包含所有枚举类的基类
+    """
+    gen = CfgGenerator()
+    if config.enum_style == "enum":
+        gen.append_with("import enum")
+        gen.append_with()
+    elif config.enum_style == "const":
+        gen.append_with("import typing")
+        gen.append_with()
+        gen.append_with()
+        gen.append_with("class FrozenEnumType(type):")
+        with gen.with_ident():
+            gen.append_with('"""')
+            gen.append_with("枚举类的成员在定义后不能修改")
+            gen.append_with('"""')
+            gen.append_with("def __setattr__(cls, key, value):")
+            with gen.with_ident():
+                gen.append_with("raise AttributeError(\"enum %s is frozen\" % cls.__name__)")
+            gen.append_with()
+            gen.append_with("def __delattr__(cls, key):")
+            with gen.with_ident():
+                gen.append_with("raise AttributeError(\"enum %s is frozen\" % cls.__name__)")
+        gen.append_with()
+        gen.append_with()
+        gen.append_with("class FrozenEnum(metaclass=FrozenEnumType):")
+        with gen.with_ident():
+            gen.append_with("enum_description: typing.Dict[typing.Any, str] = {}")
+            gen.append_with("enum_name: typing.Dict[typing.Any, str] = {}")
+            gen.append_with()
+            gen.append_with("def __new__(cls, *args, **kwargs):")
+            with gen.with_ident():
+                gen.append_with("raise TypeError(\"enum %s can not be instantiated\" % cls.__name__)")
+            gen.append_with()
+            gen.append_with("@classmethod")
+            gen.append_with("def get_desc(cls, value) -> str:")
+            with gen.with_ident():
+                gen.append_with("return cls.enum_description.get(value, \"\")")
+            gen.append_with()
+            gen.append_with("@classmethod")
+            gen.append_with("def get_name(cls, value) -> str:")
+            with gen.with_ident():
+                gen.append_with("return cls.enum_name.get(value, \"\")")
+        gen.append_with()
+        gen.append_with()
+    return "".join(gen.conf)
@@ -2,10 +2,12 @@ from enum import Enum
 import typing
 import copy
 
+from .... import config
 from ....common import MetaData, Entry, RpcType, fields, type_def, CommonBase, ArgSource
 from ....common.type_def import Model
 from ....common.web.namespace import get_namespace, NamespaceInfo
 from ..config import ConfigBase
+from ...analyser.option import get_option, is_http_cached, is_web_stream, is_paginated, can_marshal
 from ...util.cfg_generator import CfgGenerator
 from ...util.text import pretty_name, split_by_upper_character
 from ..grpc_py_mapping import get_default, mapping_revert
@@ -37,7 +39,8 @@ class FlaskDef(ConfigBase, CfgGenerator):
             meta_data: MetaData,
             args_path: str = "",
             runtime_path: str = "runtime",
-            api_path: str = "src"
+            api_path: str = "src",
+            addition_path: str = ".addition"
     ):
         ConfigBase.__init__(self, meta_data)
         CfgGenerator.__init__(self)
@@ -55,6 +58,9 @@ class FlaskDef(ConfigBase, CfgGenerator):
 
         self.api_path = api_path
 
+        # addition 模块相对于生成文件的导入路径
+        self.addition_path = addition_path
+
     def gen_conf(self):
         self.header_def.append_with("from flask_restplus import fields")
         self.header_def.append_with(f"from {self.runtime_path}.runtime.web import SSResource")
@@ -77,6 +83,33 @@ class FlaskDef(ConfigBase, CfgGenerator):
 
         ns = get_namespace(self.meta_data.service_type)
 
+        if config.web_arg_plan:
+            self.header_def.append_with("from flask import request")
+        web_args_imports = [name for (name, enabled) in (
+            ("ArgPlan", config.web_arg_plan),
+            ("parse_bool", config.web_arg_plan),
+            ("check_arg", config.validate_args),
+            ("handle_validation", any(is_paginated(entry) for entry in self.meta_data.entries))
+        ) if enabled]
+        if web_args_imports:
+            self.header_def.append_with(f"from {self.addition_path}.web_args import {', '.join(web_args_imports)}")
+        web_marshal_imports = [name for (name, enabled) in (
+            ("json_response", any(need_marshal(entry) and not is_http_cached(entry) for entry in self.meta_data.entries)),
+            ("marshal_list", any(need_marshal(entry) and type_def.is_list(entry.result)
+                                 for entry in self.meta_data.entries))
+        ) if enabled]
+        if web_marshal_imports:
+            self.header_def.append_with(
+                f"from {self.addition_path}.web_marshal import {', '.join(web_marshal_imports)}")
+        if any(is_http_cached(entry) for entry in self.meta_data.entries):
+            self.header_def.append_with(f"from {self.addition_path}.web_cache import HttpCache")
+        if any(is_web_stream(entry) for entry in self.meta_data.entries):
+            self.header_def.append_with(f"from {self.addition_path}.web_stream import stream_response")
+        if any(is_paginated(entry) for entry in self.meta_data.entries):
+            self.header_def.append_with(f"from {self.addition_path}.pagination import clamp_limit")
+        if config.web_openapi:
+            self.header_def.append_with(f"from {self.addition_path}.web_spec import register_models, skip_doc")
+
         if self.args_path:
             self.header_def.append_with(f"from {self.args_path} import ", new_line=False)
 
@@ -113,6 +146,38 @@ class FlaskDef(ConfigBase, CfgGenerator):
         """
         生成该模块所需使用的参数模型及返回值模型定义，也包括了参数或返回值中的嵌套类型
         """
+        if config.web_openapi:
+            # 模型只用于生成文档，文档已在生成时输出，运行时可以通过 register_models 跳过注册
+            self.append_with("if register_models():")
+            with self.with_ident():
+                self.gen_doc_models()
+            self.append_with("else:")
+            with self.with_ident():
+                self.append_with(f"{' = '.join(self.doc_model_names())} = skip_doc")
+            self.append_with()
+        else:
+            self.gen_doc_models()
+
+        for entry in self.meta_data.entries:
+            if config.web_arg_plan:
+                self.build_arg_plan(entry)
+            if need_marshal(entry) or is_web_stream(entry):
+                self.build_entry_marshal(entry)
+            if is_http_cached(entry):
+                self.build_http_cache(entry)
+
+    def doc_model_names(self) -> typing.List[str]:
+        """
+        所有接口作为装饰器使用的参数模型及返回值模型的名称
+        """
+        names = []
+        for entry in self.meta_data.entries:
+            names.append(pretty_name(f"{self.meta_data.name}_{entry.name}_arg_model"))
+            if entry.result is not None:
+                names.append(pretty_name(f"{self.meta_data.name}_{entry.name}_result_model"))
+        return names
+
+    def gen_doc_models(self):
         for entry in self.meta_data.entries:
             args_dict = {}
             for arg in entry.args:
@@ -143,12 +208,19 @@ class FlaskDef(ConfigBase, CfgGenerator):
         with self.with_ident():
             self.append_with("200,")
             self.append_with(f"\"{entry.result.description}\",")
-            self.append_with(f"api.model(\"{result_name}\", {{")
-            with self.with_ident():
-                result: typing.Union[type_def.Dict, type_def.Void] = entry.result
-                if result.get_type() != "void":
-                    self.build_dict(result.get_elem_info(), result_name)
-            self.append_with("})")
+            if type_def.is_list(entry.result):
+                # 列表类型的返回值，文档中为元素的数组
+                self.append_with("[")
+                with self.with_ident():
+                    self.build_list(entry.result.get_elem(), result_name)
+                self.append_with("]")
+            else:
+                self.append_with(f"api.model(\"{result_name}\", {{")
+                with self.with_ident():
+                    result: typing.Union[type_def.Dict, type_def.Void] = entry.result
+                    if result.get_type() != "void":
+                        self.build_dict(result.get_elem_info(), result_name)
+                self.append_with("})")
         self.append_with(")")
 
     def gen_resource_define(self, ns: NamespaceInfo):
@@ -194,18 +266,178 @@ class FlaskDef(ConfigBase, CfgGenerator):
             self.append_with('"""')
             self.append_with(entry.description)
             self.append_with('"""')
-            self.append_with("# extract args with method_name, define class, args type, addition args")
-            self.append_with(
-                f"args = self.extract_args(\"{entry.name}\", {self.meta_data.name}Define, {arg_type}, *args, **kwargs)"
-            )
+            if config.web_arg_plan:
+                self.append_with(f"args = {pretty_name(f'{model_name}_arg_plan')}.extract(request, kwargs)")
+            else:
+                self.append_with("# extract args with method_name, define class, args type, addition args")
+                self.append_with(
+                    f"args = self.extract_args(\"{entry.name}\", {self.meta_data.name}Define, {arg_type}, *args, **kwargs)"
+                )
+            if config.validate_args:
+                self.append_with("check_arg(args)")
+            if is_paginated(entry):
+                option = get_option(entry)
+                self.append_with(f"args.limit = clamp_limit(args.limit, {option.page_size}, {option.max_page_size})")
+                if self.meta_data.impl_type is not None:
+                    # impl 解码游标失败时抛出的 InvalidCursor 转换为 400
+                    self.append_with("with handle_validation():")
+                    self.increase_ident()
+            cache_name = pretty_name(f"{model_name}_http_cache")
+            if is_http_cached(entry) and self.meta_data.impl_type is not None:
+                # 命中缓存时不创建 impl
+                self.append_with(f"cache_key = {cache_name}.key(args)")
+                self.append_with(f"response = {cache_name}.get(cache_key)")
+                self.append_with("if response is not None:")
+                with self.with_ident():
+                    self.append_with("return response")
             if self.meta_data.impl_type is not None:
                 self.append_with(
                     f"impl = {self.meta_data.name}Impl()"
                 )
-                self.append_with(f"return impl.{entry.name}(args)")
+                if is_web_stream(entry):
+                    self.append_with(f"return stream_response({self.stream_call(entry)})")
+                elif is_http_cached(entry):
+                    self.append_with(f"return {cache_name}.put(cache_key, {self.marshal_call(entry, f'impl.{entry.name}(args)')})")
+                elif need_marshal(entry):
+                    self.append_with(f"return json_response({self.marshal_call(entry, f'impl.{entry.name}(args)')})")
+                else:
+                    self.append_with(f"return impl.{entry.name}(args)")
+                if is_paginated(entry):
+                    self.increase_ident(-1)
             else:
                 self.append_with("raise NotImplementedError(\"Please Implement the logic first\")")
 
+    def stream_call(self, entry: Entry) -> str:
+        """
+        流式接口调用 stream_response 的参数, 元素为 Dict 时通过生成的 marshal 函数转换
+        """
+        marshal = type_def.is_dict(entry.result.get_elem()) and self.marshal_name(entry) or "None"
+        return f"impl.{entry.name}(args), {marshal}, \"{get_option(entry).stream_format}\""
+
+    def marshal_call(self, entry: Entry, value: str) -> str:
+        """
+        转换返回值的表达式, List 类型的返回值由 marshal_list 逐个转换元素
+        :param value: 返回值的表达式
+        """
+        if not type_def.is_list(entry.result):
+            return f"{self.marshal_name(entry)}({value})"
+        if type_def.is_dict(entry.result.get_elem()):
+            return f"marshal_list({value}, {self.marshal_name(entry)})"
+        return f"marshal_list({value})"
+
+    def marshal_name(self, entry: Entry, *sub_keys: str) -> str:
+        name = "_".join((self.meta_data.name, entry.name, "result") + sub_keys)
+        return f"marshal_{split_by_upper_character(pretty_name(name), '_').lower()}"
+
+    def build_entry_marshal(self, entry: Entry):
+        """
+        生成接口返回值的 marshal 函数, List 类型的返回值只为 Dict 类型的元素生成, 与流式接口共用
+        """
+        if not type_def.is_list(entry.result):
+            self.append_with()
+            self.build_result_marshal(entry)
+        elif type_def.is_dict(entry.result.get_elem()):
+            self.append_with()
+            self.build_result_marshal(entry, entry.result.get_elem())
+
+    def build_result_marshal(self, entry: Entry, result: type_def.Dict = None, sub_keys: typing.Tuple[str, ...] = ()):
+        """
+        生成将 Result 转换为 dict 的 marshal 函数, 嵌套的 Dict 类型生成单独的函数
+        """
+        result = result or entry.result
+        elem_info = result.get_elem_info()
+        # 先生成嵌套类型的函数
+        for key, value in elem_info.items():
+            if type_def.is_list(value):
+                value = value.get_elem()
+            if type_def.is_dict(value):
+                self.build_result_marshal(entry, value, sub_keys + (key,))
+
+        self.append_with(f"def {self.marshal_name(entry, *sub_keys)}(value):")
+        with self.with_ident():
+            values = []
+            for key, value in elem_info.items():
+                if type_def.is_dict(value) or type_def.is_list(value):
+                    self.append_with(f"{key}_value = value.{key}")
+                    values.append((key, self.marshal_value(entry, f"{key}_value", value, sub_keys + (key,))))
+                elif value.default_value is not None:
+                    values.append((key, f"value.{key} if value.{key} is not None else {get_default(value)}"))
+                else:
+                    values.append((key, f"value.{key}"))
+
+            self.append_with("return {")
+            with self.with_ident():
+                for key, value in values:
+                    self.append_with(f"\"{key}\": {value},")
+            self.append_with("}")
+        self.append_with()
+        self.append_with()
+
+    def marshal_value(self, entry: Entry, name: str, value: RpcType, sub_keys: typing.Tuple[str, ...]) -> str:
+        """
+        生成嵌套类型或列表字段的转换表达式, 与 flask_restplus 相同，值为 None 时返回 None
+        """
+        if type_def.is_dict(value):
+            return f"None if {name} is None else {self.marshal_name(entry, *sub_keys)}({name})"
+
+        elem = value.get_elem()
+        if type_def.is_dict(elem):
+            return f"None if {name} is None else [{self.marshal_name(entry, *sub_keys)}(item) for item in {name}]"
+        return f"None if {name} is None else list({name})"
+
+    def build_http_cache(self, entry: Entry):
+        """
+        生成 GET 接口的响应缓存, 可以通过 web_cache.get_cache("Resource.get") 获取并使其失效
+        """
+        option = get_option(entry)
+        arg_names = [arg.name for arg in entry.args]
+        for name in option.vary_args:
+            if name not in arg_names:
+                raise ValueError("%s.%s 的 vary_args 中的 %s 不是该接口的参数" % (
+                    self.meta_data.name, entry.name, name))
+
+        model_name = f"{self.meta_data.name}_{entry.name}"
+        self.append_with(f"{pretty_name(f'{model_name}_http_cache')} = HttpCache(")
+        with self.with_ident():
+            self.append_with(f"\"{self.meta_data.name}.{entry.name}\",")
+            self.append_with(f"{option.http_cache_ttl},")
+            self.append_with(f"{option.http_cache_size},")
+            self.append_with("(%s)," % "".join("\"%s\", " % name for name in option.vary_args or arg_names))
+            self.append_with("(%s)," % "".join("\"%s\", " % name for name in option.vary_headers))
+            self.append_with(f"\"{option.http_cache_control}\"")
+        self.append_with(")")
+        self.append_with()
+
+    def build_arg_plan(self, entry: Entry):
+        """
+        生成接口的参数提取计划, 每个参数的来源及类型转换在生成时确定:
+            1. PATH 参数由 Flask 的 url converter 转换
+            2. HEADER 参数及 GET 方法中的其它参数从 header 或 query string 中读取并转换为对应的基础类型
+            3. 其它方法中 PARAMS 来源的基础类型及其列表从 query string 中读取，其余的从 json body 中读取
+        """
+        path_args, query_args, body_args, header_args = [], [], [], []
+        for arg in entry.args:
+            location = arg_location(entry, arg)
+            if location == "path":
+                path_args.append(f"\"{arg.name}\"")
+            elif location == "header":
+                header_args.append(plan_field(arg.name, arg.arg_type))
+            elif location == "query":
+                query_args.append(plan_field(arg.name, arg.arg_type))
+            else:
+                body_args.append(f"\"{arg.name}\"")
+
+        model_name = f"{self.meta_data.name}_{entry.name}"
+        self.append_with(f"{pretty_name(f'{model_name}_arg_plan')} = ArgPlan(")
+        with self.with_ident():
+            self.append_with(f"{pretty_name(f'{entry.name}_arg')},")
+            for (name, plans) in (("path", path_args), ("query", query_args),
+                                  ("body", body_args), ("header", header_args)):
+                if plans:
+                    self.append_with(f"{name}=({', '.join(plans)},),")
+        self.append_with(")")
+        self.append_with()
+
     def build_arg_model(self, entry: Entry, model: Model):
         """
         构建参数或返回值的 Model
@@ -348,6 +580,62 @@ class FlaskDef(ConfigBase, CfgGenerator):
             self.append_with(f"\"default\": {get_default(value)},")
 
 
+# 基础类型从 query string 或 header 读取时使用的转换函数
+plan_converters = {
+    "bool": "parse_bool",
+    "int": "int",
+    "int32": "int",
+    "int64": "int",
+    "float": "float",
+    "double": "float",
+    "string": "str",
+    "char": "str",
+}
+
+
+def need_marshal(entry: Entry) -> bool:
+    """
+    是否为接口生成 marshal 函数, 处理 Dict 及元素为 Dict 或基础类型的 List, 需要缓存的接口通过 marshal 函数编码返回值,
+    流式接口由 stream_response 逐个转换元素
+    """
+    return (config.web_fast_marshal or is_http_cached(entry)) and can_marshal(entry.result) \
+        and not is_web_stream(entry)
+
+
+def arg_location(entry: Entry, arg) -> str:
+    """
+    参数在请求中的位置: path / query / body / header
+    """
+    source = arg.source.value
+    if source == ArgSource.PATH.value:
+        return "path"
+    if source == ArgSource.HEADER.value:
+        return "header"
+    if entry.name == Method.GET.value or (source == ArgSource.PARAMS.value and is_plain_type(arg.arg_type)):
+        return "query"
+    return "body"
+
+
+def is_plain_type(t: RpcType) -> bool:
+    """
+    是否为可以从 query string 中读取的基础类型或基础类型的列表
+    """
+    if type_def.is_list(t):
+        t = t.get_elem()
+    return type_def.is_base_type(t)
+
+
+def plan_field(name: str, t: RpcType) -> str:
+    """
+    生成 ArgPlan 中 query 及 header 参数的定义: (参数名, 转换函数, 是否为列表)
+    """
+    is_list = type_def.is_list(t)
+    elem = t.get_elem() if is_list else t
+    if not type_def.is_base_type(elem):
+        raise NotImplementedError(f"argument {name} read from query or header can not be nested type")
+    return f"(\"{name}\", {plan_converters.get(elem.get_type(), 'str')}, {is_list})"
+
+
 def get_extra_args(ns: NamespaceInfo) -> typing.List[typing.Tuple[str, RpcType]]:
     result = []
     for k, v in (ns.params or {}).items():
@@ -8,6 +8,8 @@ from .. import grpc_py_mapping as mapping
 from ....common import MetaData, Entry, Arg, type_def
 from ...util.text import upper_first_character, pretty_name
 from ...util.cfg_generator import CfgGenerator
+from ...analyser.option import is_columnar, is_stream, is_bulk, bulk_name, get_option, can_batch, need_sampling, \
+    is_coalesced, is_cached, has_call_policy, is_paginated, get_service_option, is_limited
 from ..base import ConfigBase
 from .... import config
 
@@ -49,6 +51,12 @@ class GrpcPyDef(ConfigBase, CfgGenerator):
         # 是否要生成 Servicer 定义
         self.need_service = need_servicer
 
+        # 是否有使用列式编码的返回值，用于在 header 中导入 ColumnarResult
+        self.has_columnar = False
+
+        # 当前正在生成定义的 Entry
+        self.curr_entry: typing.Union[Entry, None] = None
+
     def gen_conf(self):
         """
         生成 gRPC 的配置文件文本，并保存在自身的 conf 中
@@ -74,23 +82,70 @@ of Meta {self.meta_data.name} with message {str(e)}")
 
     def process_servicer(self):
         # 最后才实现 RPC Class
-        self.append_with("class %s(ServiceClient):" % self.module_name)
+        if config.rpc_async:
+            base_client = "AioServiceClient"
+        else:
+            base_client = self.use_pooled_client() and "PooledServiceClient" or "ServiceClient"
+        self.append_with("class %s(%s):" % (self.module_name, base_client))
         with self.with_ident():
             # 如果生成到单独的项目中，则使用该项目的名称
             if config.outside_server:
                 self.append_with("from_project = \"%s\"" % config.outside_server_name)
             else:
                 self.append_with("from_project = \"%s\"" % config.source_project_name)
-            self.append_with("rpc_name = \"%s\"\n" % self.module_name)
+            self.append_with("rpc_name = \"%s\"" % self.module_name)
+            self.process_metrics()
+            self.process_flights()
+            self.process_caches()
+            self.process_call_policies()
+            self.process_pool_size()
+            self.process_samplers()
+        self.append_with()
 
         for entry in self.meta_data.entries:
             self.process_entry(entry)
+            if is_bulk(entry):
+                self.process_bulk_entry(entry)
+            if is_paginated(entry):
+                self.process_page_iterator(entry)
+
+        if config.rpc_batch:
+            self.process_batch()
 
         # reg client to context
         self.append_with()
-        self.append_with("reg_client(%s.rpc_name, %sStub)" % (self.module_name, self.module_name))
+        stub = "%sStub" % self.module_name
+        if not config.rpc_async and not self.use_pooled_client() and \
+                any(need_sampling(entry) for entry in self.meta_data.entries):
+            # runtime 的同步客户端由 runtime 创建 channel, 通过拦截器传递采样结果
+            stub = "sampled_stub(%s)" % stub
+        self.append_with("reg_client(%s.rpc_name, %s)" % (self.module_name, stub))
         self.service_def.conf = self.conf
 
+    def get_pool_size(self) -> int:
+        """
+        客户端对每个副本建立的 channel 数, 由服务级别的 channel_pool_size 或全局的 config.channel_pool_size 指定
+        :return:
+        """
+        return get_service_option(self.meta_data.service_type).channel_pool_size or config.channel_pool_size
+
+    def use_pooled_client(self) -> bool:
+        """
+        同步客户端是否使用 addition.client 中带 channel 池的 PooledServiceClient 代替 runtime 的 ServiceClient,
+        只在 channel 数大于 1 时使用
+        :return:
+        """
+        return not config.rpc_async and self.get_pool_size() > 1
+
+    def process_pool_size(self):
+        """
+        生成客户端对每个副本建立的 channel 数, 与基类的默认值相同时不生成
+        :return:
+        """
+        pool_size = self.get_pool_size()
+        if pool_size != 1 and (config.rpc_async or self.use_pooled_client()):
+            self.append_with("pool_size = %d" % pool_size)
+
     def get_header(self):
         """
         获取参数及返回值定义
@@ -107,6 +162,18 @@ of Meta {self.meta_data.name} with message {str(e)}")
 
     def append_header_common(self):
         self.append_with("from ...runtime.runtime.common import RPCDict")
+        self.append_header_addition("...addition")
+
+    def append_header_addition(self, addition_path: str):
+        """
+        导入 header 所需的 addition 模块
+        :param addition_path: addition 目录相对于 header 的导入路径
+        :return:
+        """
+        if self.has_columnar:
+            self.append_with("from %s.columnar import ColumnarResult" % addition_path)
+        if config.validate_args:
+            self.append_with("from %s.validate import ValidationError" % addition_path)
 
     def get_service(self):
         """
@@ -118,8 +185,50 @@ of Meta {self.meta_data.name} with message {str(e)}")
         self.append_with("from .src.encode.%s_pb2_grpc import %sStub" % (self.module_name.lower(), self.module_name))
         self.append_with("from .src.impl.%s import *" % self.meta_data.name.lower())
 
-        self.append_with("from .runtime.runtime import ServiceClient, reg_client, RPCOption")
+        if config.rpc_async:
+            self.append_with("from .runtime.runtime import RPCOption")
+            self.append_with("from .addition.aio import AioServiceClient, reg_client, acall_traced, aiter_traced")
+        elif self.use_pooled_client():
+            self.append_with("from .runtime.runtime import RPCOption")
+            self.append_with("from .addition.client import PooledServiceClient, reg_client")
+        else:
+            self.append_with("from .runtime.runtime import ServiceClient, reg_client, RPCOption")
         self.append_with("from .runtime.runtime.concurrency.local_trace import TraceContext")
+        if any(is_stream(entry) for entry in self.meta_data.entries):
+            if config.rpc_async:
+                self.append_with("from .addition.stream import aiter_elements, aiter_data")
+            else:
+                self.append_with("from .addition.stream import iter_elements, iter_data, iter_traced")
+        if any(is_bulk(entry) for entry in self.meta_data.entries):
+            if not any(is_stream(entry) for entry in self.meta_data.entries) or config.rpc_async:
+                self.append_with("from .addition.stream import iter_elements")
+            self.append_with("from .addition.bulk import RawMessage, iter_messages, chunk_messages")
+        if config.rpc_batch:
+            self.append_with("from .addition.batch import BatchBuilder, BatchItem")
+        if self.need_metrics():
+            self.append_with("from .addition.metrics import MethodMetric")
+        if any(need_sampling(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.sampling import Sampler%s" % (
+                not config.rpc_async and not self.use_pooled_client() and ", sampled_stub" or ""))
+        if config.rpc_local:
+            local_names = []
+            if any(self.is_direct_local(entry) for entry in self.meta_data.entries):
+                local_names.append("get_local")
+            if config.rpc_batch or any(is_bulk(entry) or not self.is_direct_local(entry)
+                                       for entry in self.meta_data.entries):
+                local_names.append(config.rpc_async and "abind_local" or "bind_local")
+            self.append_with("from .addition.local import %s" % ", ".join(local_names))
+        if any(has_call_policy(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.call_policy import CallPolicy%s" % (
+                config.rpc_async and ", build_service_config" or ""))
+        if any(is_cached(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.response_cache import ResponseCache")
+        if any(is_coalesced(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.single_flight import %s" % (
+                config.rpc_async and "AsyncSingleFlight" or "SingleFlight"))
+        if any(is_paginated(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.pagination import %s" % (
+                config.rpc_async and "aiter_pages" or "iter_pages"))
 
         self.append_with("\n")
 
@@ -143,6 +252,7 @@ of Meta {self.meta_data.name} with message {str(e)}")
         :param entry:
         :return:
         """
+        self.curr_entry = entry
         self.enter_entry(entry.name)
         # process arg list
         args_dict = type_def.Dict(True)
@@ -168,9 +278,13 @@ of Meta {self.meta_data.name} with message {str(e)}")
         self.enter_entry(entry.name)
         # 接口定义
         with self.with_ident():
+            result_name = self.get_entry_name("Result")
+            if is_stream(entry):
+                iterator_type = config.rpc_async and "typing.AsyncIterator" or "typing.Iterator"
+                result_name = "%s[%s]" % (iterator_type, self.get_entry_name("ResultElement"))
             self.append_with(
-                "def %s(self, arg: %s, option: typing.Union[RPCOption, None] = None) -> %s:" %
-                (entry.name, self.get_entry_name("Arg"), self.get_entry_name("Result"))
+                "%s %s(self, arg: %s, option: typing.Union[RPCOption, None] = None) -> %s:" %
+                (self.def_keyword(), entry.name, self.get_entry_name("Arg"), result_name)
             )
 
             with self.with_ident():
@@ -179,19 +293,404 @@ of Meta {self.meta_data.name} with message {str(e)}")
         self.exit_entry()
         self.append_with()
 
+    @staticmethod
+    def is_direct_local(entry: Entry) -> bool:
+        """
+        开启 rpc_local 时, 进程内的调用是否直接调用 impl, 参数为 Arg, 返回 impl 的 Result, 不经过 pb2 的转换,
+        需要服务端限流、参数校验、监控或分页限制的接口仍经过 servicer, 列式接口的结果由 servicer 转换,
+        客户端的缓存保存的是 pb2 结果, 这些接口都不直接调用
+        :param entry:
+        :return:
+        """
+        return config.rpc_local and not (
+                is_limited(entry) or config.validate_args or config.rpc_metrics in ("server", "all")
+                or is_paginated(entry) or is_columnar(entry) or is_cached(entry))
+
+    def process_direct_local(self, entry: Entry):
+        """
+        同一进程中注册了对应的 servicer 时直接调用其 local_<name> 并返回 impl 的结果,
+        不经过客户端的调用策略及合并请求
+        :param entry:
+        :return:
+        """
+        self.append_with("local = get_local(self.from_project, self.rpc_name)")
+        self.append_with("if local is not None:")
+        with self.with_ident():
+            if not config.rpc_async:
+                self.append_with("return local.call(\"%s\", arg, option)" % entry.name)
+            elif is_stream(entry):
+                self.append_with("return local.astream(\"%s\", arg, option)" % entry.name)
+            else:
+                self.append_with("return await local.acall(\"%s\", arg, option)" % entry.name)
+
+    def get_context(self, name: str) -> str:
+        """
+        生成获取调用上下文的代码, 开启 rpc_local 时同一进程中注册了对应的 servicer 则经过 servicer 调用,
+        参数及结果仍经过 pb2 转换, 客户端的缓存、调用策略及 Result 类型与远程调用一致
+        :param name: 调用的方法名
+        :return:
+        """
+        if config.rpc_local:
+            return "context = %s(self.get_context(\"%s\"), self, \"%s\")" % (
+                config.rpc_async and "abind_local" or "bind_local", name, name)
+        return "context = self.get_context(\"%s\")" % name
+
+    def process_page_iterator(self, entry: Entry):
+        """
+        生成分页接口的 iter_<name> 方法, 逐页调用接口并逐个返回元素, 当前页迭代完成后才请求下一页
+        :param entry:
+        :return:
+        """
+        self.enter_entry(entry.name)
+        items: type_def.List = entry.result.get_elem_info()["items"]
+        elem = items.get_elem()
+        elem_name = type_def.is_dict(elem) and self.get_entry_name("ResultItems") or mapping.mapping_revert(elem)
+        with self.with_ident():
+            self.append_with(
+                "def iter_%s(self, arg: %s, option: typing.Union[RPCOption, None] = None) -> %s[%s]:" %
+                (entry.name, self.get_entry_name("Arg"),
+                 config.rpc_async and "typing.AsyncIterator" or "typing.Iterator", elem_name)
+            )
+            with self.with_ident():
+                self.append_with("return %s(self.%s, arg, option)" % (
+                    config.rpc_async and "aiter_pages" or "iter_pages", entry.name))
+
+        self.exit_entry()
+        self.append_with()
+
+    def process_bulk_entry(self, entry: Entry):
+        """
+        生成批量接口的客户端方法, 接收 Arg 的可迭代对象，返回每个 Arg 对应的 Result,
+        repeated 模式下按数量及字节数分批调用，stream 模式下一次调用传递所有参数
+        :param entry:
+        :return:
+        """
+        self.enter_entry(entry.name)
+        option = get_option(entry)
+        with self.with_ident():
+            self.append_with(
+                "%s %s(self, args: typing.Iterable[%s], option: typing.Union[RPCOption, None] = None)"
+                " -> typing.List[%s]:" %
+                (self.def_keyword(), bulk_name(entry), self.get_entry_name("Arg"), self.get_entry_name("Result"))
+            )
+            with self.with_ident():
+                convert = "iter_elements(return_result.data, %s)" % self.get_entry_name("Result")
+                self.append_with(self.get_context(bulk_name(entry)))
+                if option.bulk == "stream":
+                    call = "return_result = %s" % self.traced_call(entry, "RawMessage(iter_messages(args))")
+                    if config.rpc_async:
+                        self.append_with(call)
+                    else:
+                        self.append_with(self.trace_with(entry))
+                        with self.with_ident():
+                            self.append_with(call)
+                    self.append_with("return list(%s)" % convert)
+                else:
+                    self.append_with("results = []")
+                    if not config.rpc_async:
+                        self.append_with(self.trace_with(entry))
+                        self.increase_ident()
+                    self.append_with("for batch in chunk_messages(args, %d, %d):" % (option.bulk_size, option.bulk_bytes))
+                    with self.with_ident():
+                        self.enter_entry("ManyArg")
+                        self.append_with("return_result = %s" % self.traced_call(
+                            entry, "RawMessage(pb2.%s(data=batch))" % self.get_pb_entry_name()))
+                        self.exit_entry()
+                        self.append_with("results.extend(%s)" % convert)
+                    if not config.rpc_async:
+                        self.increase_ident(-1)
+                    self.append_with("return results")
+
+        self.exit_entry()
+        self.append_with()
+
+    def process_batch(self):
+        """
+        生成服务级别 Batch 接口的客户端方法, batch 创建 BatchBuilder 收集子请求,
+        execute_batch 在一次 rpc 调用中发送所有子请求
+        :return:
+        """
+        result_types = []
+        for entry in self.meta_data.entries:
+            if can_batch(entry):
+                self.enter_entry(entry.name)
+                result_types.append("\"%s\": %s" % (entry.name, self.get_entry_name("Result")))
+                self.exit_entry()
+
+        with self.with_ident():
+            self.append_with("def batch(self) -> BatchBuilder:")
+            with self.with_ident():
+                self.append_with("return BatchBuilder(pb2.%sBatchRequest, {%s}, self.execute_batch)" % (
+                    self.module_name, ", ".join(result_types)))
+        self.append_with()
+
+        with self.with_ident():
+            self.append_with(
+                "%s execute_batch(self, batch: BatchBuilder, option: typing.Union[RPCOption, None] = None)"
+                " -> typing.List[BatchItem]:" % self.def_keyword())
+            with self.with_ident():
+                self.append_with(self.get_context("Batch"))
+                if config.rpc_async:
+                    self.append_with(
+                        "return_result = await acall_traced(TraceContext, context, context.call, batch, option)")
+                else:
+                    self.append_with("with TraceContext(context):")
+                    with self.with_ident():
+                        self.append_with("return_result = context.call(batch, option=option)")
+                self.append_with("return batch.resolve(return_result)")
+        self.append_with()
+
     def process_service_body(self, entry: Entry):
         """
         生成 service 的实现定义，默认实现为客户端的，服务端的实现由子类 GrpcPyServerDef 完成
         :param entry:
         :return:
         """
-        self.append_with("context = self.get_context(\"%s\")" % entry.name)
-        self.append_with("with TraceContext(context):")
+        if self.is_direct_local(entry):
+            self.process_direct_local(entry)
+        if is_stream(entry):
+            self.append_with(self.get_context(entry.name))
+            self.process_stream_body(entry)
+            return
+
+        self.process_cache_lookup(entry)
+        self.append_with(self.get_context(entry.name))
+        self.process_metric_scope(entry.name)
+        if config.rpc_async:
+            # runtime 的 TraceContext 基于线程保存状态, 协程中由 acall_traced 按步进入
+            self.append_with("return_result = %s" % self.track_response(self.call_expr(entry)))
+            self.process_cache_put(entry)
+            self.process_result_convert()
+        else:
+            self.append_with(self.trace_with(entry))
+            with self.with_ident():
+                self.append_with("return_result = %s" % self.track_response(self.call_expr(entry)))
+                self.process_cache_put(entry)
+                self.process_result_convert()
+        self.exit_metric_scope(entry.name)
+
+    def process_caches(self):
+        """
+        为需要缓存返回值的接口生成类级别的 ResponseCache, 可以通过 response_cache.get_cache 获取并使其失效
+        :return:
+        """
+        for entry in self.meta_data.entries:
+            if not is_cached(entry):
+                continue
+            option = get_option(entry)
+            self.append_with("_cache_%s = ResponseCache(\"%s.%s\", %s, %d, (%s))" % (
+                entry.name, self.module_name, entry.name, option.cache_ttl, option.cache_size,
+                "".join("\"%s\", " % name for name in option.cache_keys)))
+
+    def process_cache_lookup(self, entry: Entry):
+        """
+        调用 rpc 前查找缓存，命中时直接转换并返回
+        :param entry:
+        :return:
+        """
+        if not is_cached(entry):
+            return
+
+        self.append_with("cache_key = self._cache_%s.key(arg)" % entry.name)
+        self.append_with("return_result = self._cache_%s.get(cache_key)" % entry.name)
+        self.append_with("if return_result is not None:")
         with self.with_ident():
-            self.append_with("return_result = context.call(arg, option=option)")
-            self.append_with("result = %s()" % self.get_entry_name("Result"))
-            self.append_with("result.from_pb2(return_result)")
-            self.append_with("return result")
+            self.process_result_convert()
+
+    def process_cache_put(self, entry: Entry):
+        if is_cached(entry):
+            self.append_with("self._cache_%s.put(cache_key, return_result)" % entry.name)
+
+    def call_expr(self, entry: Entry) -> str:
+        """
+        生成发起 rpc 调用的表达式，需要合并请求时通过 SingleFlight 调用
+        :param entry:
+        :return:
+        """
+        context = "context"
+        if has_call_policy(entry) and not config.rpc_async:
+            # 异步客户端的策略由 channel 的 service config 执行
+            context = "self._policy_%s.bind(context, TraceContext, RPCOption)" % entry.name
+        if is_coalesced(entry):
+            if config.rpc_async:
+                return "await acall_traced(TraceContext, context, self._flight_%s.acall, %s, arg, option%s)" % (
+                    entry.name, context, self.sampler_arg(entry))
+            return "self._flight_%s.call(%s, arg, option)" % (entry.name, context)
+        if config.rpc_async:
+            return self.traced_call(entry, "arg")
+        return "%s.call(arg, option=option)" % context
+
+    def traced_call(self, entry: Entry, arg: str) -> str:
+        """
+        生成通过 context.call 发起调用的表达式, 异步客户端通过 acall_traced 在 TraceContext 中调用
+        :param entry:
+        :param arg: 调用参数的表达式
+        :return:
+        """
+        if config.rpc_async:
+            return "await acall_traced(TraceContext, context, context.call, %s, option%s)" % (
+                arg, self.sampler_arg(entry))
+        return "context.call(%s, option=option)" % arg
+
+    @staticmethod
+    def sampler_arg(entry: Entry) -> str:
+        """
+        异步客户端传给 acall_traced / aiter_traced 的 sampler 参数, 由其决定是否进入 TraceContext
+        :param entry:
+        :return:
+        """
+        if need_sampling(entry):
+            return ", sampler=self._sampler_%s" % entry.name
+        return ""
+
+    def process_call_policies(self):
+        """
+        为声明了 deadline、retries 或 hedge_delay 的接口生成类级别的 CallPolicy,
+        异步客户端将所有策略合并为 channel 的 service config
+        :return:
+        """
+        names = []
+        for entry in self.meta_data.entries:
+            if has_call_policy(entry):
+                option = get_option(entry)
+                names.append("_policy_%s" % entry.name)
+                self.append_with("_policy_%s = CallPolicy(\"%s.%s\", %s, %d, %s)" % (
+                    entry.name, self.module_name, entry.name, option.deadline, option.retries, option.hedge_delay))
+        if names and config.rpc_async:
+            self.append_with("service_config = build_service_config([%s])" % ", ".join(names))
+
+    def process_flights(self):
+        """
+        为需要合并请求的接口生成类级别的 SingleFlight
+        :return:
+        """
+        flight_type = config.rpc_async and "AsyncSingleFlight" or "SingleFlight"
+        for entry in self.meta_data.entries:
+            if is_coalesced(entry):
+                self.append_with("_flight_%s = %s(\"%s.%s\")" % (entry.name, flight_type, self.module_name, entry.name))
+
+    def process_stream_body(self, entry: Entry):
+        """
+        server streaming 的接口返回惰性的迭代器，只有在迭代时才会逐个转换元素
+        :param entry:
+        :return:
+        """
+        prefix = config.rpc_async and "a" or ""
+        if type_def.is_base_type(entry.result.get_elem()):
+            convert = "%siter_data(responses)" % prefix
+        else:
+            convert = "%siter_elements(responses, %s)" % (prefix, self.get_entry_name("ResultElement"))
+
+        if config.rpc_async:
+            self.append_with("responses = aiter_traced(TraceContext, context, context.stream, arg, option%s)" %
+                             self.sampler_arg(entry))
+        else:
+            # 迭代结束前一直保持在 TraceContext 中
+            self.append_with("responses = iter_traced(%s, context.call, arg, option=option)" % self.trace_expr(entry))
+        self.append_with("return %s" % convert)
+
+    def process_result_convert(self):
+        """
+        将 rpc 调用得到的 return_result 转换为 Result 类型并返回
+        :return:
+        """
+        self.append_with("result = %s()" % self.get_entry_name("Result"))
+        self.append_with("result.from_pb2(return_result)")
+        self.append_with("return result")
+
+    def need_metrics(self) -> bool:
+        """
+        是否需要记录调用的监控数据, 客户端只在 rpc_metrics 为 all 时记录
+        :return:
+        """
+        return config.rpc_metrics == "all"
+
+    def metric_names(self) -> typing.List[str]:
+        """
+        需要记录监控数据的方法名，客户端只记录非 streaming 的接口
+        :return:
+        """
+        return [entry.name for entry in self.meta_data.entries if not is_stream(entry)]
+
+    def process_metrics(self):
+        """
+        为需要记录监控数据的方法生成类级别的 MethodMetric
+        :return:
+        """
+        if not self.need_metrics():
+            return
+
+        for name in self.metric_names():
+            self.append_with("_metric_%s = MethodMetric(\"%s.%s\", \"%s\")" % (
+                name, self.module_name, name, self.metric_side()))
+
+    @staticmethod
+    def metric_side() -> str:
+        return "client"
+
+    def process_metric_scope(self, name: str, request: str = ""):
+        """
+        进入记录监控数据的范围
+        :param name: 方法名
+        :param request: 请求的 pb2 消息，用于记录请求大小，为空时不记录
+        :return:
+        """
+        if self.need_metrics() and name in self.metric_names():
+            self.append_with("with self._metric_%s.track(%s) as track:" % (name, request))
+            self.increase_ident()
+
+    def exit_metric_scope(self, name: str):
+        if self.need_metrics() and name in self.metric_names():
+            self.increase_ident(-1)
+
+    def track_response(self, message: str) -> str:
+        """
+        记录返回的 pb2 消息大小
+        :param message: 返回 pb2 消息的表达式
+        :return:
+        """
+        if self.need_metrics():
+            return "track.response(%s)" % message
+        return message
+
+    def trace_with(self, entry: Entry) -> str:
+        """
+        生成进入 TraceContext 的 with 语句，需要采样时未被采样的调用不进入 TraceContext,
+        在服务端处理请求的过程中发起的调用沿用上游的采样结果
+        :param entry:
+        :return:
+        """
+        return "with %s:" % self.trace_expr(entry)
+
+    @staticmethod
+    def trace_expr(entry: Entry) -> str:
+        """
+        生成客户端进入的 TraceContext 表达式，需要采样时由 Sampler.trace 决定是否进入
+        :param entry:
+        :return:
+        """
+        if need_sampling(entry):
+            return "self._sampler_%s.trace(TraceContext, context)" % entry.name
+        return "TraceContext(context)"
+
+    def process_samplers(self):
+        """
+        为需要采样的接口生成类级别的采样器
+        :return:
+        """
+        for entry in self.meta_data.entries:
+            if need_sampling(entry):
+                self.append_with("_sampler_%s = Sampler(\"%s.%s\", %s, %s)" % (
+                    entry.name, self.module_name, entry.name, get_option(entry).trace_sample,
+                    config.trace_sample_rate))
+
+    @staticmethod
+    def def_keyword() -> str:
+        """
+        生成方法定义时使用的关键字，异步模式下为 async def
+        :return:
+        """
+        return config.rpc_async and "async def" or "def"
 
     def process_args_def(self, args: typing.List[Arg]):
         """
@@ -285,6 +784,9 @@ of Meta {self.meta_data.name} with message {str(e)}")
 
         self.append_with()
         self.process_pb2_convert(args)
+        if config.validate_args and self.is_arg_class():
+            self.append_with()
+            self.process_validate(args)
 
         self.append_with()
 
@@ -417,6 +919,90 @@ of Meta {self.meta_data.name} with message {str(e)}")
 
         return "\n".join(result)
 
+    def is_arg_class(self) -> bool:
+        """
+        当前生成的是否为参数或参数中的嵌套类型
+        """
+        return len(self.curr_entry_name) > 1 and self.curr_entry_name[1] == "Arg"
+
+    def process_validate(self, args: typing.List[Arg]):
+        """
+        根据字段的约束生成 validate 方法，逐个字段检查, 遇到第一个不满足的约束时抛出 ValidationError,
+        嵌套类型及列表中的嵌套类型调用其自身的 validate
+        :param args:
+        :return:
+        """
+        with self.with_ident():
+            self.append_with("def validate(self, prefix: str = \"\"):")
+            with self.with_ident():
+                self.append_with('"""')
+                self.append_with("校验字段的约束, 不满足时抛出 ValidationError")
+                self.append_with('"""')
+                checked = False
+                for arg in args:
+                    checked = self.process_field_validate(arg) or checked
+                if not checked:
+                    self.append_with("pass")
+
+    def process_field_validate(self, arg: Arg) -> bool:
+        """
+        生成单个字段的校验
+        :return: 是否生成了校验代码
+        """
+        arg_type = arg.arg_type
+        field = "prefix + \"%s\"" % arg.name
+        if type_def.is_dict(arg_type):
+            self.append_with("if self.%s is not None:" % arg.name)
+            with self.with_ident():
+                self.append_with("self.%s.validate(prefix + \"%s.\")" % (arg.name, arg.name))
+            return True
+
+        checks = constraint_checks(arg_type, "value", field)
+        elem_checks = []
+        elem_type = None
+        if type_def.is_list(arg_type):
+            elem_type = arg_type.get_elem()
+            item_field = "\"%%s%s[%%d]\" %% (prefix, i)" % arg.name
+            if type_def.is_dict(elem_type):
+                elem_checks = ["item.validate(\"%%s%s[%%d].\" %% (prefix, i))" % arg.name]
+            else:
+                elem_checks = constraint_checks(elem_type, "item", item_field)
+
+        # 基础类型没有默认值且为 required 时，from_dict 中缺少该字段会得到 None
+        required = (type_def.is_base_type(arg_type) or type_def.is_enum(arg_type)) \
+            and arg_type.required and arg_type.default_value is None
+        if not checks and not elem_checks and not required:
+            return False
+
+        self.append_with("value = self.%s" % arg.name)
+        if required:
+            self.append_with("if value is None:")
+            with self.with_ident():
+                self.append_with("raise ValidationError(%s, \"required\")" % field)
+        else:
+            self.append_with("if value is not None:")
+            self.increase_ident()
+
+        for (condition, error) in checks:
+            self.append_with("if %s:" % condition)
+            with self.with_ident():
+                self.append_with("raise %s" % error)
+
+        if elem_checks:
+            self.append_with("for (i, item) in enumerate(value):")
+            with self.with_ident():
+                if type_def.is_dict(elem_type):
+                    self.append_with(elem_checks[0])
+                else:
+                    for (condition, error) in elem_checks:
+                        self.append_with("if %s:" % condition)
+                        with self.with_ident():
+                            self.append_with("raise %s" % error)
+
+        if not required:
+            self.decrease_ident()
+        return True
+
     def process_class_body(self, args: typing.List[Arg]):
         if len(args) == 0:
             self.append_with("pass")
@@ -450,14 +1036,21 @@ of Meta {self.meta_data.name} with message {str(e)}")
                 self.append_with(
                     "class %s(%s):" % (self.get_entry_name("ResultElement"), mapping.mapping_revert(elem_type))
                 )
-                self.append_with("pass")
+                with self.with_ident():
+                    self.append_with("pass")
+                self.append_with()
             elif isinstance(elem_type, type_def.Dict):
-                self.def_class(self.get_entry_name("ResultElement"), elem_type)
+                self.enter_entry("ResultElement")
+                self.def_class(self.get_entry_name(), elem_type)
+                self.exit_entry()
 
-            self.append_with(
-                "class %s(typing.List[%s]):" % (self.get_entry_name("Result"), self.get_entry_name("ResultElement")))
-            with self.with_ident():
-                self.append_with("pass")
+            if self.need_service and is_columnar(entry):
+                self.process_columnar_return(entry)
+            else:
+                self.append_with(
+                    "class %s(typing.List[%s]):" % (self.get_entry_name("Result"), self.get_entry_name("ResultElement")))
+                with self.with_ident():
+                    self.append_with("pass")
         elif type_def.is_dict(entry.result):
             self.enter_entry("Result")
             self.def_class(self.get_entry_name(), entry.result)
@@ -465,6 +1058,22 @@ of Meta {self.meta_data.name} with message {str(e)}")
 
         self.append_with()
 
+    def process_columnar_return(self, entry: Entry):
+        """
+        为使用列式编码的返回值生成定义，按列解码，按行访问
+        :param entry:
+        :return:
+        """
+        self.has_columnar = True
+        column_names = list(entry.result.get_elem().get_elem_info().keys())
+        self.append_with("class %s(ColumnarResult):" % self.get_entry_name("Result"))
+        with self.with_ident():
+            self.append_with("element_type = %s" % self.get_entry_name("ResultElement"))
+            self.append_with("column_names = (%s)" % "".join("\"%s\", " % name for name in column_names))
+            self.enter_entry("Result")
+            self.append_with("pb2_type = pb2.%s" % self.get_pb_entry_name())
+            self.exit_entry()
+
     def process_arg(self, arg: Arg):
         """
         处理单个参数
@@ -536,7 +1145,43 @@ of Meta {self.meta_data.name} with message {str(e)}")
             method_type = self.curr_entry_name[1]
             # if method_type == "Result":
             #     method_type = method_type + ".Data"
+            if method_type == "ResultElement" and not (self.curr_entry and is_stream(self.curr_entry)):
+                # 列表返回值的元素定义在 Result 的 Data 中, server streaming 的元素则为独立的定义
+                method_type = "Result.Data"
             method = "%s%s%s" % (module, method, method_type)
             return ".".join([method] + self.curr_entry_name[2:])
 
         return self.meta_data.name
+
+
+# 字段约束对应的校验条件，%s 为字段的值
+constraint_conditions = (
+    ("min_length", "len(%s) < %r"),
+    ("max_length", "len(%s) > %r"),
+    ("minimum", "%s < %r"),
+    ("maximum", "%s > %r"),
+    ("min_items", "len(%s) < %r"),
+    ("max_items", "len(%s) > %r"),
+    ("must_true", "%s is not True"),
+    ("must_false", "%s is not False"),
+)
+
+
+def constraint_checks(arg_type, value: str, field: str) -> typing.List[typing.Tuple[str, str]]:
+    """
+    生成类型定义中所有约束的校验条件及对应的错误
+    :param arg_type: 字段的类型定义
+    :param value: 字段值的表达式
+    :param field: 字段路径的表达式
+    :return: [(条件, 抛出的错误)]
+    """
+    checks = []
+    for (rule, condition) in constraint_conditions:
+        limit = getattr(arg_type, rule, None)
+        if limit is None or (rule in ("must_true", "must_false") and not limit):
+            continue
+        if rule in ("must_true", "must_false"):
+            checks.append((condition % value, "ValidationError(%s, \"%s\")" % (field, rule)))
+        else:
+            checks.append((condition % (value, limit), "ValidationError(%s, \"%s\", %r)" % (field, rule, limit)))
+    return checks
@@ -2,9 +2,15 @@
 生成 rpc 服务的接口定义
 """
 
+import contextlib
+import typing
+
 from .grpc_py_def import GrpcPyDef
 from .... import config
 from ....common import Entry
+from ...analyser.option import is_columnar, is_stream, is_bulk, bulk_name, get_option, is_limited, need_sampling, \
+    impl_reuse, is_paginated
+from ....common import type_def
 from ...util.text import pretty_name
 
 
@@ -23,6 +29,34 @@ class GrpcPyServerDef(GrpcPyDef):
         self.append_with("from .impl.%s import *" % self.meta_data.name.lower())
         self.append_with("from .runtime.runtime import Context, TraceInfo, reg_servicer")
         self.append_with("from .runtime.runtime.concurrency.local_trace import TraceContext")
+        if any(is_bulk(entry) for entry in self.meta_data.entries):
+            if config.rpc_async:
+                self.append_with("from .addition.bulk import convert_args, achunk_args, acall_batch")
+            else:
+                self.append_with("from .addition.bulk import convert_args, chunk_args, call_batch")
+        if config.rpc_batch:
+            self.append_with("from .addition.batch import %s" % (config.rpc_async and "arun_batch" or "run_batch"))
+        if self.need_metrics():
+            self.append_with("from .addition.metrics import MethodMetric")
+        if any(need_sampling(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.sampling import Sampler, UntracedContext, no_trace")
+        reuse_modes = self.impl_reuse_modes()
+        if reuse_modes:
+            self.append_with("from .addition.impl_pool import %s" % ", ".join(
+                {"thread": "ThreadLocalImpl", "pool": "ImplPool"}[mode] for mode in reuse_modes))
+        if any(is_limited(entry) for entry in self.meta_data.entries):
+            self.append_with(
+                "from .addition.limiter import %s" % (config.rpc_async and "AsyncMethodLimiter" or "MethodLimiter"))
+        if any(is_paginated(entry) for entry in self.meta_data.entries):
+            self.append_with("from .addition.pagination import clamp_limit")
+        need_error_scope = any(self.need_error_scope(entry) for entry in self.meta_data.entries)
+        if config.rpc_async:
+            names = ["acall_traced", "aiter_traced"]
+            if need_error_scope:
+                names.append("ahandle_errors")
+            self.append_with("from .addition.aio import %s" % ", ".join(names))
+        elif need_error_scope:
+            self.append_with("from .addition.server import handle_errors")
         if config.need_impl:
             self.append_with(
                 "from %s import %s" %
@@ -51,9 +85,21 @@ class GrpcPyServerDef(GrpcPyDef):
         with self.with_ident():
             self.append_with("from_project = \"%s\"" % (
                     config.outside_server and config.outside_server_name or config.source_project_name))
-            self.append_with("rpc_name = \"%s\"\n" % self.module_name)
+            self.append_with("rpc_name = \"%s\"" % self.module_name)
+            self.process_limiters()
+            self.process_metrics()
+            self.process_samplers()
+            self.process_impl_holders()
+        self.append_with()
         for entry in self.meta_data.entries:
             self.process_entry(entry)
+            if is_bulk(entry):
+                self.process_bulk_entry(entry)
+            if self.is_direct_local(entry):
+                self.process_local_entry(entry)
+
+        if config.rpc_batch:
+            self.process_batch()
 
         # self.append_with()
         # self.append_with(
@@ -70,17 +116,150 @@ class GrpcPyServerDef(GrpcPyDef):
          """
         self.append_with("arg = %s()" % self.get_entry_name("Arg"))
         self.append_with("arg.from_pb2(request)")
-        self.append_with("ctx = Context(TraceInfo(\"%s.%s\"), impl_context=context)" % (self.module_name, entry.name))
-        self.append_with("with TraceContext(ctx):")
-        with self.with_ident():
-            # 具体调用的名称要使用实现了 impl 的类型名
-            if config.need_impl:
-                self.append_with("impl = %s(ctx)" % pretty_name(self.meta_data.impl_type.__name__))
-                self.append_with("result = impl.%s(arg)" % entry.name)
-                self.append_with("return result.convert_pb2()")
+        if config.validate_args:
+            # 不满足约束时抛出 ValidationError, 由 handle_errors 转换为 INVALID_ARGUMENT
+            self.append_with("arg.validate()")
+        if is_paginated(entry):
+            option = get_option(entry)
+            self.append_with("arg.limit = clamp_limit(arg.limit, %d, %d)" % (option.page_size, option.max_page_size))
+        with self.trace_scope(entry, entry.name):
+            self.process_impl_call(entry)
+
+    @contextlib.contextmanager
+    def trace_scope(self, entry: Entry, name: str):
+        """
+        生成创建 ctx 及进入 TraceContext 的代码, 需要采样时未被采样的调用使用 UntracedContext,
+        不创建 Context 及 TraceInfo, 也不进入 TraceContext
+        :param entry:
+        :param name: 生成的方法名
+        :return:
+        """
+        ctx = "Context(TraceInfo(\"%s.%s\"), impl_context=context)" % (self.module_name, name)
+        sampling = need_sampling(entry)
+        ident = 0
+        if sampling:
+            self.append_with("with self._sampler_%s.scope(context) as sampled:" % name)
+            self.increase_ident()
+            ident += 1
+            ctx = "%s if sampled else UntracedContext(context)" % ctx
+        self.append_with("ctx = %s" % ctx)
+        if config.rpc_async:
+            # runtime 的 TraceContext 基于线程保存状态, 协程中由 acall_traced / aiter_traced 按步进入
+            self.append_with("trace_type = %s" % (sampling and "TraceContext if sampled else None" or "TraceContext"))
+        else:
+            self.append_with("with TraceContext(ctx)%s:" % (sampling and " if sampled else no_trace" or ""))
+            self.increase_ident()
+            ident += 1
+
+        yield
+
+        self.increase_ident(-ident)
+
+    def process_samplers(self):
+        """
+        为需要采样的接口生成类级别的采样器
+        :return:
+        """
+        for entry in self.meta_data.entries:
+            if not need_sampling(entry):
+                continue
+            names = [entry.name]
+            if is_bulk(entry):
+                names.append(bulk_name(entry))
+            for name in names:
+                self.append_with("_sampler_%s = Sampler(\"%s.%s\", %s, %s)" % (
+                    name, self.module_name, name, get_option(entry).trace_sample, config.trace_sample_rate))
+
+    def process_impl_call(self, entry: Entry):
+        """
+        生成调用 impl 并返回 pb2 结果的代码
+        :param entry:
+        :return:
+        """
+        # 具体调用的名称要使用实现了 impl 的类型名
+        if config.need_impl:
+            with self.impl_scope(entry):
+                if is_stream(entry):
+                    self.process_stream_yield(entry)
+                    return
+
+                if config.rpc_async:
+                    # 同时支持 async def 及普通方法的 impl
+                    self.append_with("result = await acall_traced(trace_type, ctx, impl.%s, arg)" % entry.name)
+                else:
+                    self.append_with("result = impl.%s(arg)" % entry.name)
+                if is_columnar(entry):
+                    self.append_with(
+                        "return %s" % self.track_response("%s.to_pb2(result)" % self.get_entry_name("Result")))
+                else:
+                    self.append_with("return %s" % self.track_response("result.convert_pb2()"))
+        else:
+            self.append_with(f"# 在此处实现具体的业务逻辑，返回的类型必须为 {self.get_entry_name('Result')}")
+            self.append_with("raise NotImplementedError()")
+
+    def impl_reuse_modes(self) -> typing.List[str]:
+        """
+        获取所有接口使用到的 impl 复用方式
+        :return:
+        """
+        if not config.need_impl:
+            return []
+        modes = set(impl_reuse(entry) for entry in self.meta_data.entries)
+        return [mode for mode in ("thread", "pool") if mode in modes]
+
+    def process_impl_holders(self):
+        """
+        为复用 impl 的接口生成类级别的 ThreadLocalImpl 或 ImplPool, 所有接口共用
+        :return:
+        """
+        impl_name = config.need_impl and pretty_name(self.meta_data.impl_type.__name__)
+        for mode in self.impl_reuse_modes():
+            if mode == "thread":
+                self.append_with("_impl_thread = ThreadLocalImpl(%s)" % impl_name)
             else:
-                self.append_with(f"# 在此处实现具体的业务逻辑，返回的类型必须为 {self.get_entry_name('Result')}")
-                self.append_with("raise NotImplementedError()")
+                size = max(get_option(entry).impl_pool_size for entry in self.meta_data.entries
+                           if impl_reuse(entry) == "pool")
+                self.append_with("_impl_pool = ImplPool(%s, %d)" % (impl_name, size))
+
+    @contextlib.contextmanager
+    def impl_scope(self, entry: Entry):
+        """
+        生成获取 impl 的代码, 复用 impl 时在 with 语句中使用
+        :param entry:
+        :return:
+        """
+        mode = impl_reuse(entry)
+        if not mode:
+            self.append_with("impl = %s(ctx)" % pretty_name(self.meta_data.impl_type.__name__))
+            yield
+            return
+
+        self.append_with("with self._impl_%s.use(ctx) as impl:" % mode)
+        with self.with_ident():
+            yield
+
+    def process_stream_yield(self, entry: Entry):
+        """
+        server streaming 的接口逐个迭代 impl 返回的生成器，转换后返回，
+        impl 无需一次性构建全部结果
+        :param entry:
+        :return:
+        """
+        if type_def.is_base_type(entry.result.get_elem()):
+            convert = "pb2.%s%s(data=item)" % (self.meta_data.name, self.get_entry_name("ResultElement"))
+        else:
+            convert = "item.convert_pb2()"
+        convert = self.track_response(convert)
+
+        if config.rpc_async:
+            # 同时支持异步生成器及普通的迭代器
+            self.append_with("async for item in aiter_traced(trace_type, ctx, impl.%s, arg):" % entry.name)
+            with self.with_ident():
+                self.append_with("yield %s" % convert)
+        else:
+            self.append_with("for item in impl.%s(arg):" % entry.name)
+            with self.with_ident():
+                self.append_with("yield %s" % convert)
 
     def process_entry(self, entry: Entry):
         """
@@ -91,12 +270,190 @@ class GrpcPyServerDef(GrpcPyDef):
         self.enter_entry(entry.name)
         # 接口定义
         with self.with_ident():
-            self.append_with("def %s(self, request, context):" % entry.name)
+            self.append_with("%s %s(self, request, context):" % (self.def_keyword(), entry.name))
             with self.with_ident():
+                self.process_error_scope(entry)
+                self.process_limit_scope(entry)
+                self.process_metric_scope(entry.name, "request")
                 self.process_service_body(entry)
+                self.exit_metric_scope(entry.name)
+                self.exit_limit_scope(entry)
+                self.exit_error_scope(entry)
 
         self.exit_entry()
         self.append_with()
 
+    def process_local_entry(self, entry: Entry):
+        """
+        生成进程内直接调用的 local_<name>, 参数为客户端的 Arg, 返回 impl 的 Result, 不经过 pb2 的转换,
+        context 为 addition.local 中的 LocalServicerContext
+        :param entry:
+        :return:
+        """
+        with self.with_ident():
+            self.append_with("%s local_%s(self, arg, context):" % (self.def_keyword(), entry.name))
+            with self.with_ident():
+                if not config.need_impl:
+                    self.append_with("raise NotImplementedError()")
+                    self.append_with()
+                    return
+                with self.trace_scope(entry, entry.name), self.impl_scope(entry):
+                    if is_stream(entry) and config.rpc_async:
+                        self.append_with("async for item in aiter_traced(trace_type, ctx, impl.%s, arg):" % entry.name)
+                        with self.with_ident():
+                            self.append_with("yield item")
+                    elif is_stream(entry):
+                        # 迭代结束前保持 TraceContext 及复用的 impl
+                        self.append_with("yield from impl.%s(arg)" % entry.name)
+                    elif config.rpc_async:
+                        self.append_with("return await acall_traced(trace_type, ctx, impl.%s, arg)" % entry.name)
+                    else:
+                        self.append_with("return impl.%s(arg)" % entry.name)
+        self.append_with()
+
+    def process_limiters(self):
+        """
+        为声明了 max_concurrency 的接口生成类级别的并发限制器, 同一接口的批量接口共用一个限制器
+        :return:
+        """
+        limiter_type = config.rpc_async and "AsyncMethodLimiter" or "MethodLimiter"
+        for entry in self.meta_data.entries:
+            if is_limited(entry):
+                option = get_option(entry)
+                self.append_with("_limit_%s = %s(\"%s.%s\", %d, %s)" % (
+                    entry.name, limiter_type, self.module_name, entry.name,
+                    option.max_concurrency, option.queue_timeout))
+
+    @staticmethod
+    def need_error_scope(entry: Entry) -> bool:
+        # 分页接口的 impl 可能抛出 InvalidCursor
+        return is_limited(entry) or config.validate_args or is_paginated(entry)
+
+    def process_error_scope(self, entry: Entry):
+        """
+        进入将 LimitExceeded 及 ValidationError 转换为 abort 的范围, 只在 servicer 的方法中转换,
+        Batch 的子请求传入的是 ItemContext, 只使该子请求失败
+        :param entry:
+        :return:
+        """
+        if self.need_error_scope(entry):
+            self.append_with(config.rpc_async and "async with ahandle_errors(context):" or "with handle_errors(context):")
+            self.increase_ident()
+
+    def exit_error_scope(self, entry: Entry):
+        if self.need_error_scope(entry):
+            self.increase_ident(-1)
+
+    def process_limit_scope(self, entry: Entry):
+        """
+        进入并发限制的范围，超出限制时抛出 LimitExceeded, 由 handle_errors 转换为 RESOURCE_EXHAUSTED
+        :param entry:
+        :return:
+        """
+        if is_limited(entry):
+            self.append_with("%swith self._limit_%s.admit():" % (config.rpc_async and "async " or "", entry.name))
+            self.increase_ident()
+
+    def exit_limit_scope(self, entry: Entry):
+        if is_limited(entry):
+            self.increase_ident(-1)
+
+    def need_metrics(self) -> bool:
+        return config.rpc_metrics in ("server", "all")
+
+    def metric_names(self) -> typing.List[str]:
+        names = []
+        for entry in self.meta_data.entries:
+            names.append(entry.name)
+            if is_bulk(entry):
+                names.append(bulk_name(entry))
+        return names
+
+    @staticmethod
+    def metric_side() -> str:
+        return "server"
+
+    def process_bulk_entry(self, entry: Entry):
+        """
+        处理批量接口, 参数按 bulk_size 分批交给 impl, impl 实现了 <name>_many 时整批调用,
+        否则逐个调用 <name>
+        :param entry:
+        :return:
+        """
+        self.enter_entry(entry.name)
+        option = get_option(entry)
+        stream = option.bulk == "stream"
+        with self.with_ident():
+            self.append_with("%s %s(self, %s, context):" % (
+                self.def_keyword(), bulk_name(entry), stream and "request_iterator" or "request"))
+            with self.with_ident():
+                self.process_error_scope(entry)
+                self.process_limit_scope(entry)
+                self.process_metric_scope(bulk_name(entry), stream and "" or "request")
+                with self.trace_scope(entry, bulk_name(entry)):
+                    self.process_bulk_call(entry, option)
+                self.exit_metric_scope(bulk_name(entry))
+                self.exit_limit_scope(entry)
+                self.exit_error_scope(entry)
+
+        self.exit_entry()
+        self.append_with()
+
+    def process_bulk_call(self, entry: Entry, option):
+        """
+        生成批量接口调用 impl 并返回 pb2 结果的代码
+        :param entry:
+        :param option:
+        :return:
+        """
+        if not config.need_impl:
+            self.append_with(f"# 在此处实现具体的业务逻辑，返回的类型必须为 {self.get_entry_name('Result')} 的列表")
+            self.append_with("raise NotImplementedError()")
+            return
+
+        arg_name = self.get_entry_name("Arg")
+        # 与单个调用一样在调用 impl 前校验每个参数
+        validate = config.validate_args and ", validate=True" or ""
+        if config.rpc_async:
+            call_batch = "await acall_traced(trace_type, ctx, acall_batch, impl, \"%s\", %%s)" % entry.name
+        else:
+            call_batch = "call_batch(impl, \"%s\", %%s)" % entry.name
+        with self.impl_scope(entry):
+            if option.bulk == "stream":
+                self.append_with("results = []")
+                self.append_with("%sfor batch in %s(request_iterator, %s, %d%s):" % (
+                    config.rpc_async and "async " or "", config.rpc_async and "achunk_args" or "chunk_args",
+                    arg_name, option.bulk_size, validate))
+                with self.with_ident():
+                    self.append_with("results.extend(%s)" % (call_batch % "batch"))
+            else:
+                self.append_with("results = %s" % (
+                    call_batch % ("convert_args(request.data, %s%s)" % (arg_name, validate))))
+
+        if is_columnar(entry):
+            convert = "%s.to_pb2(item)" % self.get_entry_name("Result")
+        else:
+            convert = "item.convert_pb2()"
+        self.enter_entry("ManyResult")
+        self.append_with("return %s" % self.track_response(
+            "pb2.%s(data=[%s for item in results])" % (self.get_pb_entry_name(), convert)))
+        self.exit_entry()
+
+    def process_batch(self):
+        """
+        处理服务级别的 Batch 接口, 子请求并发调用 servicer 自身的方法
+        :return:
+        """
+        with self.with_ident():
+            self.append_with("%s Batch(self, request, context):" % self.def_keyword())
+            with self.with_ident():
+                if config.rpc_async:
+                    self.append_with(
+                        "return await arun_batch(self, request, context, pb2.%sBatchResponse)" % self.module_name)
+                else:
+                    self.append_with("return run_batch(self, request, context, pb2.%sBatchResponse)" % self.module_name)
+        self.append_with()
+
     def append_header_common(self):
         self.append_with("from ..runtime.runtime.common import RPCDict")
+        self.append_header_addition("..addition")
@@ -1,12 +1,13 @@
 import os
 import re
 import os.path as path
+import shutil
 import subprocess
 import typing
 
 from .... import config
 from ...util.cfg_generator import CfgGenerator
-from .base import Generator, ServerDirConfig, ClientDirConfig, ConfigBase
+from .base import Generator, ServerDirConfig, ClientDirConfig, ConfigBase, ensure_dir
 from .grpc_py_def import GrpcPyDef
 from .grpc_server_def import GrpcPyServerDef
 
@@ -39,6 +40,7 @@ class GRPCGenerator(Generator):
         - ---- ---- package_name1.py
         - ---- ---- package_name2.py
         + ---- runtime                # runtime: common library
+        + ---- addition               # addition: modules copied from codegen.addition
         - ---- package_name1.py       # entrance
         - ---- package_name2.py       # entrance
 
@@ -60,6 +62,7 @@ class GRPCGenerator(Generator):
         + ---- service_name1.py
         + ---- service_name2.py
         + runtime                           # the runtime common library
+        + addition                          # the modules copied from codegen.addition
         + package_name1.py                  # the rpc interface
         + package_name2.py
         :return:
@@ -68,11 +71,13 @@ class GRPCGenerator(Generator):
             server_dir_config = ServerDirConfig(target_path)
             server_dir_config.ensure_dir()
             construct_runtime_module(server_dir_config)
+            construct_addition_module(server_dir_config)
 
             client_dir_config = ClientDirConfig(target_path, self.client_path)
             if config.client_output_path:
                 client_dir_config.ensure_dir()
                 construct_runtime_module(client_dir_config)
+                construct_addition_module(client_dir_config)
 
             # 迭代每个 config, 每个 config 代表一个服务
             for cfg in self.configs:
@@ -98,7 +103,7 @@ def gen_addition_file(configs: typing.List[ConfigBase],
     用于生成全局的，附加文件,
     主要是 __init__ 文件，该文件包括了自动导入服务到 server 的逻辑，
     格式为:
-    from .runtime.runtime import reg_servicer
+    from .runtime.runtime import reg_servicer  # 使用 addition 中的服务端时为 from .addition.server import reg_servicer
     # project: name
     body
     # end project
@@ -106,7 +111,8 @@ def gen_addition_file(configs: typing.List[ConfigBase],
     body
     # end project
 
-    每个项目生成时找到自己那部分进行替换
+    每个项目生成时找到自己那部分进行替换, 各项目的 body 都通过头部导入的 reg_servicer 注册,
+    因此切换服务端时其它项目的 servicer 同样注册到新的服务端
     :param configs:
     :param server_dir_config:
     :param _client_dir_config:
@@ -118,7 +124,10 @@ def gen_addition_file(configs: typing.List[ConfigBase],
     cfg.append_with("# coding: utf8")
     cfg.append_with("# DONT TOUCH THIS FILE!")
     cfg.append_with()
-    cfg.append_with("from .runtime.runtime import reg_servicer")
+    if use_custom_server():
+        cfg.append_with("from .addition.server import reg_servicer")
+    else:
+        cfg.append_with("from .runtime.runtime import reg_servicer")
     cfg.append_with()
 
     project_reg = re.compile(r"# project: (?P<ProjectName>[^\n]+)(?P<ProjectInfo>[\s\S]+?)# end project")
@@ -128,10 +137,16 @@ def gen_addition_file(configs: typing.List[ConfigBase],
     for c in configs:
         project_lines.append("from .%s import %sServicer, pb2_grpc as %s_pb2_grpc" %
                              (c.meta_data.name.lower(), c.meta_data.name, c.meta_data.name.lower()))
+    # addition 的 reg_servicer 同时注册到进程内直接调用的注册表中, runtime 的则需要单独注册
+    need_reg_local = config.rpc_local and not use_custom_server()
+    if need_reg_local:
+        project_lines.append("from .addition.local import reg_local")
     project_lines.append("")
     for c in configs:
         project_lines.append("reg_servicer(%sServicer, %s_pb2_grpc.add_%sServicer_to_server)" %
                              (c.meta_data.name, c.meta_data.name.lower(), c.meta_data.name))
+        if need_reg_local:
+            project_lines.append("reg_local(%sServicer)" % c.meta_data.name)
 
     # read if exists old __init__ file
     orig_file_content = ""
@@ -180,7 +195,12 @@ def gen_addition_file(configs: typing.List[ConfigBase],
         # cfg.append_with(f"sys.path.append('./{config.source_project_name}')")
         cfg.append_with("\n")
 
-    cfg.append_with("from rpc.runtime.runtime import server")
+    if config.rpc_async:
+        cfg.append_with("from rpc.addition import aio as server")
+    elif use_custom_server():
+        cfg.append_with("from rpc.addition import server")
+    else:
+        cfg.append_with("from rpc.runtime.runtime import server")
 
     # if config.outside_server:
     #     # 引入所有 python package
@@ -190,8 +210,39 @@ def gen_addition_file(configs: typing.List[ConfigBase],
     cfg.append_with()
     cfg.append_with("if __name__ == '__main__':")
     with cfg.with_ident():
-        cfg.append_with("server.loop()")
+        if use_custom_server():
+            cfg.append_with("# 生成时指定的运行参数, 可以通过 RPC_SERVER_* 环境变量覆盖")
+            cfg.append_with("server.loop(server.ServerOption.from_env(")
+            with cfg.with_ident():
+                cfg.append_with("workers=%d," % config.server_workers)
+                cfg.append_with("max_concurrent_rpcs=%d," % config.server_max_concurrent_rpcs)
+                cfg.append_with("max_send_message_bytes=%d," % config.server_max_message_bytes)
+                cfg.append_with("max_receive_message_bytes=%d," % config.server_max_message_bytes)
+                cfg.append_with("keepalive_time_ms=%d," % config.server_keepalive_time_ms)
+                cfg.append_with("processes=%d," % config.server_processes)
+                cfg.append_with("metrics_port=%d," % config.metrics_port)
+            cfg.append_with("))")
+        else:
+            cfg.append_with("server.loop()")
+
+    write_server_main(server_dir_config, cfg)
+
+
+def use_custom_server() -> bool:
+    """
+    是否使用 addition 中的服务端, runtime 的 server.loop 无法运行 grpc.aio 的 servicer
+    :return:
+    """
+    return config.custom_server or config.rpc_async
+
 
+def write_server_main(server_dir_config: ServerDirConfig, cfg: CfgGenerator):
+    """
+    保存服务端的启动文件 rpc_server.py
+    :param server_dir_config:
+    :param cfg:
+    :return:
+    """
     # if config.server_code:
     with open(path.join(server_dir_config.base_dir, "rpc_server.py"), "w") as f:
         s = cfg.to_cfg_string()
@@ -323,3 +374,25 @@ def construct_runtime_module(dir_config: ClientDirConfig):
     except FileNotFoundError as fo:
         print("can not found the %s command for submodule update" % fo.filename)
         raise fo
+
+
+def construct_addition_module(dir_config: ClientDirConfig):
+    """
+    将 codegen.addition 中的模块拷贝到生成目录的 addition 中，供生成的代码使用,
+    每次生成都会覆盖，以保持与生成器的版本一致
+    :param dir_config:
+    :return:
+    """
+    copy_addition_modules(dir_config.addition)
+
+
+def copy_addition_modules(target_dir: str):
+    """
+    将 codegen.addition 中的模块拷贝到指定目录
+    :param target_dir: 目标目录，不存在时创建
+    """
+    addition_src = path.join(path.dirname(path.dirname(path.abspath(__file__))), "addition")
+    ensure_dir(target_dir)
+    for file_name in os.listdir(addition_src):
+        if file_name.endswith(".py"):
+            shutil.copyfile(path.join(addition_src, file_name), path.join(target_dir, file_name))
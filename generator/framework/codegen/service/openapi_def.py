@@ -0,0 +1,272 @@
+"""
+在生成时根据 MetaData 生成 Flask 接口的 Swagger 2.0 文档, 与 flask_restplus 在运行时根据 model 生成的文档结构相同
+"""
+
+import json
+import re
+import typing
+
+from .... import config
+from ....common import MetaData, Entry, RpcType, type_def, ArgSource
+from ....common.web.namespace import get_namespace
+from ...analyser.module_scanner import EnumWithVar
+from ...util.text import pretty_name, split_by_upper_character
+from ...analyser.option import get_option, is_web_stream
+from .flask_def import Method, arg_location
+
+# RPC_TAG 对应的 Swagger 类型及格式
+swagger_types = {
+    "B": ("boolean", None),
+    "I": ("integer", None),
+    "F": ("number", None),
+    "DB": ("number", None),
+    "S": ("string", None),
+    "DT": ("string", "date"),
+    "DTT": ("string", "date-time"),
+}
+
+# Flask url converter 对应的 Swagger 类型
+converter_types = {
+    "int": "integer",
+    "float": "number",
+}
+
+# 字段约束对应的 Swagger 属性
+constraint_keys = (
+    ("min_length", "minLength"),
+    ("max_length", "maxLength"),
+    ("minimum", "minimum"),
+    ("maximum", "maximum"),
+    ("min_items", "minItems"),
+    ("max_items", "maxItems"),
+)
+
+url_param_re = re.compile(r"<(?:(\w+):)?(\w+)>")
+
+
+class OpenApiDef(object):
+    """
+    生成所有接口及枚举接口的文档
+    """
+
+    def __init__(self, meta_list: typing.List[MetaData], enums: typing.List[EnumWithVar] = None):
+        self.meta_list = meta_list
+        self.enums = enums or []
+        self.paths: typing.Dict[str, dict] = {}
+        self.definitions: typing.Dict[str, dict] = {}
+        self.tags: typing.List[dict] = []
+
+    def gen_conf(self):
+        for meta in sorted(self.meta_list, key=lambda m: m.name):
+            self.gen_meta(meta)
+        if self.enums:
+            self.gen_enums()
+
+    def get_spec(self) -> dict:
+        return {
+            "swagger": "2.0",
+            "basePath": "/",
+            "info": {"title": "API", "version": "1.0"},
+            "produces": ["application/json"],
+            "consumes": ["application/json"],
+            "tags": self.tags,
+            "paths": self.paths,
+            "definitions": self.definitions,
+        }
+
+    def get_conf(self) -> str:
+        return json.dumps(self.get_spec(), ensure_ascii=False, indent=1, sort_keys=True)
+
+    def gen_meta(self, meta: MetaData):
+        ns = get_namespace(meta.service_type)
+        if not any(tag["name"] == ns.name for tag in self.tags):
+            self.tags.append({"name": ns.name, "description": ns.description})
+
+        operations = {}
+        for entry in meta.entries:
+            operations[entry.name] = self.gen_operation(meta, entry, ns.name)
+
+        resource_name = split_by_upper_character(f"{meta.name}Resource", "_").lower()
+        for url in ns.urls:
+            swagger_path, path_params = convert_url(f"/{ns.name}{url}", ns.params)
+            path_item = self.paths.setdefault(swagger_path, {})
+            if path_params:
+                path_item["parameters"] = path_params
+            for (method, operation) in operations.items():
+                operation = dict(operation)
+                operation["operationId"] = f"{method}_{resource_name}"
+                path_item[method] = operation
+
+    def gen_operation(self, meta: MetaData, entry: Entry, tag: str) -> dict:
+        parameters = []
+        body_fields = {}
+        for arg in entry.args:
+            location = arg_location(entry, arg)
+            if location == "path":
+                # path 参数由 url 统一声明
+                continue
+            if location == "body":
+                body_fields[arg.name] = arg.arg_type
+                continue
+            parameter = {"name": arg.name, "in": location, "required": bool(arg.arg_type.required)}
+            parameter.update(self.schema_of(arg.arg_type, ""))
+            if arg.description and not parameter.get("description"):
+                parameter["description"] = arg.description
+            parameters.append(parameter)
+
+        if body_fields:
+            model_name = pretty_name(f"{meta.name}_{entry.name}_arg_model")
+            self.definitions[model_name] = self.model_of(body_fields, model_name)
+            parameters.append({
+                "name": "payload",
+                "in": "body",
+                "required": True,
+                "schema": {"$ref": f"#/definitions/{model_name}"},
+            })
+
+        response = {"description": entry.result.description if entry.result is not None else ""}
+        if entry.result is not None and type_def.is_dict(entry.result):
+            model_name = pretty_name(f"{meta.name}_{entry.name}_result_model")
+            self.definitions[model_name] = self.model_of(entry.result.get_elem_info(), model_name)
+            response["schema"] = {"$ref": f"#/definitions/{model_name}"}
+        elif entry.result is not None and type_def.is_list(entry.result):
+            model_name = pretty_name(f"{meta.name}_{entry.name}_result_model")
+            response["schema"] = self.schema_of(entry.result, model_name)
+
+        operation = {"tags": [tag], "responses": {"200": response}}
+        if entry.description:
+            operation["summary"] = entry.description.strip().split("\n")[0]
+            operation["description"] = entry.description.strip()
+        if parameters:
+            operation["parameters"] = parameters
+        if entry.name != Method.GET.value and body_fields:
+            operation["consumes"] = ["application/json"]
+        if is_web_stream(entry) and get_option(entry).stream_format == "ndjson":
+            operation["produces"] = ["application/x-ndjson"]
+        return operation
+
+    def model_of(self, fields: typing.Dict[str, RpcType], model_name: str) -> dict:
+        """
+        生成 Dict 类型的 definition, 嵌套的 Dict 类型生成单独的 definition
+        """
+        properties = {}
+        required = []
+        for key, value in fields.items():
+            # 跳过 Header 定义
+            if value.get_source().value == ArgSource.HEADER.value:
+                continue
+            properties[key] = self.schema_of(value, pretty_name(f"{model_name}_{key}"))
+            if value.required:
+                required.append(key)
+        model = {"type": "object", "properties": properties}
+        if required:
+            model["required"] = required
+        return model
+
+    def schema_of(self, value: RpcType, model_name: str) -> dict:
+        """
+        生成字段的 schema, 基础类型直接生成, 嵌套类型生成 definition 后引用
+        """
+        if type_def.is_dict(value):
+            self.definitions[model_name] = self.model_of(value.get_elem_info(), model_name)
+            schema = {"$ref": f"#/definitions/{model_name}"}
+        elif type_def.is_list(value):
+            schema = {"type": "array", "items": self.schema_of(value.get_elem(), model_name)}
+        elif type_def.is_enum(value):
+            schema = self.base_schema(value.rpc_type)
+            schema["enum"] = [item.default_value for item in value.enum_dict.values()]
+        else:
+            schema = self.base_schema(value)
+
+        if value.description and "$ref" not in schema:
+            schema["description"] = value.description
+        if value.default_value is not None and not type_def.is_dict(value):
+            schema["default"] = value.default_value
+        for (key, swagger_key) in constraint_keys:
+            limit = getattr(value, key, None)
+            if limit is not None:
+                schema[swagger_key] = limit
+        return schema
+
+    @staticmethod
+    def base_schema(value: RpcType) -> dict:
+        swagger_type, swagger_format = swagger_types.get(value.__rpc_tag__, ("string", None))
+        schema = {"type": swagger_type}
+        if swagger_format:
+            schema["format"] = swagger_format
+        return schema
+
+    def gen_enums(self):
+        """
+        生成 EnumDef 中枚举接口的文档
+        """
+        self.tags.append({"name": "enum", "description": "枚举定义信息"})
+        if config.web_enum_precompute:
+            self.paths["/enum/_all"] = {
+                "get": {
+                    "tags": ["enum"],
+                    "operationId": "get_all_enums",
+                    "parameters": [{
+                        "name": "names",
+                        "in": "query",
+                        "required": False,
+                        "type": "string",
+                        "description": "以逗号分隔的枚举名称, 为空时返回所有枚举",
+                    }],
+                    "responses": {"200": {"description": "key 为枚举名称, 值与单个枚举接口的返回值相同"}},
+                },
+            }
+        for enum_info in sorted(self.enums, key=lambda e: e.enum.name.lower()):
+            name = enum_info.enum.name or enum_info.var_name
+            model_name = f"{pretty_name(name)}EnumResultDefine"
+            info_schema = {
+                "type": "object",
+                "properties": {
+                    "key": {"type": "string", "description": "枚举名称"},
+                    "value": dict(self.base_schema(enum_info.enum.rpc_type), description="枚举值"),
+                    "description": {"type": "string"},
+                },
+            }
+            self.definitions[f"{pretty_name(name)}EnumResultInfoDefine"] = info_schema
+            self.definitions[model_name] = {
+                "type": "object",
+                "properties": {
+                    "info": {
+                        "type": "array",
+                        "items": {"$ref": f"#/definitions/{pretty_name(name)}EnumResultInfoDefine"},
+                    },
+                },
+            }
+            description = "".join(
+                [f"{enum_info.enum.description}<br/>"] +
+                [f"{value.default_value}: {key} - {value.description}<br/>"
+                 for (key, value) in enum_info.enum.enum_dict.items()]
+            )
+            self.paths[f"/enum/{name}"] = {
+                "get": {
+                    "tags": ["enum"],
+                    "operationId": f"get_{split_by_upper_character(pretty_name(name), '_').lower()}",
+                    "responses": {
+                        "200": {"description": description, "schema": {"$ref": f"#/definitions/{model_name}"}},
+                    },
+                },
+            }
+
+
+def convert_url(url: str, params: typing.Dict[str, RpcType] = None) -> typing.Tuple[str, typing.List[dict]]:
+    """
+    将 Flask 的 url 规则转换为 Swagger 的路径, 并生成 path 参数
+    """
+    parameters = []
+    for (converter, name) in url_param_re.findall(url):
+        parameter = {
+            "name": name,
+            "in": "path",
+            "required": True,
+            "type": converter_types.get(converter, "string"),
+        }
+        field = (params or {}).get(name)
+        if field is not None and field.description:
+            parameter["description"] = field.description
+        parameters.append(parameter)
+    return url_param_re.sub(r"{\2}", url), parameters
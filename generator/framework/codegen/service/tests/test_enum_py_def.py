@@ -0,0 +1,56 @@
+import enum
+from types import SimpleNamespace
+
+import pytest
+
+from generator import config
+from generator.common import fields
+from generator.framework.analyser.module_scanner import EnumWithVar
+from generator.framework.codegen.service.enum_py_def import EnumPyDef, gen_enum_header
+
+
+def enum_info(rpc_type, **members) -> EnumWithVar:
+    """
+    members 的值为 (值, 描述)
+    """
+    enum_dict = {}
+    for (key, (value, description)) in members.items():
+        enum_dict[key] = rpc_type.__class__(description=description, default_value=value)
+    return EnumWithVar("Demo", "demo", SimpleNamespace(
+        name="Demo", description="demo enum", rpc_type=rpc_type, enum_dict=enum_dict))
+
+
+def generate(info: EnumWithVar):
+    gen = EnumPyDef(info)
+    gen.gen_conf()
+    scope = {}
+    exec(compile(gen_enum_header() + gen.get_conf(), "enum", "exec"), scope)
+    return scope["Demo"]
+
+
+class TestStdEnum(object):
+    @pytest.fixture(autouse=True)
+    def style(self, monkeypatch):
+        monkeypatch.setattr(config, "enum_style", "enum")
+
+    def test_int(self):
+        demo = generate(enum_info(fields.Integer(), ONE=(1, "one"), TWO=(2, "two")))
+        assert issubclass(demo, enum.IntEnum)
+        assert demo.ONE == 1
+        assert demo.get_desc(2) == "two"
+        assert demo.get_name(1) == "ONE"
+
+    def test_str(self):
+        demo = generate(enum_info(fields.String(), RED=("red", "red color")))
+        assert issubclass(demo, str)
+        assert demo.RED == "red"
+        assert demo.get_desc("red") == "red color"
+
+    def test_bool(self):
+        # bool 不能被继承, 使用不混入基础类型的 Enum
+        demo = generate(enum_info(fields.Bool(), YES=(True, "yes"), NO=(False, "no")))
+        assert not issubclass(demo, bool)
+        assert demo.YES.value is True
+        assert demo(False) is demo.NO
+        assert demo.get_desc(True) == "yes"
+        assert demo.get_name(False) == "NO"
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+
+from generator import config
+from generator.common import fields, CommonBase, CommonImpl, Entry, MetaData
+from generator.framework.analyser.analyser import paginate_entry
+from generator.framework.analyser.option import EntryOption, entry_option_key, is_http_cached, is_stream, \
+    is_web_stream
+from generator.framework.codegen.addition.web_marshal import marshal_list
+from generator.framework.codegen.service.flask_def import FlaskDef, need_marshal
+from generator.framework.codegen.service.openapi_def import OpenApiDef
+
+
+class DemoBase(CommonBase):
+    pass
+
+
+class DemoImpl(CommonImpl):
+    pass
+
+
+def marshal_meta() -> MetaData:
+    row = fields.Dict(dict(
+        id=fields.Integer(description="id of tag"),
+        name=fields.String(description="name of tag")
+    ), description="tag row")
+    result = fields.Dict(dict(
+        id=fields.Integer(description="id of user"),
+        score=fields.Float(description="score of user", default_value=0.0),
+        tags=fields.List(row, description="tags"),
+        codes=fields.List(fields.String(description="code"), description="codes"),
+        info=fields.Dict(dict(age=fields.Integer(description="age")), description="user info")
+    ), description="user")
+    entry = Entry("get", [], result, "get user")
+    return MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl)
+
+
+class TestMarshal(object):
+    def test_generated_marshal(self):
+        meta = marshal_meta()
+        gen = FlaskDef(meta)
+        gen.build_result_marshal(meta.entries[0])
+        scope = {}
+        exec(compile(gen.get_conf(), "marshal", "exec"), scope)
+        marshal = scope["marshal_demo_get_result"]
+
+        value = SimpleNamespace(
+            id=1, score=None, codes=("a", "b"), info=SimpleNamespace(age=3),
+            tags=[SimpleNamespace(id=2, name="x")])
+        assert marshal(value) == {
+            "id": 1,
+            # 有默认值的字段为 None 时与 flask_restplus 一样使用默认值
+            "score": 0.0,
+            "tags": [{"id": 2, "name": "x"}],
+            "codes": ["a", "b"],
+            "info": {"age": 3},
+        }
+
+        value.tags = value.codes = value.info = None
+        assert marshal(value)["tags"] is None
+        assert marshal(value)["info"] is None
+
+    def test_list_result(self, monkeypatch):
+        monkeypatch.setattr(config, "web_fast_marshal", True)
+        entry = stream_entry()
+        meta = MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl)
+        assert need_marshal(entry)
+        gen = FlaskDef(meta)
+        gen.build_entry_marshal(entry)
+        scope = {}
+        exec(compile(gen.get_conf(), "marshal", "exec"), scope)
+        # 列表的元素使用与流式接口相同的 marshal 函数
+        assert marshal_list([SimpleNamespace(id=1)], scope["marshal_demo_list_result"]) == [{"id": 1}]
+
+        gen = FlaskDef(meta)
+        gen.gen_method(entry, SimpleNamespace(params={}))
+        assert "return json_response(marshal_list(impl.list(args), marshal_demo_list_result))" in gen.get_conf()
+
+    def test_base_list_cache(self):
+        entry = Entry("get", [], fields.List(fields.Integer(description="id"), description="ids"), "get ids")
+        setattr(entry, entry_option_key, EntryOption(http_cache_ttl=5))
+        assert is_http_cached(entry) and need_marshal(entry)
+        gen = FlaskDef(MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl))
+        gen.gen_method(entry, SimpleNamespace(params={}))
+        assert "return DemoGetHttpCache.put(cache_key, marshal_list(impl.get(args)))" in gen.get_conf()
+
+        # 流式接口不缓存
+        setattr(entry, entry_option_key, EntryOption(http_cache_ttl=5, web_stream=True))
+        assert not is_http_cached(entry) and not need_marshal(entry)
+
+
+def stream_entry(**options) -> Entry:
+    row = fields.Dict(dict(id=fields.Integer(description="id of user")), description="user row")
+    entry = Entry("list", [], fields.List(row, description="user rows"), "list users")
+    setattr(entry, entry_option_key, EntryOption(**options))
+    return entry
+
+
+class TestWebStream(object):
+    def test_independent_of_grpc_stream(self):
+        # gRPC 的 stream 不改变 Flask 接口的返回格式
+        entry = stream_entry(stream=True)
+        assert is_stream(entry) and not is_web_stream(entry)
+        entry = stream_entry(web_stream=True)
+        assert is_web_stream(entry) and not is_stream(entry)
+        with pytest.raises(ValueError):
+            EntryOption(web_stream=True, paginate=True)
+
+    def test_stream_call(self):
+        entry = stream_entry(web_stream=True, stream_format="ndjson")
+        gen = FlaskDef(MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl))
+        assert gen.stream_call(entry) == "impl.list(args), marshal_demo_list_result, \"ndjson\""
+
+        operation = OpenApiDef([]).gen_operation(gen.meta_data, entry, "demo")
+        assert operation["produces"] == ["application/x-ndjson"]
+        operation = OpenApiDef([]).gen_operation(gen.meta_data, stream_entry(stream=True, stream_format="ndjson"), "demo")
+        assert "produces" not in operation
+
+
+class TestPagination(object):
+    def test_invalid_cursor_scope(self):
+        entry = stream_entry()
+        option = EntryOption(paginate=True, page_size=20, max_page_size=200)
+        setattr(entry, entry_option_key, option)
+        paginate_entry(DemoBase, entry, option)
+        gen = FlaskDef(MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl))
+        gen.gen_method(entry, SimpleNamespace(params={}))
+        lines = [line.strip() for line in gen.get_conf().splitlines()]
+        # impl 在 handle_validation 中调用, 解码游标失败时返回 400
+        index = lines.index("with handle_validation():")
+        assert lines[index - 1] == "args.limit = clamp_limit(args.limit, 20, 200)"
+        assert lines[index + 1] == "impl = DemoImpl()"
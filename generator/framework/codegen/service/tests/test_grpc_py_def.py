@@ -1,7 +1,15 @@
-from generator.common import fields, CommonBase, CommonImpl
+import pytest
+
+from generator import config
+from generator.common import fields, Arg, ArgSource, CommonBase, CommonImpl, Entry, MetaData
 from generator.common.base_util import impl_name
-from generator.framework.analyser import Analyser
+from generator.framework.analyser import Analyser, EntryOption
+from generator.framework.analyser.analyser import paginate_entry
+from generator.framework.analyser.option import entry_option_key, rpc_option, get_service_option, \
+    check_entry_option
+from generator.framework.codegen.config.grpc_config import GrpcConfig
 from generator.framework.codegen.service.grpc_py_def import GrpcPyDef
+from generator.framework.codegen.service.grpc_server_def import GrpcPyServerDef
 
 
 Args = fields.args(fields.model("DemoArgs", dict(
@@ -42,3 +50,223 @@ class TestGrpcPyDef(object):
         # code = compile(cfg, "test", "exec")
         # exec(code, globals(), locals())
         # assert(HelloArg is not None)
+
+
+def columnar_meta(columnar: bool) -> MetaData:
+    row = fields.Dict(dict(
+        id=fields.Integer(description="id of user"),
+        name=fields.String(description="name of user")
+    ), description="user row")
+    entry = Entry("list", [], fields.List(row, description="user rows"), "list users")
+    setattr(entry, entry_option_key, EntryOption(columnar=columnar))
+    return MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl)
+
+
+class TestColumnar(object):
+    def test_columnar_result(self):
+        meta = columnar_meta(True)
+        cfg = GrpcConfig(meta)
+        cfg.gen_conf()
+        assert "repeated int32 id = 1;" in cfg.get_conf()
+        assert "repeated string name = 2;" in cfg.get_conf()
+
+        gen = GrpcPyDef(meta)
+        gen.gen_conf()
+        header = gen.get_header()
+        assert "from ...addition.columnar import ColumnarResult" in header
+        assert "class ListResult(ColumnarResult):" in header
+        assert "pb2_type = pb2.DemoListResult" in header
+
+    def test_row_result(self):
+        meta = columnar_meta(False)
+        cfg = GrpcConfig(meta)
+        cfg.gen_conf()
+        assert "repeated Data data = 1;" in cfg.get_conf()
+
+        gen = GrpcPyDef(meta)
+        gen.gen_conf()
+        header = gen.get_header()
+        assert "ColumnarResult" not in header
+        assert "result = pb2.DemoListResult.Data()" in header
+
+
+def paginated_meta(args=()) -> MetaData:
+    row = fields.Dict(dict(
+        id=fields.Integer(description="id of user"),
+        name=fields.String(description="name of user")
+    ), description="user row")
+    entry = Entry("list", list(args), fields.List(row, description="user rows"), "list users")
+    option = EntryOption(paginate=True, page_size=20, max_page_size=200)
+    setattr(entry, entry_option_key, option)
+    paginate_entry(DemoBase, entry, option)
+    return MetaData("Demo", DemoBase, [entry], impl_type=DemoImpl)
+
+
+class TestPagination(object):
+    def test_paginated_messages(self):
+        meta = paginated_meta()
+        assert [arg.name for arg in meta.entries[0].args] == ["cursor", "limit"]
+
+        cfg = GrpcConfig(meta)
+        cfg.gen_conf()
+        assert "string cursor = 1;" in cfg.get_conf()
+        assert "int32 limit = 2;" in cfg.get_conf()
+        assert "string next_cursor = 2;" in cfg.get_conf()
+
+        gen = GrpcPyDef(meta)
+        gen.gen_conf()
+        service = gen.get_service()
+        assert "from .addition.pagination import iter_pages" in service
+        assert "return iter_pages(self.list, arg, option)" in service
+
+    def test_existing_args_first(self):
+        keyword = Arg("keyword", fields.String(description="keyword"), "", description="keyword",
+                      source=ArgSource.PARAMS)
+        meta = paginated_meta([keyword])
+        # 分页参数加在已有参数之后, 已有参数的字段编号不变
+        assert [arg.name for arg in meta.entries[0].args] == ["keyword", "cursor", "limit"]
+        cfg = GrpcConfig(meta)
+        cfg.gen_conf()
+        assert "string keyword = 1;" in cfg.get_conf()
+        assert "string cursor = 2;" in cfg.get_conf()
+
+    @pytest.mark.parametrize("rpc_async", [False, True])
+    def test_invalid_cursor_scope(self, monkeypatch, rpc_async):
+        monkeypatch.setattr(config, "validate_args", False)
+        monkeypatch.setattr(config, "rpc_async", rpc_async)
+        gen = GrpcPyServerDef(paginated_meta())
+        gen.gen_conf()
+        service = gen.get_service()
+        # impl 抛出的 InvalidCursor 由 handle_errors 转换为 INVALID_ARGUMENT
+        assert (rpc_async and "async with ahandle_errors(context):" or "with handle_errors(context):") in service
+
+
+class TestLocal(object):
+    def test_bind_local(self, monkeypatch):
+        monkeypatch.setattr(config, "rpc_local", True)
+        monkeypatch.setattr(config, "rpc_async", False)
+        gen = GrpcPyDef(columnar_meta(True))
+        gen.gen_conf()
+        service = gen.get_service()
+        # 进程内调用同样经过客户端的 Result 转换
+        assert "from .addition.local import bind_local" in service
+        assert "context = bind_local(self.get_context(\"list\"), self, \"list\")" in service
+        assert "result.from_pb2(return_result)" in service
+        assert "get_local" not in service
+
+    @pytest.mark.parametrize("rpc_async", [False, True])
+    def test_direct_local(self, monkeypatch, rpc_async):
+        monkeypatch.setattr(config, "rpc_local", True)
+        monkeypatch.setattr(config, "rpc_async", rpc_async)
+        monkeypatch.setattr(config, "validate_args", False)
+        monkeypatch.setattr(config, "rpc_metrics", "")
+        monkeypatch.setattr(config, "need_impl", True)
+        meta = columnar_meta(False)
+        limited = Entry("put", [], fields.Integer(description="id"), "put user")
+        setattr(limited, entry_option_key, EntryOption(max_concurrency=4))
+        meta.entries.append(limited)
+
+        gen = GrpcPyDef(meta)
+        gen.gen_conf()
+        service = gen.get_service()
+        # Arg 直接传给 impl, 需要服务端限流的接口仍经过 servicer
+        call = rpc_async and "return await local.acall(\"list\", arg, option)" or "return local.call(\"list\", arg, option)"
+        assert call in service
+        assert "\"put\", arg, option" not in service
+        assert "from .addition.local import get_local, %s" % (rpc_async and "abind_local" or "bind_local") in service
+
+        gen = GrpcPyServerDef(meta)
+        gen.gen_conf()
+        service = gen.get_service()
+        assert "%s local_list(self, arg, context):" % (rpc_async and "async def" or "def") in service
+        assert (rpc_async and "return await acall_traced(trace_type, ctx, impl.list, arg)"
+                or "return impl.list(arg)") in service
+        assert "local_put" not in service
+
+    def test_server_checks(self, monkeypatch):
+        monkeypatch.setattr(config, "rpc_local", True)
+        monkeypatch.setattr(config, "rpc_metrics", "server")
+        meta = columnar_meta(False)
+        assert not GrpcPyDef.is_direct_local(meta.entries[0])
+        monkeypatch.setattr(config, "rpc_metrics", "")
+        monkeypatch.setattr(config, "validate_args", True)
+        assert not GrpcPyDef.is_direct_local(meta.entries[0])
+        monkeypatch.setattr(config, "validate_args", False)
+        assert GrpcPyDef.is_direct_local(meta.entries[0])
+
+
+@rpc_option(channel_pool_size=4)
+class PooledBase(CommonBase):
+    pass
+
+
+class TestChannelPool(object):
+    def test_service_option(self, monkeypatch):
+        monkeypatch.setattr(config, "rpc_async", False)
+        assert get_service_option(PooledBase).channel_pool_size == 4
+        with pytest.raises(ValueError):
+            rpc_option(channel_pool_size=2)(lambda self: None)
+
+        gen = GrpcPyDef(MetaData("Demo", PooledBase, [], impl_type=DemoImpl))
+        gen.gen_conf()
+        service = gen.get_service()
+        assert "from .addition.client import PooledServiceClient, reg_client" in service
+        assert "class Demo(PooledServiceClient):" in service
+        assert "pool_size = 4" in service
+
+    def test_runtime_client(self, monkeypatch):
+        monkeypatch.setattr(config, "rpc_async", False)
+        monkeypatch.setattr(config, "channel_pool_size", 1)
+        gen = GrpcPyDef(MetaData("Demo", DemoBase, [], impl_type=DemoImpl))
+        gen.gen_conf()
+        service = gen.get_service()
+        assert "class Demo(ServiceClient):" in service
+        assert "pool_size" not in service
+
+
+class TestCacheKeys(object):
+    def test_unknown_key(self):
+        @impl_name("DemoImpl")
+        class CachedBase(CommonBase):
+            @Args
+            @Resp
+            @rpc_option(cache_ttl=10, cache_keys=["missing"])
+            def hello(self):
+                """demo hello api"""
+                pass
+
+        # 在解析时报错, 而不是在 gen_conf 中被忽略
+        with pytest.raises(ValueError):
+            Analyser.analyse([CachedBase], [DemoImpl])
+
+    def test_known_key(self):
+        meta = paginated_meta()
+        entry = meta.entries[0]
+        setattr(entry, entry_option_key, EntryOption(paginate=True, cache_ttl=10, cache_keys=["limit"]))
+        check_entry_option(DemoBase, entry)
+
+        gen = GrpcPyDef(meta)
+        gen.gen_conf()
+        assert "_cache_list = ResponseCache(\"Demo.list\", 10, 1024, (\"limit\", ))" in gen.get_service()
+
+
+class TestValidate(object):
+    @pytest.mark.parametrize("rpc_async", [False, True])
+    def test_every_entry_point(self, monkeypatch, rpc_async):
+        monkeypatch.setattr(config, "validate_args", True)
+        monkeypatch.setattr(config, "rpc_async", rpc_async)
+        meta = paginated_meta()
+        setattr(meta.entries[0], entry_option_key, EntryOption(paginate=True, bulk="repeated"))
+        stream = Entry("put", [], fields.Integer(description="id"), "put user")
+        setattr(stream, entry_option_key, EntryOption(bulk="stream"))
+        meta.entries.append(stream)
+
+        gen = GrpcPyServerDef(meta)
+        gen.gen_conf()
+        service = gen.get_service()
+        # ValidationError 由 handle_errors 转换为 INVALID_ARGUMENT, Batch 中只使该子请求失败
+        assert (rpc_async and "async with ahandle_errors(context):" or "with handle_errors(context):") in service
+        assert "arg.validate()" in service
+        assert "convert_args(request.data, ListArg, validate=True)" in service
+        assert "chunk_args(request_iterator, PutArg, 500, validate=True)" in service
+        assert "check_arg" not in service
@@ -0,0 +1,74 @@
+from os import path
+
+from generator import config
+from generator.common import MetaData
+from generator.framework.codegen.service.base import ServerDirConfig
+from generator.framework.codegen.service.grpc_service import gen_addition_file
+
+# 其它项目之前生成的注册代码
+other_project = """# coding: utf8
+# DONT TOUCH THIS FILE!
+
+from .runtime.runtime import reg_servicer
+
+# project: other
+
+from .order import OrderServicer, pb2_grpc as order_pb2_grpc
+
+reg_servicer(OrderServicer, order_pb2_grpc.add_OrderServicer_to_server)
+
+# end project
+"""
+
+
+class FakeConfig(object):
+    def __init__(self, name: str):
+        self.meta_data = MetaData(name, None, [])
+
+
+def generate(tmp_path, monkeypatch, **options):
+    monkeypatch.setattr(config, "source_project_name", "demo")
+    for (name, value) in options.items():
+        monkeypatch.setattr(config, name, value)
+    server_dir_config = ServerDirConfig(str(tmp_path))
+    server_dir_config.ensure_dir()
+    with open(path.join(server_dir_config.root, "__init__.py"), "w") as f:
+        f.write(other_project)
+
+    gen_addition_file([FakeConfig("Demo")], server_dir_config, None)
+    with open(path.join(server_dir_config.root, "__init__.py")) as f:
+        init = f.read()
+    with open(path.join(server_dir_config.base_dir, "rpc_server.py")) as f:
+        main = f.read()
+    compile(init, "__init__", "exec")
+    compile(main, "rpc_server", "exec")
+    return init, main
+
+
+class TestAdditionFile(object):
+    def test_runtime_server(self, tmp_path, monkeypatch):
+        init, main = generate(tmp_path, monkeypatch, rpc_async=False, custom_server=False, rpc_local=False)
+        assert "from .runtime.runtime import reg_servicer" in init
+        assert "reg_servicer(DemoServicer, demo_pb2_grpc.add_DemoServicer_to_server)" in init
+        assert "reg_servicer(OrderServicer, order_pb2_grpc.add_OrderServicer_to_server)" in init
+        assert "from rpc.runtime.runtime import server" in main
+        assert "server.loop()" in main
+
+    def test_runtime_server_local(self, tmp_path, monkeypatch):
+        init, _ = generate(tmp_path, monkeypatch, rpc_async=False, custom_server=False, rpc_local=True)
+        assert "reg_local(DemoServicer)" in init
+
+    def test_custom_server(self, tmp_path, monkeypatch):
+        init, main = generate(tmp_path, monkeypatch, rpc_async=False, custom_server=True, rpc_local=True)
+        # 其它项目的 servicer 同样注册到 addition 的服务端
+        assert "from .addition.server import reg_servicer" in init
+        assert "from .runtime.runtime import reg_servicer" not in init
+        assert "reg_servicer(OrderServicer, order_pb2_grpc.add_OrderServicer_to_server)" in init
+        assert "reg_local" not in init
+        assert "from rpc.addition import server" in main
+        assert "server.ServerOption.from_env(" in main
+
+    def test_async_server(self, tmp_path, monkeypatch):
+        init, main = generate(tmp_path, monkeypatch, rpc_async=True, custom_server=False, rpc_local=False)
+        assert "from .addition.server import reg_servicer" in init
+        assert "from rpc.addition import aio as server" in main
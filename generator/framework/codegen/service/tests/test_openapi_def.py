@@ -0,0 +1,60 @@
+from generator.common import fields, Arg, ArgSource, CommonBase, Entry, MetaData
+from generator.framework.codegen.service.openapi_def import OpenApiDef, convert_url
+
+
+class DemoBase(CommonBase):
+    pass
+
+
+def post_entry() -> Entry:
+    return Entry("post", [
+        Arg("uid", fields.Integer(description="uid"), source=ArgSource.PATH),
+        Arg("page", fields.Integer(description="page", minimum=1), source=ArgSource.PARAMS),
+        Arg("token", fields.String(description="token"), source=ArgSource.HEADER),
+        Arg("name", fields.String(description="name", max_length=10), source=ArgSource.BODY),
+        Arg("info", fields.Dict(dict(age=fields.Integer(description="age")), description="info"),
+            source=ArgSource.BODY),
+    ], fields.Dict(dict(id=fields.Integer(description="new id")), description="created"), "create user\n\ndetail")
+
+
+class TestConvertUrl(object):
+    def test_params(self):
+        url, params = convert_url("/user/<int:uid>/<name>", {"uid": fields.Integer(description="uid")})
+        assert url == "/user/{uid}/{name}"
+        assert params == [
+            {"name": "uid", "in": "path", "required": True, "type": "integer", "description": "uid"},
+            {"name": "name", "in": "path", "required": True, "type": "string"},
+        ]
+
+
+class TestOperation(object):
+    def test_post(self):
+        spec = OpenApiDef([])
+        operation = spec.gen_operation(MetaData("Demo", DemoBase, []), post_entry(), "user")
+        parameters = {parameter["name"]: parameter for parameter in operation["parameters"]}
+        # path 参数由 url 统一声明
+        assert "uid" not in parameters
+        assert parameters["page"]["in"] == "query"
+        assert parameters["page"]["minimum"] == 1
+        assert parameters["token"]["in"] == "header"
+        assert parameters["payload"]["schema"] == {"$ref": "#/definitions/DemoPostArgModel"}
+        assert operation["summary"] == "create user"
+        assert operation["consumes"] == ["application/json"]
+        assert operation["responses"]["200"]["schema"] == {"$ref": "#/definitions/DemoPostResultModel"}
+
+        body = spec.definitions["DemoPostArgModel"]
+        assert body["properties"]["name"] == {"type": "string", "description": "name", "maxLength": 10}
+        assert body["properties"]["info"] == {"$ref": "#/definitions/DemoPostArgModelInfo"}
+        assert body["required"] == ["name", "info"]
+        assert spec.definitions["DemoPostArgModelInfo"]["properties"]["age"]["type"] == "integer"
+
+    def test_list_result(self):
+        row = fields.Dict(dict(id=fields.Integer(description="id")), description="row")
+        entry = Entry("get", [], fields.List(row, description="rows"), "list")
+        spec = OpenApiDef([])
+        operation = spec.gen_operation(MetaData("Demo", DemoBase, []), entry, "user")
+        schema = operation["responses"]["200"]["schema"]
+        assert schema["type"] == "array"
+        assert schema["items"] == {"$ref": "#/definitions/DemoGetResultModel"}
+        assert "id" in spec.definitions["DemoGetResultModel"]["properties"]
+        assert "parameters" not in operation
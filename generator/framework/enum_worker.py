@@ -2,8 +2,9 @@ from os import path
 from typing import List
 
 from .codegen.service.base import ensure_dir
-from .codegen.service.enum_def import EnumDef
-from .codegen.service.enum_py_def import EnumPyDef
+from .. import config
+from .codegen.service.enum_def import EnumDef, gen_all_enum_resource
+from .codegen.service.enum_py_def import EnumPyDef, gen_enum_header
 from .analyser.module_scanner import ModuleScanner, EnumWithVar
 
 
@@ -31,6 +32,8 @@ class EnumWorker(object):
         self.gen_path = gen_path
         self.enums = enums or []
         self.filter_str = filter_str
+        # 去重后实际生成接口的枚举
+        self.enum_list: List[EnumWithVar] = []
 
     def start(self) -> bool:
         """
@@ -47,8 +50,9 @@ class EnumWorker(object):
         enums = scanner.get_enums() + self.enums
         # 去重
         enums = self.check_enums(enums)
+        self.enum_list = sorted(enums, key=lambda e: e.enum.name.lower())
 
-        enum_py_list = ["\n"]
+        enum_py_list = [gen_enum_header() or "\n"]
         with open(path.join(res_output, "./api_reg.py"), "a") as init_file:
             for enum_info in sorted(enums, key=lambda e: e.enum.name.lower()):
                 enum_def = EnumDef(enum_info, self.runtime_path, self.api_path)
@@ -62,6 +66,9 @@ class EnumWorker(object):
                 enum_py_def.gen_conf()
                 enum_py_list.append(enum_py_def.get_conf())
 
+            if config.web_enum_precompute and header_str:
+                enum_resource.append(gen_all_enum_resource())
+
             # 找到 .define. 并用相同的后缀路径来保存创建的枚举服务
             # save resource and arg define to api path
             self.save(
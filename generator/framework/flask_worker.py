@@ -1,12 +1,16 @@
 from os import path
 from typing import List
 
+from .. import config
 from ..common import MetaData, type_def
+from ..common.web.namespace import get_namespace
 from .codegen.service.base import ensure_dir
 from .codegen.service.flask_def import FlaskDef, __test_meta_define__
-from .codegen.service.grpc_service import GrpcPyDef
+from .codegen.service.grpc_service import GrpcPyDef, copy_addition_modules
+from .codegen.service.openapi_def import OpenApiDef
 from .enum_worker import EnumWorker
 from .analyser.module_scanner import EnumWithVar
+from .analyser.option import is_http_cached, is_web_stream, is_paginated
 from .util.text import split_by_upper_character
 
 
@@ -73,6 +77,8 @@ class WebWorker(object):
 
         ensure_dir(res_output, is_package=True)
         ensure_dir(arg_output, is_package=True)
+        if self.need_addition():
+            copy_addition_modules(path.join(res_output, "addition"))
 
         with open(path.join(res_output, "./api_reg.py"), "w") as init_file:
             init_str_list = []
@@ -83,9 +89,13 @@ class WebWorker(object):
                     a.process_entry_def(entry)
                     a.append_with()
 
-                arg_def = "\n".join([
+                arg_imports = [
                     "import typing",
                     f"from {self.runtime_path}.runtime.common import RPCDict",
+                ]
+                if config.validate_args:
+                    arg_imports.append(f"from {addition_path(meta)}.validate import ValidationError")
+                arg_def = "\n".join(arg_imports + [
                     "",
                     "",
                     a.cfg_string()
@@ -97,7 +107,8 @@ class WebWorker(object):
                     # f".{meta_file_name(meta, '_def')}",
                     f".{split_by_upper_character(meta.name, '_')}_def".lower(),
                     runtime_path=self.runtime_path,
-                    api_path=self.api_path
+                    api_path=self.api_path,
+                    addition_path=addition_path(meta)
                 )
                 f.gen_conf()
                 res_conf = "\n\n".join([f.get_header_conf(), f.get_conf()])
@@ -120,8 +131,88 @@ class WebWorker(object):
             res_output, self.runtime_path, self.api_path, gen_path=self.enum_gen_path, enums=self.enums
         )
         enum_worker.start()
+
+        if config.web_lazy_import:
+            self.gen_lazy_registry(res_output)
+        if config.web_openapi:
+            self.gen_openapi(res_output, enum_worker.enum_list)
+        if config.web_cache_stats and self.has_http_cache():
+            self.gen_cache_stats(res_output)
         return True
 
+    def gen_lazy_registry(self, res_output: str):
+        """
+        使用按需导入的注册表代替 api_reg.py 中的 import *, 枚举接口的 namespace 为 enum
+        """
+        modules = {}
+        for meta in sorted(self.meta_list, key=lambda m: meta_file_name(m)):
+            ns = get_namespace(meta.service_type)
+            modules.setdefault(ns.name, []).append(f".{meta_file_name(meta).replace('/', '.')}")
+        modules.setdefault("enum", []).append(".ss_enum")
+
+        lines = [
+            f"from {self.api_path} import api",
+            "from .addition.web_lazy import LazyRegistry",
+            "",
+            "registry = LazyRegistry(api, __name__, {",
+        ]
+        for (name, module_names) in modules.items():
+            quoted = ", ".join(f"\"{module_name}\"" for module_name in module_names)
+            lines.append(f"    \"{name}\": [{quoted}],")
+        lines += [
+            "})",
+            "warm_up = registry.warm_up",
+            ""
+        ]
+        self.save(path.join(res_output, "./api_reg.py"), "\n".join(lines))
+
+    def gen_openapi(self, res_output: str, enums: List[EnumWithVar]):
+        """
+        生成 swagger.json, 并在 api_reg.py 中注册，运行时直接提供该文档
+        """
+        openapi_def = OpenApiDef(self.meta_list, enums)
+        openapi_def.gen_conf()
+        self.save(path.join(res_output, "swagger.json"), openapi_def.get_conf())
+
+        with open(path.join(res_output, "./api_reg.py"), "a") as init_file:
+            init_file.write("\n".join([
+                "",
+                "from os import path",
+                f"from {self.api_path} import api",
+                "from .addition.web_spec import register_spec",
+                "",
+                "register_spec(api, path.join(path.dirname(__file__), \"swagger.json\"))",
+                ""
+            ]))
+
+    def gen_cache_stats(self, res_output: str):
+        """
+        在 api_reg.py 中注册查看接口缓存状态的接口, 该接口没有鉴权, 需要通过 web_cache_stats 开启
+        """
+        with open(path.join(res_output, "./api_reg.py"), "a") as init_file:
+            init_file.write("\n".join([
+                "",
+                f"from {self.api_path} import api",
+                "from .addition.web_cache import register_stats",
+                "",
+                "register_stats(api)",
+                ""
+            ]))
+
+    def has_http_cache(self) -> bool:
+        """
+        是否有接口需要在服务端缓存返回值
+        """
+        return any(is_http_cached(entry) for meta in self.meta_list for entry in meta.entries)
+
+    def need_addition(self) -> bool:
+        """
+        生成的接口是否使用 addition 中的模块
+        """
+        return config.web_arg_plan or config.validate_args or config.web_fast_marshal or config.web_openapi \
+            or config.web_lazy_import or config.web_enum_precompute or self.has_http_cache() \
+            or any(is_web_stream(entry) or is_paginated(entry) for meta in self.meta_list for entry in meta.entries)
+
     @staticmethod
     def save(file_path: str, content: str):
         with open(file_path, "w") as f:
@@ -148,6 +239,13 @@ def meta_file_name(meta: MetaData, suffix: str = "", base_path: str = "", need_e
     return f"{name.lower()}{suffix}"
 
 
+def addition_path(meta: MetaData) -> str:
+    """
+    生成的接口文件导入输出目录中 addition 模块的相对路径
+    """
+    return "." * (meta_file_name(meta).count("/") + 1) + "addition"
+
+
 def __test__():
     meta = __test_meta_define__()
     worker = WebWorker([meta], "/tmp/api_gen", runtime_path="runtime")